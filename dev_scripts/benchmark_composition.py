@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+"""
+Micro-benchmark of common Composition operations, as used in tight loops by
+the phase diagram and compatibility code.
+
+Usage: python benchmark_composition.py [-n NUMBER]
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import timeit
+
+SETUP = """
+from pymatgen.core.composition import Composition
+formulas = ["Li4Fe4P4O16", "Fe2O3", "LiCoO2", "Ca3(PO4)2", "Li2O2",
+            "Mn3O4", "Na0.5CoO2", "(NH4)2SO4"]
+comps = [Composition(f) for f in formulas]
+"""
+
+OPERATIONS = [
+    ("Composition(formula)", "[Composition(f) for f in formulas]"),
+    ("Composition(dict)",
+     "[Composition(c.get_el_amt_dict()) for c in comps]"),
+    ("formula", "[c.formula for c in comps]"),
+    ("reduced_formula", "[c.reduced_formula for c in comps]"),
+    ("get_reduced_composition_and_factor",
+     "[c.get_reduced_composition_and_factor() for c in comps]"),
+    ("anonymized_formula", "[c.anonymized_formula for c in comps]"),
+    ("element_composition", "[c.element_composition for c in comps]"),
+    ("fractional_composition", "[c.fractional_composition for c in comps]"),
+    ("weight", "[c.weight for c in comps]"),
+    ("hash", "[hash(c) for c in comps]"),
+    ("__eq__", "[c == d for c in comps for d in comps]"),
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=2000,
+                        help="Number of loops over the test compositions.")
+    args = parser.parse_args()
+
+    print("{:40s} {:>12s}".format("Operation", "Time (us)"))
+    for name, stmt in OPERATIONS:
+        t = min(timeit.repeat(stmt, setup=SETUP, number=args.number,
+                              repeat=3))
+        #Report the time per composition (per pair for __eq__).
+        n = 64 if name == "__eq__" else 8
+        print("{:40s} {:12.2f}".format(name, t / args.number / n * 1e6))
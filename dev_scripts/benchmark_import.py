@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+"""
+Reports the time taken to import pymatgen and its main submodules. Each
+import is timed in a fresh interpreter so that the results include the cost of
+all modules pulled in by that import, as seen by a short-lived script.
+
+Usage: python benchmark_import.py [-n REPEATS] [module ...]
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import subprocess
+import sys
+
+MODULES = ["pymatgen",
+           "pymatgen.core.periodic_table",
+           "pymatgen.core.units",
+           "pymatgen.core.composition",
+           "pymatgen.core.lattice",
+           "pymatgen.core.structure",
+           "pymatgen.core",
+           "pymatgen.serializers.json_coders",
+           "pymatgen.electronic_structure.core",
+           "pymatgen.symmetry.groups",
+           "pymatgen.symmetry.analyzer",
+           "pymatgen.io.vaspio",
+           "pymatgen.io.cifio",
+           "pymatgen.io.smartio",
+           "pymatgen.matproj.rest",
+           "pymatgen.analysis.structure_matcher",
+           "pymatgen.phasediagram.pdmaker"]
+
+TIMER = "import time; t = time.time(); import {}; print(time.time() - t)"
+
+
+def time_import(module, repeats):
+    times = []
+    for i in range(repeats):
+        output = subprocess.check_output([sys.executable, "-c",
+                                          TIMER.format(module)])
+        times.append(float(output.decode("utf-8").strip().split()[-1]))
+    return sorted(times)[len(times) // 2]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=MODULES,
+                        help="Modules to time. Defaults to the main "
+                             "pymatgen modules.")
+    parser.add_argument("-n", "--repeats", type=int, default=5,
+                        help="Number of fresh interpreters per module. The "
+                             "median time is reported.")
+    args = parser.parse_args()
+
+    print("{:45s} {:>10s}".format("Module", "Time (ms)"))
+    for module in args.modules:
+        try:
+            print("{:45s} {:10.1f}".format(
+                module, time_import(module, args.repeats) * 1000))
+        except subprocess.CalledProcessError:
+            print("{:45s} {:>10s}".format(module, "failed"))
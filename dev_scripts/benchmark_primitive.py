@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""
+Benchmarks IStructure.get_primitive_structure on supercells of the structures
+in test_files. Each structure is first reduced to its primitive cell, then
+expanded into supercells and reduced again, checking that the primitive cell
+is recovered.
+
+Usage: python benchmark_primitive.py [-n REPEATS]
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import os
+import time
+
+from pymatgen.io.vaspio import Poscar
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "test_files")
+
+POSCARS = ["POSCAR", "POSCAR.Li2O", "POSCAR.LiFePO4", "POSCAR.Al12O18"]
+
+SCALINGS = [[2, 1, 1], [2, 2, 2], [3, 3, 2],
+            [[1, 1, 0], [-1, 1, 0], [0, 0, 3]]]
+
+
+def get_structures():
+    for fname in POSCARS:
+        p = Poscar.from_file(os.path.join(TEST_DIR, fname),
+                             check_for_POTCAR=False)
+        yield fname, p.structure
+
+
+def timed(func, repeats):
+    times = []
+    for i in range(repeats):
+        t = time.time()
+        result = func()
+        times.append(time.time() - t)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--repeats", type=int, default=3,
+                        help="Number of times each reduction is timed.")
+    args = parser.parse_args()
+
+    print("{:20s} {:>12s} {:>8s} {:>8s} {:>10s}".format(
+        "Structure", "Scaling", "Sites", "Prim", "Time (s)"))
+    total = 0
+    for name, s in get_structures():
+        prim = s.get_primitive_structure()
+        for scaling in SCALINGS:
+            sc = prim.copy()
+            sc.make_supercell(scaling)
+            t, result = timed(sc.get_primitive_structure, args.repeats)
+            total += t
+            if len(result) != len(prim):
+                print("Warning: {} reduced to {} sites instead of {}".format(
+                    name, len(result), len(prim)))
+            label = "x".join(str(i) for i in scaling) \
+                if isinstance(scaling[0], int) else "non-diag"
+            print("{:20s} {:>12s} {:8d} {:8d} {:10.4f}".format(
+                name, label, len(sc), len(result), t))
+    print("Total time: {:.4f} s".format(total))
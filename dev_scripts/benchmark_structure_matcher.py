@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+"""
+Benchmarks StructureMatcher.fit on supercells of the primitive cells of the
+structures in test_files, with 50 to 200 sites. Each supercell is fitted to
+a copy with randomly displaced and shuffled sites and a small strain (a
+match), and to a copy with the species of two sites exchanged (not a match).
+The primitive cell reduction is turned off, so that the supercells are
+fitted as is.
+
+With --check-many, StructureMatcher.fit_many and get_rms_dist_many are
+instead checked against fit and get_rms_dist for every pair of the TiO2
+test structures, strained copies of them and Li2O, with several matchers.
+
+Usage: python benchmark_structure_matcher.py [-t SECONDS] [--check-many]
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from pymatgen.core.structure import Structure
+from pymatgen.analysis.structure_matcher import StructureMatcher
+from pymatgen.io.vaspio import Poscar
+from monty.json import MontyDecoder
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "test_files")
+
+SUPERCELLS = [("POSCAR.LiFePO4", [2, 1, 1]),
+              ("POSCAR.LiFePO4", [2, 2, 1]),
+              ("POSCAR.LiFePO4", [3, 2, 1]),
+              ("POSCAR.Al12O18", [3, 2, 1]),
+              ("POSCAR.Al12O18", [3, 2, 2]),
+              ("POSCAR.Al12O18", [4, 2, 2]),
+              ("POSCAR.Li2O", [3, 3, 3]),
+              ("POSCAR.Li2O", [4, 4, 4])]
+
+
+def get_structures():
+    for fname, scaling in SUPERCELLS:
+        p = Poscar.from_file(os.path.join(TEST_DIR, fname),
+                             check_for_POTCAR=False)
+        s = p.structure.get_primitive_structure()
+        s.make_supercell(scaling)
+        yield "{} {}".format(fname, "x".join(str(i) for i in scaling)), s
+
+
+def get_distorted(s, displacement, seed=0):
+    """
+    Copy of s with sites displaced by up to displacement (in A) in random
+    directions, shuffled, and strained by up to 1%.
+    """
+    rs = np.random.RandomState(seed)
+    vecs = rs.normal(size=(len(s), 3))
+    vecs *= displacement * rs.uniform(size=(len(s), 1)) / \
+        np.linalg.norm(vecs, axis=1)[:, None]
+    order = rs.permutation(len(s))
+    new = Structure(s.lattice, [s.species_and_occu[i] for i in order],
+                    s.cart_coords[order] + vecs[order],
+                    coords_are_cartesian=True)
+    new.apply_strain(rs.uniform(-0.01, 0.01, 3))
+    return new
+
+
+def check_fit_many():
+    """
+    Compares fit_many and get_rms_dist_many with pairwise fit and
+    get_rms_dist calls. Returns the number of mismatches.
+    """
+    with open(os.path.join(TEST_DIR, "TiO2_entries.json")) as f:
+        structs = [e.structure for e in json.load(f, cls=MontyDecoder)]
+    rs = np.random.RandomState(0)
+    for s in structs[:4]:
+        s = s.copy()
+        s.apply_strain(rs.uniform(-0.05, 0.05, 3))
+        structs.append(s)
+    structs.append(Structure.from_file(os.path.join(TEST_DIR,
+                                                    "POSCAR.Li2O")))
+    nerrors = 0
+    for name, sm in [("default", StructureMatcher()),
+                     ("scale=False", StructureMatcher(scale=False)),
+                     ("attempt_supercell=True",
+                      StructureMatcher(attempt_supercell=True))]:
+        t = time.time()
+        prepared = [sm.prepare(s) for s in structs]
+        for i, ref in enumerate(structs):
+            fits = sm.fit_many(ref, prepared)
+            rms = sm.get_rms_dist_many(ref, prepared)
+            for j, s in enumerate(structs):
+                r = sm.get_rms_dist(ref, s)
+                if fits[j] != sm.fit(ref, s) or (r is None) != \
+                        (rms[j] is None) or (r is not None and
+                                             not np.allclose(r, rms[j])):
+                    print("Mismatch for structures {} and {}".format(i, j))
+                    nerrors += 1
+        print("{:24s} {} pairs checked in {:.1f} s".format(
+            name, len(structs) ** 2, time.time() - t))
+    return nerrors
+
+
+def fits_per_second(func, min_time):
+    n = 0
+    t = time.time()
+    while True:
+        result = func()
+        n += 1
+        elapsed = time.time() - t
+        if elapsed > min_time:
+            return n / elapsed, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-t", "--time", type=float, default=2,
+                        help="Minimum time (in s) each fit is repeated for.")
+    parser.add_argument("-d", "--displacement", type=float, default=0.3,
+                        help="Maximum displacement (in A) of the sites.")
+    parser.add_argument("--check-many", action="store_true",
+                        help="Check fit_many against fit instead of "
+                             "timing fit.")
+    args = parser.parse_args()
+
+    if args.check_many:
+        nerrors = check_fit_many()
+        print("{} mismatches".format(nerrors))
+        raise SystemExit(1 if nerrors else 0)
+
+    sm = StructureMatcher(primitive_cell=False)
+    print("{:28s} {:>6s} {:>14s} {:>14s}".format(
+        "Structure", "Sites", "Match (fit/s)", "Other (fit/s)"))
+    for name, s in get_structures():
+        match = get_distorted(s, args.displacement)
+        other = match.copy()
+        i = [j for j, site in enumerate(other)
+             if site.species_and_occu != other[0].species_and_occu][0]
+        other[0], other[i] = other[i].species_and_occu, \
+            other[0].species_and_occu
+        rates = []
+        for s2, expected in [(match, True), (other, False)]:
+            rate, result = fits_per_second(lambda: sm.fit(s, s2), args.time)
+            if result != expected:
+                print("Warning: fit of {} returned {}".format(name, result))
+            rates.append(rate)
+        print("{:28s} {:6d} {:14.2f} {:14.2f}".format(name, len(s), *rates))
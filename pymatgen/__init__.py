@@ -8,13 +8,84 @@ __author__ = ", ".join(["Shyue Ping Ong", "Anubhav Jain", "Geoffroy Hautier",
 __date__ = "Dec 12 2014"
 __version__ = "3.0.9"
 
+import os as _os
+import sys as _sys
+import types as _types
+import importlib as _importlib
+
 
 # Useful aliases for commonly used objects and modules.
-# Allows from pymatgen import X for quick usage.
-
-from .core import *
-from .serializers.json_coders import pmg_dump, pmg_load
-from .electronic_structure.core import Spin, Orbital
-from .io.smartio import read_structure, write_structure, read_mol, write_mol
-from .matproj.rest import MPRester
-from monty.json import MontyEncoder, MontyDecoder, MSONable
+# Allows from pymatgen import X for quick usage. The aliases are resolved
+# lazily, i.e., the module providing an alias is only imported when the alias
+# is first accessed. This keeps "import pymatgen" cheap for short-lived
+# scripts. Any other public name in pymatgen.core (e.g., Structure, Lattice,
+# the units) is also available as pymatgen.X. __all__ is computed on first
+# access too, so that "from pymatgen import *" still imports all of these.
+
+_ALIASES = {
+    "pmg_dump": "pymatgen.serializers.json_coders",
+    "pmg_load": "pymatgen.serializers.json_coders",
+    "Spin": "pymatgen.electronic_structure.core",
+    "Orbital": "pymatgen.electronic_structure.core",
+    "read_structure": "pymatgen.io.smartio",
+    "write_structure": "pymatgen.io.smartio",
+    "read_mol": "pymatgen.io.smartio",
+    "write_mol": "pymatgen.io.smartio",
+    "MPRester": "pymatgen.matproj.rest",
+    "MontyEncoder": "monty.json",
+    "MontyDecoder": "monty.json",
+    "MSONable": "monty.json",
+}
+
+
+def _is_submodule(name):
+    path = _os.path.join(_os.path.dirname(__file__), name)
+    return _os.path.isfile(path + ".py") or \
+        _os.path.isfile(_os.path.join(path, "__init__.py"))
+
+
+def _get_public_names():
+    core = _importlib.import_module("pymatgen.core")
+    names = getattr(core, "__all__", None)
+    if names is None:
+        names = [n for n in dir(core) if not n.startswith("_")]
+    return sorted(set(list(names) + list(_ALIASES.keys())))
+
+
+class _LazyModule(_types.ModuleType):
+    """
+    Module type that resolves the pymatgen aliases on first access.
+    """
+
+    def __getattr__(self, name):
+        if name == "__all__":
+            value = _get_public_names()
+        elif name.startswith("__"):
+            raise AttributeError(name)
+        elif name in _ALIASES:
+            value = getattr(_importlib.import_module(_ALIASES[name]), name)
+        elif _is_submodule(name):
+            value = _importlib.import_module("pymatgen." + name)
+        else:
+            try:
+                value = getattr(_importlib.import_module("pymatgen.core"),
+                                name)
+            except AttributeError:
+                raise AttributeError("module 'pymatgen' has no attribute "
+                                     "'{}'".format(name))
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(list(self.__dict__.keys()) + _get_public_names()))
+
+
+try:
+    _sys.modules[__name__].__class__ = _LazyModule
+except TypeError:
+    # Module __class__ assignment is only supported from Python 3.5. Fall
+    # back to importing everything eagerly.
+    from .core import *
+    for _name, _module in _ALIASES.items():
+        globals()[_name] = getattr(_importlib.import_module(_module), _name)
+    __all__ = _get_public_names()
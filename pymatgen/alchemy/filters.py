@@ -23,6 +23,7 @@ from pymatgen.core.periodic_table import get_el_sp
 from pymatgen.serializers.json_coders import PMGSONable
 from pymatgen.analysis.structure_matcher import StructureMatcher,\
     ElementComparator
+from pymatgen.analysis.structure_index import StructureIndex
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 
 
@@ -211,7 +212,10 @@ class RemoveExistingFilter(AbstractStructureFilter):
         and symmetry (if symprec is given).
 
         Args:
-            existing_structures: List of existing structures to compare with
+            existing_structures: List of existing structures to compare with,
+                or a StructureIndex of them, e.g., a persistent index of a
+                large database, in which case its own matcher and symprec
+                are used.
             structure_matcher: Provides a structure matcher to be used for
                 structure comparison.
             symprec: The precision in the symmetry finder algorithm if None (
@@ -225,6 +229,10 @@ class RemoveExistingFilter(AbstractStructureFilter):
             self._sm = StructureMatcher.from_dict(structure_matcher)
         else:
             self._sm = structure_matcher
+        self._index = None
+        if isinstance(existing_structures, StructureIndex):
+            self._index = existing_structures
+            self._sm = existing_structures.structure_matcher
 
     def test(self, structure):
 
@@ -232,13 +240,20 @@ class RemoveExistingFilter(AbstractStructureFilter):
             finder = SpacegroupAnalyzer(s, symprec=self._symprec)
             return finder.get_spacegroup_number()
 
-        for s in self._existing_structures:
-            if self._sm._comparator.get_structure_hash(structure) ==\
-                    self._sm._comparator.get_structure_hash(s):
-                if self._symprec is None or \
-                        get_sg(s) == get_sg(structure):
+        if self._sm._supercell or self._sm._subset:
+            for s in self._existing_structures:
+                if self._symprec is None or get_sg(s) == get_sg(structure):
                     if self._sm.fit(s, structure):
                         return False
+        else:
+            #the existing structures are only compared to structures in
+            #their bucket of the index
+            if self._index is None:
+                self._index = StructureIndex(structure_matcher=self._sm,
+                                             symprec=self._symprec)
+                self._index.extend(self._existing_structures)
+            if self._index.get_matches(structure):
+                return False
 
         self._structure_list.append(structure)
         return True
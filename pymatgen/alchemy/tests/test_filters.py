@@ -3,12 +3,14 @@
 from __future__ import unicode_literals
 
 from pymatgen.alchemy.filters import ContainsSpecieFilter, \
-    SpecieProximityFilter, RemoveDuplicatesFilter
+    SpecieProximityFilter, RemoveDuplicatesFilter, RemoveExistingFilter
 from pymatgen.core.lattice import Lattice
 from pymatgen.core.structure import Structure
 from pymatgen.core.periodic_table import Specie
 from pymatgen.alchemy.transmuters import StandardTransmuter
-from pymatgen.analysis.structure_matcher import StructureMatcher
+from pymatgen.analysis.structure_matcher import StructureMatcher, \
+    ElementComparator
+from pymatgen.analysis.structure_index import StructureIndex
 from pymatgen.util.testing import PymatgenTest
 
 from monty.json import MontyDecoder
@@ -105,6 +107,31 @@ class RemoveDuplicatesFilterTest(unittest.TestCase):
         self.assertIsInstance(RemoveDuplicatesFilter().from_dict(d),
                               RemoveDuplicatesFilter)
 
+
+class RemoveExistingFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(test_dir, "TiO2_entries.json"), 'r') as fp:
+            entries = json.load(fp, cls=MontyDecoder)
+        self._struct_list = [e.structure for e in entries]
+        self._sm = StructureMatcher(comparator=ElementComparator())
+
+    def test_filter(self):
+        existing = self._struct_list[:4]
+        new = [s for s in self._struct_list
+               if not any(self._sm.fit(s2, s) for s2 in existing)]
+        index = StructureIndex(structure_matcher=self._sm)
+        index.extend(existing)
+        supercell_sm = StructureMatcher(comparator=ElementComparator(),
+                                        attempt_supercell=True)
+        for fil in [RemoveExistingFilter(existing),
+                    RemoveExistingFilter(index),
+                    RemoveExistingFilter(existing, supercell_sm)]:
+            transmuter = StandardTransmuter.from_structures(self._struct_list)
+            transmuter.apply_filter(fil)
+            self.assertEqual(len(transmuter.transformed_structures),
+                             len(new))
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
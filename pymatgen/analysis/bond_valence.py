@@ -23,7 +23,7 @@ from math import exp, sqrt
 from six.moves import filter
 from six.moves import zip
 
-from monty.serialization import loadfn
+from pymatgen.util.io_utils import loadfn_cached
 
 import six
 
@@ -46,11 +46,11 @@ module_dir = os.path.dirname(os.path.abspath(__file__))
 
 #Read in BV parameters.
 BV_PARAMS = {}
-for k, v in loadfn(os.path.join(module_dir, "bvparam_1991.yaml")).items():
+for k, v in loadfn_cached(os.path.join(module_dir, "bvparam_1991.yaml")).items():
     BV_PARAMS[Element(k)] = v
 
 #Read in yaml containing data-mined ICSD BV data.
-all_data = loadfn(os.path.join(module_dir, "icsd_bv.yaml"))
+all_data = loadfn_cached(os.path.join(module_dir, "icsd_bv.yaml"))
 ICSD_BV_DATA = {Specie.from_string(sp): data
                 for sp, data in all_data["bvsum"].items()}
 PRIOR_PROB = {Specie.from_string(sp): data
@@ -281,10 +281,14 @@ class BVAnalyzer(object):
         #distinct site.
         valences = []
         all_prob = []
+        #Get the neighbors of all symmetrically distinct sites in one pass.
+        test_sites = [sites[0] for sites in equi_sites]
+        all_nn = structure.get_sites_in_spheres(
+            [site.coords for site in test_sites], self.max_radius)
+        all_nn = [[d for d in nn if d[0] != test_site]
+                  for test_site, nn in zip(test_sites, all_nn)]
         if structure.is_ordered:
-            for sites in equi_sites:
-                test_site = sites[0]
-                nn = structure.get_neighbors(test_site, self.max_radius)
+            for test_site, nn in zip(test_sites, all_nn):
                 prob = self._calc_site_probabilities(test_site, nn)
                 all_prob.append(prob)
                 val = list(prob.keys())
@@ -296,9 +300,7 @@ class BVAnalyzer(object):
                                 val)))
         else:
             full_all_prob = []
-            for sites in equi_sites:
-                test_site = sites[0]
-                nn = structure.get_neighbors(test_site, self.max_radius)
+            for test_site, nn in zip(test_sites, all_nn):
                 prob = self._calc_site_probabilities_unordered(test_site, nn)
                 all_prob.append(prob)
                 full_all_prob.extend(prob.values())
@@ -21,6 +21,8 @@ import abc
 
 import six
 
+import numpy as np
+
 from pymatgen.serializers.json_coders import PMGSONable
 from pymatgen.analysis.ewald import EwaldSummation
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
@@ -134,14 +136,11 @@ class IsingModel(EnergyModel):
         self.max_radius = max_radius
 
     def get_energy(self, structure):
-        all_nn = structure.get_all_neighbors(r=self.max_radius)
-        energy = 0
-        for i, nn in enumerate(all_nn):
-            s1 = getattr(structure[i].specie, "spin", 0)
-            for site, dist in nn:
-                energy += self.j * s1 * getattr(site.specie, "spin",
-                                                0) / (dist ** 2)
-        return energy
+        centers, points, images, dists = structure.get_neighbor_list(
+            r=self.max_radius)
+        spins = np.array([getattr(site.specie, "spin", 0)
+                          for site in structure])
+        return np.sum(self.j * spins[centers] * spins[points] / dists ** 2)
 
     def as_dict(self):
         return {"version": __version__,
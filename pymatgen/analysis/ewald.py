@@ -16,12 +16,13 @@ __email__ = "shyuep@gmail.com"
 __status__ = "Production"
 __date__ = "Aug 1 2012"
 
-from math import pi, sqrt, log, exp, erfc, factorial
+from math import pi, sqrt, log, exp, factorial
 from datetime import datetime
 from copy import deepcopy, copy
 import bisect
 
 import numpy as np
+from scipy.special import erfc
 
 from pymatgen.core.physical_constants import ELECTRON_CHARGE, EPSILON_0
 
@@ -291,46 +292,35 @@ class EwaldSummation(object):
 
         If cell is charged a compensating background is added (i.e. a G=0 term)
         """
-        all_nn = self._s.get_all_neighbors(self._rmax, True)
+        centers, points, images, rij = self._s.get_neighbor_list(self._rmax)
 
         forcepf = 2.0 * self._sqrt_eta / sqrt(pi)
         coords = self._coords
         numsites = self._s.num_sites
         ereal = np.zeros((numsites, numsites))
-        epoint = np.zeros(numsites)
         forces = np.zeros((numsites, 3))
-        for i in range(numsites):
-            nn = all_nn[i]  # self._s.get_neighbors(site, self._rmax)
-            num_neighbors = len(nn)
-            qi = self._oxi_states[i]
-            epoint[i] = qi * qi
-            epoint[i] *= -1.0 * sqrt(self._eta / pi)
-            # add jellium term
-            epoint[i] += qi * pi / (2.0 * self._vol * self._eta)
-
-            rij = np.zeros(num_neighbors)
-            qj = np.zeros(num_neighbors)
-            js = np.zeros(num_neighbors)
-            ncoords = np.zeros((num_neighbors, 3))
-
-            for k, (site, dist, j) in enumerate(nn):
-                rij[k] = dist
-                qj[k] = self._oxi_states[j]
-                js[k] = j
-                ncoords[k] = site.coords
-
-            erfcval = np.array([erfc(k) for k in self._sqrt_eta * rij])
-            new_ereals = erfcval * qi * qj / rij
-
-            #insert new_ereals
-            for k, new_e in enumerate(new_ereals):
-                ereal[js[k], i] += new_e
-
-            fijpf = qj / rij ** 3 * (erfcval + forcepf * rij *
-                                     np.exp(-self._eta * rij ** 2))
-            forces[i] += np.sum(np.expand_dims(fijpf, 1) *
-                                (np.array([coords[i]]) - ncoords) *
-                                qi * EwaldSummation.CONV_FACT, axis=0)
+
+        qs = np.array(self._oxi_states)
+        epoint = -qs ** 2 * sqrt(self._eta / pi)
+        # add jellium term
+        epoint += qs * pi / (2.0 * self._vol * self._eta)
+
+        qi = qs[centers]
+        qj = qs[points]
+        ncoords = self._s.lattice.get_cartesian_coords(
+            self._s.frac_coords[points] + images)
+
+        erfcval = erfc(self._sqrt_eta * rij)
+        new_ereals = erfcval * qi * qj / rij
+
+        #insert new_ereals
+        np.add.at(ereal, (points, centers), new_ereals)
+
+        fijpf = qj / rij ** 3 * (erfcval + forcepf * rij *
+                                 np.exp(-self._eta * rij ** 2))
+        np.add.at(forces, centers,
+                  np.expand_dims(fijpf, 1) * (coords[centers] - ncoords) *
+                  np.expand_dims(qi, 1) * EwaldSummation.CONV_FACT)
 
         ereal *= 0.5 * EwaldSummation.CONV_FACT
         epoint *= EwaldSummation.CONV_FACT
@@ -0,0 +1,335 @@
+# coding: utf-8
+
+from __future__ import division, unicode_literals
+
+"""
+This module provides a persistent index of structures, to find the
+duplicates of a structure in a large collection of known structures without
+fitting it to all of them.
+"""
+
+__copyright__ = "Copyright 2014, The Materials Project"
+__version__ = "1.0"
+__date__ = "Oct 16, 2014"
+
+import json
+import sqlite3
+
+import numpy as np
+
+from monty.json import MontyEncoder, MontyDecoder
+
+from pymatgen.core.structure import Structure
+from pymatgen.core.composition import Composition
+from pymatgen.analysis.structure_matcher import StructureMatcher, \
+    PreparedStructure
+from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+
+
+class StructureIndex(object):
+    """
+    An index of structures stored in a sqlite database, which finds the
+    structures that match a given structure with a StructureMatcher.
+
+    Structures are stored as their reduced cells (see
+    StructureMatcher.prepare) in compact array form, bucketed by
+    composition, number of sites in the reduced cell, optionally spacegroup,
+    and the normalized lengths of the reduced lattice. A query only loads
+    the structures in its bucket whose lattices are compatible within the
+    tolerances of the matcher, which are then screened further and fitted
+    with StructureMatcher.fit_many. Structures can be added at any time.
+
+    The reduced cells depend on the primitive_cell setting and the buckets
+    on the comparator of the matcher, which are therefore stored with the
+    index. The tolerances can be changed between sessions.
+
+    .. attribute:: structure_matcher
+
+        StructureMatcher used to find matches.
+
+    .. attribute:: symprec
+
+        Symmetry precision for the spacegroup of the structures, or None if
+        the spacegroup is not used.
+    """
+
+    def __init__(self, filename=":memory:", structure_matcher=None,
+                 symprec=None):
+        """
+        Args:
+            filename (str): sqlite database to store the index in. Existing
+                indices are opened and extended. Defaults to an index in
+                memory.
+            structure_matcher (StructureMatcher): Matcher to use. Supercell
+                and subset matching are not supported. Defaults to the
+                matcher stored with an existing index, or
+                StructureMatcher().
+            symprec (float): If given, matching structures must also have
+                the same spacegroup, determined with this symmetry
+                precision. Defaults to the setting stored with an existing
+                index, or None, meaning the spacegroup is not used.
+        """
+        self._conn = sqlite3.connect(filename)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS settings (
+                name TEXT PRIMARY KEY,
+                value TEXT);
+            CREATE TABLE IF NOT EXISTS structures (
+                id INTEGER PRIMARY KEY,
+                key TEXT,
+                formula TEXT NOT NULL,
+                anonymized_formula TEXT NOT NULL,
+                spacegroup INTEGER,
+                nsites INTEGER NOT NULL,
+                length1 REAL NOT NULL,
+                length2 REAL NOT NULL,
+                length3 REAL NOT NULL,
+                norm REAL NOT NULL,
+                alpha REAL NOT NULL,
+                beta REAL NOT NULL,
+                gamma REAL NOT NULL,
+                lattice BLOB NOT NULL,
+                species TEXT NOT NULL,
+                species_index BLOB NOT NULL,
+                frac_coords BLOB NOT NULL,
+                nn_dists BLOB NOT NULL);
+            CREATE INDEX IF NOT EXISTS formula_index
+                ON structures (formula, nsites, length1);
+            CREATE INDEX IF NOT EXISTS anonymized_formula_index
+                ON structures (anonymized_formula, nsites, length1);
+            """)
+
+        settings = dict(self._conn.execute(
+            "SELECT name, value FROM settings"))
+        if settings:
+            stored = StructureMatcher.from_dict(
+                json.loads(settings["structure_matcher"]))
+            stored_symprec = json.loads(settings["symprec"])
+            if structure_matcher is None:
+                structure_matcher = stored
+            elif structure_matcher._primitive_cell != \
+                    stored._primitive_cell or \
+                    structure_matcher._comparator.as_dict() != \
+                    stored._comparator.as_dict():
+                raise ValueError("The index was built with a matcher with "
+                                 "a different primitive_cell setting or "
+                                 "comparator")
+            if symprec is None:
+                symprec = stored_symprec
+            elif symprec != stored_symprec:
+                raise ValueError("The index was built with symprec = {}"
+                                 .format(stored_symprec))
+        elif structure_matcher is None:
+            structure_matcher = StructureMatcher()
+
+        if structure_matcher._supercell or structure_matcher._subset:
+            raise ValueError("StructureIndex does not support "
+                             "attempt_supercell or allow_subset")
+        self.structure_matcher = structure_matcher
+        self.symprec = symprec
+
+        settings = [("structure_matcher",
+                     json.dumps(structure_matcher.as_dict())),
+                    ("symprec", json.dumps(symprec))]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO settings VALUES (?, ?)", settings)
+
+    def add(self, structure, key=None):
+        """
+        Adds a structure to the index.
+
+        Args:
+            structure (Structure): Structure to add.
+            key (str): Optional key to store with the structure, e.g., a
+                database id.
+
+        Returns:
+            Id of the structure in the index.
+        """
+        return self.extend([structure], None if key is None else [key])[0]
+
+    def extend(self, structures, keys=None):
+        """
+        Adds structures to the index, in a single transaction.
+
+        Args:
+            structures ([Structure]): Structures to add.
+            keys ([str]): Optional keys to store with the structures.
+
+        Returns:
+            List of the ids of the structures in the index.
+        """
+        if keys is None:
+            keys = [None] * len(structures)
+        ids = []
+        with self._conn:
+            for s, key in zip(structures, keys):
+                row = self._get_row(s, key)
+                cursor = self._conn.execute(
+                    "INSERT INTO structures VALUES (NULL, {})".format(
+                        ", ".join("?" * len(row))), row)
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def get_matches(self, structure, anonymous=False):
+        """
+        Finds the structures in the index that match a structure.
+
+        Args:
+            structure (Structure): Structure to find.
+            anonymous (bool): Whether to use anonymous fitting.
+
+        Returns:
+            List of the ids of the matching structures, in the order they
+            were added.
+        """
+        sm = self.structure_matcher
+        prepared = sm.prepare(structure)
+        formula, anonymized_formula = self._get_formulas(
+            prepared.composition)
+        lengths, norm = self._get_lengths(prepared.reduced)
+
+        #the lattice of structure must have a basis within ltol of that of
+        #a match, see StructureMatcher._prefilter.
+        lower = lengths / (1 + sm.ltol + 2e-5)
+        if sm._scale:
+            cond = "length1 >= ? AND length2 >= ? AND length3 >= ?"
+        else:
+            cond = "length1 * norm >= ? AND length2 * norm >= ? " \
+                "AND length3 * norm >= ?"
+            lower *= norm
+        query = "SELECT id, length1, length2, length3, norm, alpha, beta, " \
+            "gamma, nn_dists FROM structures WHERE {} = ? AND nsites = ? " \
+            "AND {}".format("anonymized_formula" if anonymous else "formula",
+                            cond)
+        args = [anonymized_formula if anonymous else formula, len(prepared)]
+        args += [float(x) for x in lower]
+        if self.symprec is not None:
+            query += " AND spacegroup = ?"
+            args.append(self._get_spacegroup(structure))
+        rows = self._conn.execute(query + " ORDER BY id", args).fetchall()
+        if not rows:
+            return []
+
+        #screen the candidates with the rest of the prefilter before the
+        #structures themselves are loaded.
+        lattice = prepared.reduced.lattice
+        norms = np.array([norm] + [row[4] for row in rows])
+        invariants = sm._make_invariants(
+            np.array([lengths] + [row[1:4] for row in rows]) * norms[:, None],
+            np.array([lattice.angles] + [row[5:8] for row in rows]),
+            norms ** 3 * len(prepared),
+            np.array([prepared.nn_dists] + [_from_blob(row[8])
+                                            for row in rows]))
+        valid = sm._prefilter(invariants, 0, np.arange(1, len(rows) + 1))
+        ids = [row[0] for row, v in zip(rows, valid) if v]
+
+        candidates = []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self._conn.execute(
+                "SELECT id, lattice, species, species_index, frac_coords, "
+                "nn_dists FROM structures WHERE id IN ({}) ORDER BY id"
+                .format(", ".join("?" * len(chunk))), chunk).fetchall()
+            candidates.extend(self._get_prepared(row[1:]) for row in rows)
+        fits = sm.fit_many(prepared, candidates, anonymous=anonymous)
+        return [i for i, fit in zip(ids, fits) if fit]
+
+    def get_key(self, i):
+        """
+        Returns the key stored with structure i.
+        """
+        return self._conn.execute("SELECT key FROM structures WHERE id = ?",
+                                  (i,)).fetchone()[0]
+
+    def get_structure(self, i):
+        """
+        Returns the reduced cell of structure i, as stored in the index.
+        """
+        row = self._conn.execute(
+            "SELECT lattice, species, species_index, frac_coords, nn_dists "
+            "FROM structures WHERE id = ?", (i,)).fetchone()
+        return self._get_prepared(row).reduced
+
+    def close(self):
+        """
+        Closes the database.
+        """
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM structures").fetchone()[0]
+
+    def _get_row(self, structure, key):
+        prepared = self.structure_matcher.prepare(structure)
+        s = prepared.reduced
+        formula, anonymized_formula = self._get_formulas(s.composition)
+        lengths, norm = self._get_lengths(s)
+        inds = {}
+        species_index = [inds.setdefault(sp, len(inds))
+                         for sp in s.species_and_occu]
+        table = sorted(inds, key=inds.get)
+        species = json.dumps([list(sp.items()) for sp in table],
+                             cls=MontyEncoder)
+        spacegroup = None if self.symprec is None \
+            else self._get_spacegroup(structure)
+        row = [key, formula, anonymized_formula, spacegroup, len(s)]
+        row += [float(x) for x in lengths] + [float(norm)]
+        row += [float(x) for x in s.lattice.angles]
+        row += [_to_blob(s.lattice.matrix), species,
+                _to_blob(species_index, np.int64), _to_blob(s.frac_coords),
+                _to_blob(prepared.nn_dists)]
+        return row
+
+    def _get_prepared(self, row):
+        lattice, species, species_index, frac_coords, nn_dists = row
+        table = [dict(sp) for sp in json.loads(species, cls=MontyDecoder)]
+        reduced = Structure.from_arrays(
+            _from_blob(lattice).reshape((3, 3)),
+            _from_blob(species_index, np.int64), table,
+            _from_blob(frac_coords).reshape((-1, 3)))
+        return PreparedStructure.from_reduced(
+            reduced, self.structure_matcher._primitive_cell,
+            _from_blob(nn_dists))
+
+    def _get_formulas(self, composition):
+        """
+        Bucket keys of a composition, which are equal for all structures
+        the matcher can match, in normal and anonymous fitting.
+        """
+        h = self.structure_matcher._comparator.get_hash(composition)
+        if isinstance(h, Composition):
+            #comparator hashes are at least as fine as the fractional
+            #element composition
+            frac = composition.element_composition.fractional_composition
+            formula = " ".join("{}{:.6f}".format(el, amt)
+                               for el, amt in sorted(frac.items()))
+        else:
+            formula = str(h)
+        frac = composition.fractional_composition
+        anonymized_formula = " ".join("{:.6f}".format(amt)
+                                      for amt in sorted(frac.values()))
+        return formula, anonymized_formula
+
+    @staticmethod
+    def _get_lengths(s):
+        """
+        Sorted lengths of a reduced lattice, normalized by the cube root of
+        the volume per site, and the normalization.
+        """
+        norm = (s.volume / len(s)) ** (1 / 3)
+        return np.array(sorted(s.lattice.abc)) / norm, norm
+
+    def _get_spacegroup(self, structure):
+        finder = SpacegroupAnalyzer(structure, symprec=self.symprec)
+        return finder.get_spacegroup_number()
+
+
+def _to_blob(array, dtype=np.float64):
+    return sqlite3.Binary(np.ascontiguousarray(array, dtype=dtype))
+
+
+def _from_blob(blob, dtype=np.float64):
+    return np.frombuffer(bytes(blob), dtype=dtype)
@@ -7,7 +7,6 @@ This module provides classes to perform fitting of structures.
 """
 
 import six
-from six.moves import filter
 from six.moves import zip
 
 __author__ = "William Davidson Richards, Stephen Dacek, Shyue Ping Ong"
@@ -20,8 +19,11 @@ __date__ = "Dec 3, 2012"
 
 import numpy as np
 import itertools
+import collections
 import abc
 
+from monty.functools import lazy_property
+
 from pymatgen.serializers.json_coders import PMGSONable
 from pymatgen.core.structure import Structure
 from pymatgen.core.lattice import Lattice
@@ -375,13 +377,15 @@ class StructureMatcher(PMGSONable):
         Yields lattices for s with lengths and angles close to the
         lattice of target_s. If supercell_size is specified, the
         returned lattice will have that number of primitive cells
-        in it
+        in it. The least distorted lattices are yielded first, so that
+        searches which stop at the first match try them first.
 
         Args:
             s, target_s: Structure objects
         """
         lattices = s.lattice.find_all_mappings(
-            target_lattice, ltol = self.ltol, atol=self.angle_tol)
+            target_lattice, ltol=self.ltol, atol=self.angle_tol,
+            sort_by_distortion=True)
         for l, _, scale_m in lattices:
             if abs(abs(np.linalg.det(scale_m)) - supercell_size) < 0.5:
                 yield l, scale_m
@@ -424,33 +428,45 @@ class StructureMatcher(PMGSONable):
                 #reorder generator output so s1 is still first
                 yield x[1], x[0], x[2], x[3]
 
-    def _cmp_fstruct(self, s1, s2, frac_tol, mask):
+    def _cmp_fstruct(self, s1, s2, frac_tol, mask, blocks=None):
         """
         Returns true if a matching exists between s2 and s2
-        under frac_tol. s2 should be a subset of s1
+        under frac_tol. s2 should be a subset of s1. blocks are the
+        independent blocks of mask (see _get_blocks), which are
+        computed from mask if not given.
         """
         if len(s2) > len(s1):
             raise ValueError("s1 must be larger than s2")
         if mask.shape != (len(s2), len(s1)):
             raise ValueError("mask has incorrect shape")
+        if blocks is None:
+            blocks = _get_blocks(mask)
 
         mask_val = 3 * len(s1)
-        #distance from subset to superset
-        dist = s1[None, :] - s2[:, None]
-        dist = abs(dist - np.round(dist))
-
-        dist[dist > frac_tol[None, None, :]] = mask_val
-        cost = np.sum(dist, axis=-1)
-        cost[mask] = mask_val
-
-        #maximin is a lower bound on linear assignment
-        #(and faster to compute)
-        if np.max(np.min(cost, axis=1)) >= mask_val:
-            return False
+        for rows, cols, block_mask in blocks:
+            #distance from subset to superset
+            dist = s1[cols][None, :] - s2[rows][:, None]
+            dist = abs(dist - np.round(dist))
+
+            dist[dist > frac_tol[None, None, :]] = mask_val
+            cost = np.sum(dist, axis=-1)
+            cost[block_mask] = mask_val
+
+            #the row minima, and the column minima if all columns must be
+            #used, are lower bounds on the maximum cost of the assignment
+            #(and faster to compute)
+            valid = cost < mask_val
+            if not np.all(np.any(valid, axis=1)):
+                return False
+            if len(rows) == len(cols) and not np.all(np.any(valid, axis=0)):
+                return False
 
-        return LinearAssignment(cost).min_cost < mask_val
+            solution = _get_assignment(cost)
+            if np.any(cost[np.arange(len(rows)), solution] >= mask_val):
+                return False
+        return True
 
-    def _cart_dists(self, s1, s2, avg_lattice, mask):
+    def _cart_dists(self, s1, s2, avg_lattice, mask, blocks=None):
         """
         Finds a matching in cartesian space. Finds an additional
         fractional translation vector to minimize RMS distance
@@ -461,6 +477,8 @@ class StructureMatcher(PMGSONable):
             avg_lattice: Lattice on which to calculate distances
             mask: numpy array of booleans. mask[i, j] = True indicates
                 that s2[i] cannot be matched to s1[j]
+            blocks: Independent blocks of mask (see _get_blocks).
+                Computed from mask if not given.
 
         Returns:
             Distances from s2 to s1, normalized by (V/Natom) ^ 1/3
@@ -472,15 +490,21 @@ class StructureMatcher(PMGSONable):
         if mask.shape != (len(s2), len(s1)):
             raise ValueError("mask has incorrect shape")
 
+        if blocks is None:
+            blocks = _get_blocks(mask)
+
         norm_length = (avg_lattice.volume / len(s1)) ** (1 / 3)
         mask_val = 1e10 * norm_length * self.stol
-        #vectors are from s2 to s1
-        vecs = pbc_shortest_vectors(avg_lattice, s2, s1)
-        vecs[mask] = mask_val
-        d_2 = np.sum(vecs ** 2, axis=-1)
-        lin = LinearAssignment(d_2)
-        s = lin.solution
-        short_vecs = vecs[np.arange(len(s)), s]
+        s = np.zeros(len(s2), dtype=np.int64)
+        short_vecs = np.zeros((len(s2), 3))
+        for rows, cols, block_mask in blocks:
+            #vectors are from s2 to s1
+            vecs = pbc_shortest_vectors(avg_lattice, s2[rows], s1[cols])
+            vecs[block_mask] = mask_val
+            d_2 = np.sum(vecs ** 2, axis=-1)
+            solution = _get_assignment(d_2)
+            s[rows] = cols[solution]
+            short_vecs[rows] = vecs[np.arange(len(rows)), solution]
         translation = np.average(short_vecs, axis=0)
         f_translation = avg_lattice.get_fractional_coords(translation)
         new_d2 = np.sum((short_vecs - translation) ** 2, axis=-1)
@@ -496,11 +520,13 @@ class StructureMatcher(PMGSONable):
         Returns:
         mask, struct1 translation indices, struct2 translation index
         """
-        mask = np.zeros((len(struct2), len(struct1), fu), dtype=np.bool)
-        for i, site2 in enumerate(struct2):
-            for j, site1 in enumerate(struct1):
-                mask[i, j, :] = not self._comparator.are_equal(
-                    site2.species_and_occu, site1.species_and_occu)
+        #compare each pair of distinct species only once
+        table1, inds1 = _get_species_indices(struct1)
+        table2, inds2 = _get_species_indices(struct2)
+        different = np.array([[not self._comparator.are_equal(sp2, sp1)
+                               for sp1 in table1] for sp2 in table2],
+                             dtype=np.bool)
+        mask = np.repeat(different[inds2][:, inds1][:, :, None], fu, axis=2)
         if s1_supercell:
             mask = mask.reshape((len(struct2), -1))
         else:
@@ -563,35 +589,176 @@ class StructureMatcher(PMGSONable):
         else:
             return match[0], max(match[1])
 
+    def prepare(self, structure):
+        """
+        Reduces a structure once for repeated matching, e.g., with fit_many.
+
+        Args:
+            structure (Structure): Structure to prepare. PreparedStructures
+                are returned as is.
+
+        Returns:
+            PreparedStructure
+        """
+        if isinstance(structure, PreparedStructure):
+            if structure.primitive_cell != self._primitive_cell:
+                raise ValueError("Structure was prepared with a different "
+                                 "primitive_cell setting")
+            return structure
+        return PreparedStructure(structure, self)
+
+    def fit_many(self, reference, candidates, anonymous=False, ncpus=None):
+        """
+        Fits one structure to many, with the same results as
+        [self.fit(reference, c) for c in candidates], or fit_anonymous if
+        anonymous is set. The reference is
+        reduced only once, and the lattice points of its reduced cell are
+        reused for all candidates. Unless attempt_supercell or allow_subset
+        is set, the candidates are screened like in group_structures, so
+        that only those with compatible lattices, volumes and nearest
+        neighbor distances are fitted. Structures that are matched
+        repeatedly can be prepared once with prepare.
+
+        Args:
+            reference (Structure): Structure to fit, or a PreparedStructure.
+            candidates ([Structure]): Structures to fit reference to, or
+                PreparedStructures.
+            anonymous (bool): Whether to use anonymous fitting.
+            ncpus (int): Number of processes used to fit the candidates
+                that pass the screening. Default of None means serial
+                processing.
+
+        Returns:
+            List of True, False or None, as returned by fit (or
+            fit_anonymous) for each candidate.
+        """
+        ref = self.prepare(reference)
+        prepared = [self.prepare(c) for c in candidates]
+        if anonymous:
+            c_hash = lambda c: c.anonymized_formula
+            results = [False] * len(prepared)
+        else:
+            c_hash = self._comparator.get_hash
+            results = [None] * len(prepared)
+        ref_hash = c_hash(ref.composition)
+        inds = []
+        for i, p in enumerate(prepared):
+            if self._subset or c_hash(p.composition) == ref_hash:
+                results[i] = False
+                inds.append(i)
+
+        inds = self._screen(ref, prepared, inds)
+        if ncpus and len(inds) > 1:
+            import multiprocessing as mp
+            pool = mp.Pool(ncpus, _init_worker,
+                           (self, [ref] + [prepared[i] for i in inds],
+                            anonymous))
+            try:
+                chunks = np.array_split(np.arange(1, len(inds) + 1), ncpus)
+                chunks = [c for c in chunks if len(c)]
+                fits = [fit for chunk_fits in pool.map(
+                    _fit_worker, [(0, c) for c in chunks])
+                    for fit in chunk_fits]
+            finally:
+                pool.terminate()
+        else:
+            fits = [self._fit_prepared(ref, prepared[i], anonymous)
+                    for i in inds]
+        for i, fit in zip(inds, fits):
+            results[i] = fit
+        return results
+
+    def get_rms_dist_many(self, reference, candidates):
+        """
+        Calculates the RMS displacement between one structure and many, with
+        the same results as [self.get_rms_dist(reference, c) for c in
+        candidates]. As in fit_many, the reference is reduced only once and
+        the candidates are screened by their lattices and volumes.
+
+        Args:
+            reference (Structure): Reference structure, or a
+                PreparedStructure.
+            candidates ([Structure]): Structures to compare to reference, or
+                PreparedStructures.
+
+        Returns:
+            List of the results of get_rms_dist for each candidate.
+        """
+        ref = self.prepare(reference)
+        prepared = [self.prepare(c) for c in candidates]
+        results = [None] * len(prepared)
+        for i in self._screen(ref, prepared, range(len(prepared)),
+                              use_rms=True):
+            struct1, struct2, fu, s1_supercell = self._get_scaled_structures(
+                ref.reduced, prepared[i].reduced)
+            match = self._match(struct1, struct2, fu, s1_supercell,
+                                use_rms=True, break_on_match=False)
+            if match is not None:
+                results[i] = match[0], max(match[1])
+        return results
+
+    def _screen(self, reference, prepared, inds, use_rms=False):
+        """
+        Returns the indices in inds of the prepared structures that the
+        reference could be matched to, using _prefilter. Nothing is
+        screened out if attempt_supercell or allow_subset is set.
+        """
+        inds = list(inds)
+        if self._supercell or self._subset:
+            return inds
+        inds = [i for i in inds if len(prepared[i]) == len(reference)]
+        if not inds:
+            return inds
+        invariants = self._get_invariants(
+            [reference] + [prepared[i] for i in inds])
+        valid = self._prefilter(invariants, 0, np.arange(1, len(inds) + 1),
+                                use_rms)
+        return [i for i, v in zip(inds, valid) if v]
+
     def _preprocess(self, struct1, struct2, niggli=True):
         """
         Rescales, finds the reduced structures (primitive and niggli),
         and finds fu, the supercell size to make struct1 comparable to
         s2
         """
-        struct1 = Structure.from_sites(struct1)
-        struct2 = Structure.from_sites(struct2)
+        struct1 = self._get_reduced_structure(struct1, niggli)
+        struct2 = self._get_reduced_structure(struct2, niggli)
+        return self._get_scaled_structures(struct1, struct2)
 
+    def _get_reduced_structure(self, struct, niggli=True):
+        """
+        Returns the niggli reduced and, if primitive_cell is set, primitive
+        cell of a structure. This part of the preprocessing does not depend
+        on the structure it is compared to.
+        """
+        struct = Structure.from_sites(struct)
         if niggli:
-            struct1 = struct1.get_reduced_structure(reduction_algo="niggli")
-            struct2 = struct2.get_reduced_structure(reduction_algo="niggli")
+            struct = struct.get_reduced_structure(reduction_algo="niggli")
 
         #primitive cell transformation
         if self._primitive_cell:
-            struct1 = struct1.get_primitive_structure()
-            struct2 = struct2.get_primitive_structure()
+            struct = struct.get_primitive_structure()
+        return struct
 
+    def _get_scaled_structures(self, struct1, struct2):
+        """
+        Finds fu, the supercell size to make struct1 comparable to s2, and
+        rescales a copy of struct2 to the volume of struct1. The lattice of
+        struct1 is kept, so that the lattice points it caches for
+        find_all_mappings are reused when it is fitted to many structures.
+        The matching is invariant to the common scale of both structures.
+        """
         if self._supercell:
             fu, s1_supercell = self._get_supercell_size(struct1, struct2)
         else:
             fu, s1_supercell = 1, True
         mult = fu if s1_supercell else 1/fu
 
+        struct1 = struct1.copy()
+        struct2 = struct2.copy()
         #rescale lattice to same volume
         if self._scale:
-            ratio = (struct2.volume / (struct1.volume * mult)) ** (1 / 6)
-            nl1 = Lattice(struct1.lattice.matrix * ratio)
-            struct1.modify_lattice(nl1)
+            ratio = (struct2.volume / (struct1.volume * mult)) ** (1 / 3)
             nl2 = Lattice(struct2.lattice.matrix / ratio)
             struct2.modify_lattice(nl2)
 
@@ -644,6 +811,8 @@ class StructureMatcher(PMGSONable):
         if LinearAssignment(mask).min_cost > 0:
             return None
 
+        #the mask is the same for all lattices and translations
+        blocks = _get_blocks(mask)
         best_match = None
         #loop over all lattices
         for s1fc, s2fc, avg_l, sc_m in \
@@ -656,9 +825,10 @@ class StructureMatcher(PMGSONable):
             for s1i in s1_t_inds:
                 t = s1fc[s1i] - s2fc[s2_t_ind]
                 t_s2fc = s2fc + t
-                if self._cmp_fstruct(s1fc, t_s2fc, frac_tol, mask):
+                if self._cmp_fstruct(s1fc, t_s2fc, frac_tol, mask, blocks):
                     dist, t_adj, mapping = self._cart_dists(s1fc, t_s2fc,
-                                                            avg_l, mask)
+                                                            avg_l, mask,
+                                                            blocks)
                     if use_rms:
                         val = np.linalg.norm(dist) / len(dist) ** 0.5
                     else:
@@ -673,19 +843,42 @@ class StructureMatcher(PMGSONable):
         if best_match and best_match[0] < self.stol:
             return best_match
 
-    def group_structures(self, s_list, anonymous=False):
+    def group_structures(self, s_list, anonymous=False, ncpus=None):
         """
         Given a list of structures, use fit to group
         them by structural equality.
 
+        Each structure is reduced only once. Unless attempt_supercell is
+        set, structures are further bucketed by the number of sites in
+        their reduced cells, and pairs are only fitted if their lattices,
+        volumes and nearest neighbor distances are compatible within the
+        tolerances (see _prefilter). These checks never reject a pair that
+        fit would accept, so the groups are the same as when fitting all
+        pairs.
+
         Args:
             s_list ([Structure]): List of structures to be grouped
+            anonymous (bool): Whether to use anonymous fitting.
+            ncpus (int): Number of processes to use. The reduced structures
+                are sent to each process once, after which whole buckets or,
+                for buckets too large to balance the load, the fits against
+                each reference are distributed. The groups are identical to
+                those of the serial algorithm. Default of None means serial
+                processing.
 
         Returns:
             A list of lists of matched structures
             Assumption: if s1 == s2 but s1 != s3, than s2 and s3 will be put
             in different groups without comparison.
         """
+        return [[s_list[i] for i in group]
+                for group in self._group_indices(s_list, anonymous, ncpus)]
+
+    def _group_indices(self, s_list, anonymous=False, ncpus=None):
+        """
+        Implementation of group_structures, which returns the groups as
+        lists of indices into s_list.
+        """
         if self._subset:
             raise ValueError("allow_subset cannot be used with"
                              " group_structures")
@@ -695,29 +888,313 @@ class StructureMatcher(PMGSONable):
             c_hash = lambda c: c.anonymized_formula
         else:
             c_hash = self._comparator.get_hash
-        s_hash = lambda s: c_hash(s.composition)
-        sorted_s_list = sorted(s_list, key=s_hash)
-        all_groups = []
+        hashes = [c_hash(s.composition) for s in s_list]
+        order = sorted(range(len(s_list)), key=lambda i: hashes[i])
+        buckets = [list(g) for k, g in
+                   itertools.groupby(order, key=lambda i: hashes[i])]
 
         #For each pre-grouped list of structures, perform actual matching.
-        for k, g in itertools.groupby(sorted_s_list, key=s_hash):
-            unmatched = list(g)
-            while len(unmatched) > 0:
-                ref = unmatched.pop(0)
-                matches = [ref]
-                if anonymous:
-                    inds = filter(lambda i: self.fit_anonymous(ref,
-                            unmatched[i]), list(range(len(unmatched))))
-                else:
-                    inds = filter(lambda i: self.fit(ref, unmatched[i]),
-                                  list(range(len(unmatched))))
-                inds = list(inds)
-                matches.extend([unmatched[i] for i in inds])
-                unmatched = [unmatched[i] for i in range(len(unmatched))
-                             if i not in inds]
-                all_groups.append(matches)
+        if ncpus:
+            bucket_groups = self._group_parallel(s_list, buckets, anonymous,
+                                                 ncpus)
+        else:
+            prepared = [self.prepare(s) for s in s_list]
+            bucket_groups = [
+                [group for sub in self._get_sub_buckets(prepared, inds)
+                 for group in self._group_sub_bucket(prepared, sub,
+                                                     anonymous)]
+                for inds in buckets]
+
+        all_groups = []
+        for groups in bucket_groups:
+            #restore the order in which the groups are found serially
+            all_groups.extend(sorted(groups, key=lambda x: x[0]))
         return all_groups
 
+    def _get_sub_buckets(self, prepared, inds):
+        """
+        Splits a bucket of structures with the same composition hash into
+        the buckets of structures that can match each other, i.e., with
+        the same number of sites in the reduced cell unless
+        attempt_supercell is set.
+        """
+        if self._supercell:
+            return [inds]
+        by_size = collections.OrderedDict()
+        for i in inds:
+            by_size.setdefault(len(prepared[i]), []).append(i)
+        return list(by_size.values())
+
+    def _group_sub_bucket(self, prepared, inds, anonymous=False,
+                          fit_candidates=None):
+        """
+        Greedily groups structures, by fitting the first ungrouped structure
+        to all other ungrouped ones.
+
+        Args:
+            prepared ([PreparedStructure]): Prepared structures.
+            inds ([int]): Indices of the structures in prepared to group,
+                all in the same sub-bucket.
+            anonymous (bool): Whether to use anonymous fitting.
+            fit_candidates: Optional function fit_candidates(ref, indices)
+                returning whether prepared[ref] fits each of the structures
+                at indices, e.g., to distribute the fits. Defaults to
+                fitting them one after another.
+
+        Returns:
+            Groups, as lists of indices into prepared.
+        """
+        if fit_candidates is None:
+            fit_candidates = lambda ref, candidates: [
+                self._fit_prepared(prepared[ref], prepared[i], anonymous)
+                for i in candidates]
+        invariants = None
+        if not self._supercell:
+            invariants = self._get_invariants([prepared[i] for i in inds])
+
+        groups = []
+        unmatched = list(range(len(inds)))
+        while len(unmatched) > 0:
+            ref = unmatched.pop(0)
+            candidates = np.array(unmatched, dtype=np.int64)
+            if invariants is not None and len(candidates):
+                candidates = candidates[self._prefilter(invariants, ref,
+                                                        candidates)]
+            fits = fit_candidates(inds[ref], [inds[i] for i in candidates])
+            matches = set(i for i, fit in zip(candidates, fits) if fit)
+            groups.append([inds[ref]] +
+                          [inds[i] for i in unmatched if i in matches])
+            unmatched = [i for i in unmatched if i not in matches]
+        return groups
+
+    def _group_parallel(self, s_list, buckets, anonymous, ncpus):
+        """
+        Groups the structures in each bucket with a pool of ncpus processes.
+        Sub-buckets larger than an even share of all structures are grouped
+        here, with the fits against each reference spread over the pool.
+        All other sub-buckets are grouped entirely by one of the processes.
+
+        Returns:
+            List of the groups in each bucket, as lists of indices into
+            s_list.
+        """
+        import multiprocessing as mp
+
+        pool = mp.Pool(ncpus, _init_worker, (self, None, anonymous))
+        try:
+            prepared = pool.map(_prepare_worker, s_list)
+        finally:
+            pool.terminate()
+
+        pool = mp.Pool(ncpus, _init_worker, (self, prepared, anonymous))
+
+        def fit_candidates(ref, candidates):
+            chunks = [c for c in np.array_split(candidates, ncpus) if len(c)]
+            fits = pool.map(_fit_worker, [(ref, c) for c in chunks])
+            return [fit for chunk_fits in fits for fit in chunk_fits]
+
+        try:
+            large, pending = [], []
+            for inds in buckets:
+                subs = self._get_sub_buckets(prepared, inds)
+                large.append([sub for sub in subs
+                              if len(sub) * ncpus > len(s_list)])
+                pending.append([pool.apply_async(_group_worker, (sub,))
+                                for sub in subs
+                                if len(sub) * ncpus <= len(s_list)])
+            bucket_groups = []
+            for subs, results in zip(large, pending):
+                groups = []
+                for sub in subs:
+                    groups.extend(self._group_sub_bucket(
+                        prepared, sub, anonymous, fit_candidates))
+                for r in results:
+                    groups.extend(r.get())
+                bucket_groups.append(groups)
+        finally:
+            pool.terminate()
+        return bucket_groups
+
+    def _fit_prepared(self, prepared1, prepared2, anonymous=False):
+        """
+        fit or fit_anonymous for prepared structures, without the
+        composition check.
+        """
+        struct1, struct2, fu, s1_supercell = self._get_scaled_structures(
+            prepared1.reduced, prepared2.reduced)
+        if anonymous:
+            return bool(self._anonymous_match(
+                struct1, struct2, fu, s1_supercell, break_on_match=True,
+                single_match=True))
+        match = self._match(struct1, struct2, fu, s1_supercell,
+                            break_on_match=True)
+        return match is not None and match[0] <= self.stol
+
+    def _get_invariants(self, prepared):
+        """
+        Computes the quantities used by _prefilter for a list of prepared
+        structures with the same number of sites.
+
+        Returns:
+            Dict of arrays, with one row per structure.
+        """
+        lattices = [p.reduced.lattice for p in prepared]
+        return self._make_invariants(
+            np.array([l.abc for l in lattices]),
+            np.array([l.angles for l in lattices]),
+            np.array([l.volume for l in lattices]),
+            np.array([p.nn_dists for p in prepared]))
+
+    def _make_invariants(self, lengths, angles, volumes, nn_dists):
+        """
+        Computes the quantities used by _prefilter from the lattice
+        parameters and sorted nearest neighbor distances of reduced
+        structures with the same number of sites.
+
+        Args:
+            lengths, angles: (n, 3) arrays of the lattice parameters.
+            volumes: Array of the n volumes.
+            nn_dists: (n, nsites) array of the nearest neighbor distances.
+
+        Returns:
+            Dict of arrays, with one row per structure.
+        """
+        lengths = np.sort(lengths, axis=1)
+        norms = (volumes / nn_dists.shape[1]) ** (1 / 3)
+        return {"lengths": lengths, "volumes": volumes, "norms": norms,
+                "nn_dists": nn_dists,
+                "bounds": self._get_distortion_bounds(angles),
+                "volume_bounds": self._get_volume_bounds(lengths, angles)}
+
+    def _prefilter(self, invariants, i, candidates, use_rms=False):
+        """
+        Tests which of the candidate structures could possibly be matched
+        by fitting structure i to them, using the output of _get_invariants.
+        Structure i is struct1 in _match, i.e., a basis of its lattice
+        with lengths and angles within ltol and angle_tol of those of the
+        candidate is sought, and all sites must then be within stol of each
+        other on the average lattice. Pairs are only rejected if no such
+        match can exist. If use_rms is set, only the RMS displacement must
+        be within stol, and only the lattices are compared.
+
+        Returns:
+            Boolean array, True for the candidates that need to be fitted.
+        """
+        eps = 1e-5
+        lengths = invariants["lengths"]
+        volumes = invariants["volumes"]
+        norms = invariants["norms"]
+        nn_dists = invariants["nn_dists"]
+        lo1, hi1, lo2, hi2 = invariants["bounds"][candidates].T
+
+        #the lattice of structure i must have a basis within ltol of that of
+        #the candidate, so its successive minima cannot be much longer.
+        if self._scale:
+            scale = (volumes[candidates] / volumes[i]) ** (1 / 3)
+        else:
+            scale = np.ones(len(candidates))
+        valid = np.all(lengths[i] * scale[:, None] <= (1 + self.ltol + eps) *
+                       lengths[candidates], axis=1)
+
+        if not self._scale:
+            vmin, vmax = invariants["volume_bounds"][candidates].T
+            valid &= (volumes[i] >= vmin * (1 - eps)) & \
+                (volumes[i] <= vmax * (1 + eps))
+
+        if use_rms:
+            return valid
+
+        #nearest neighbor distances change by at most twice the site
+        #tolerance, after accounting for the distortion of both lattices.
+        if self._scale:
+            u = nn_dists[i] / norms[i]
+            w = nn_dists[candidates] / norms[candidates][:, None]
+            slack = 2 * self.stol * np.minimum(hi1, hi2)
+        else:
+            u = nn_dists[i]
+            w = nn_dists[candidates]
+            slack = 2 * self.stol * np.minimum(hi1 * norms[i],
+                                               hi2 * norms[candidates])
+        slack = slack[:, None] * (1 + eps) + eps
+        with np.errstate(invalid="ignore"):
+            too_far = (lo1[:, None] * u - hi2[:, None] * w > slack) | \
+                (lo2[:, None] * w - hi1[:, None] * u > slack)
+        valid &= ~np.any(too_far, axis=1)
+        return valid
+
+    def _get_distortion_bounds(self, angles):
+        """
+        Bounds on how much distances in struct1 and struct2 can be stretched
+        when both are placed on the average lattice in _get_supercells, for
+        any basis of the lattice of struct1 within ltol and angle_tol of the
+        lattice of struct2.
+
+        Args:
+            angles: (n, 3) array of the lattice angles of struct2.
+
+        Returns:
+            (n, 4) array of the scaling factors (min1, max1, min2, max2) for
+            struct1 and struct2.
+        """
+        angles = np.radians(np.reshape(angles, (-1, 3)))
+        ltol = self.ltol
+        atol = np.radians(self.angle_tol)
+        if ltol >= 1:
+            return np.tile([0, np.inf, 0, np.inf], (len(angles), 1))
+        alpha, beta, gamma = angles.T
+        cos = np.ones((len(angles), 3, 3))
+        cos[:, 0, 1] = cos[:, 1, 0] = np.cos(gamma)
+        cos[:, 0, 2] = cos[:, 2, 0] = np.cos(beta)
+        cos[:, 1, 2] = cos[:, 2, 1] = np.cos(alpha)
+        min_eig = np.linalg.eigvalsh(cos)[:, 0]
+        cos = np.abs(cos)
+        diag = np.arange(3)
+
+        def bound(r_min, r_max, cos, min_eig, dt):
+            #|x^T (G' - G) x| <= eta * x^T G x for metric tensors G, G' whose
+            #lengths differ by factors in [r_min, r_max] and angles by at
+            #most dt, where cos bounds the absolute cosines and min_eig the
+            #smallest eigenvalue of the normalized G.
+            d_len = max(r_max ** 2 - 1, 1 - r_min ** 2)
+            b = d_len * (cos + dt) + dt
+            b[:, diag, diag] = d_len
+            with np.errstate(divide="ignore", invalid="ignore"):
+                eta = np.max(np.sum(b, axis=2), axis=1) / min_eig
+                lo = np.where(min_eig > 0, np.maximum(1 - eta, 0) ** 0.5, 0)
+                hi = np.where(min_eig > 0, (1 + eta) ** 0.5, np.inf)
+            return lo, hi
+
+        #average lattice relative to the lattice of struct2
+        min2, max2 = bound(1 - ltol / 2, 1 + ltol / 2, cos, min_eig,
+                           atol / 2)
+        #average lattice relative to the mapped lattice of struct1, whose
+        #angles are only known to within atol
+        min1, max1 = bound((1 + 1 / (1 + ltol)) / 2, (1 + 1 / (1 - ltol)) / 2,
+                           np.minimum(cos + atol, 1), min_eig - 2 * atol,
+                           atol / 2)
+        return np.column_stack([min1, max1, min2, max2])
+
+    def _get_volume_bounds(self, lengths, angles):
+        """
+        Range of volumes of any lattices with a basis within ltol and
+        angle_tol of lattices with the given (n, 3) arrays of lengths and
+        angles.
+
+        Returns:
+            (n, 2) array of the minimum and maximum volumes.
+        """
+        abc = np.prod(np.reshape(lengths, (-1, 3)), axis=1)
+        angles = np.radians(np.reshape(angles, (-1, 3)))
+        atol = np.radians(self.angle_tol)
+        #the squared volume factor is concave in each cosine, so its minimum
+        #is at one of the corners of the range of angles.
+        corners = np.array(list(itertools.product([-1, 1], repeat=3)))
+        cos = np.cos(np.clip(angles[:, None, :] + corners * atol, 0, np.pi))
+        f2 = 1 - np.sum(cos ** 2, axis=2) + 2 * np.prod(cos, axis=2)
+        f_min = np.maximum(np.min(f2, axis=1), 0) ** 0.5
+        return np.column_stack([max(1 - self.ltol, 0) ** 3 * abc * f_min,
+                                (1 + self.ltol) ** 3 * abc])
+
     def as_dict(self):
         return {"version": __version__, "@module": self.__class__.__module__,
                 "@class": self.__class__.__name__,
@@ -1016,3 +1493,159 @@ class StructureMatcher(PMGSONable):
             return None
 
         return match[4]
+
+
+class PreparedStructure(object):
+    """
+    A structure reduced once for repeated matching with a StructureMatcher,
+    e.g., with StructureMatcher.fit_many. The reduced cell is kept together
+    with the nearest neighbor distances used to screen candidate matches.
+    The lattice of the reduced cell caches the lattice points searched when
+    mapping it onto other lattices, so that a prepared reference does not
+    repeat that work for every candidate.
+
+    Prepared structures are created with StructureMatcher.prepare, and can
+    be used with any StructureMatcher with the same primitive_cell setting.
+    """
+
+    def __init__(self, structure, matcher):
+        """
+        Args:
+            structure (Structure): Structure to prepare.
+            matcher (StructureMatcher): Matcher whose reduction is used.
+        """
+        self.primitive_cell = matcher._primitive_cell
+        self.reduced = matcher._get_reduced_structure(structure)
+
+    @classmethod
+    def from_reduced(cls, reduced, primitive_cell, nn_dists=None):
+        """
+        Creates a PreparedStructure from a structure that has already been
+        reduced, e.g., one restored from a StructureIndex.
+
+        Args:
+            reduced (Structure): The reduced attribute of a
+                PreparedStructure.
+            primitive_cell (bool): primitive_cell setting of the matcher
+                that reduced the structure.
+            nn_dists (array): Optional nearest neighbor distances, if
+                known.
+        """
+        prepared = cls.__new__(cls)
+        prepared.primitive_cell = primitive_cell
+        prepared.reduced = reduced
+        if nn_dists is not None:
+            prepared.nn_dists = np.asarray(nn_dists)
+        return prepared
+
+    @property
+    def composition(self):
+        """
+        Composition of the reduced structure.
+        """
+        return self.reduced.composition
+
+    def __len__(self):
+        return len(self.reduced)
+
+    @lazy_property
+    def nn_dists(self):
+        """
+        Sorted distance from each site of the reduced structure to its
+        nearest neighbor, including periodic images of itself.
+        """
+        s = self.reduced
+        r = min(s.lattice.abc) * (1 + 1e-6)
+        centers, points, images, dists = s.get_neighbor_list(
+            r, numerical_tol=None)
+        other = (centers != points) | np.any(images != 0, axis=1)
+        nn = np.ones(len(s)) * r
+        np.minimum.at(nn, centers[other], dists[other])
+        return np.sort(nn)
+
+
+def _get_species_indices(struct):
+    """
+    Returns the distinct species and occupancies of a structure, and the
+    index into them of the species of each site.
+    """
+    table = {}
+    inds = [table.setdefault(sp, len(table))
+            for sp in struct.species_and_occu]
+    return sorted(table, key=table.get), np.array(inds, dtype=np.int64)
+
+
+def _get_blocks(mask):
+    """
+    Splits a mask into independent blocks. Sites in different blocks can
+    never be matched, so the assignment problem separates into one smaller
+    problem per block. With the usual comparators, the blocks are the sets
+    of sites with equivalent species.
+
+    Args:
+        mask: numpy array of booleans. mask[i, j] = True indicates that
+            row i cannot be assigned to column j.
+
+    Returns:
+        List of (rows, columns, block mask) tuples. A single block of
+        all rows and columns is returned if the mask does not separate.
+    """
+    blocks = []
+    used = np.zeros(mask.shape[1], dtype=np.bool)
+    todo = np.ones(mask.shape[0], dtype=np.bool)
+    while np.any(todo):
+        i = np.argmax(todo)
+        rows = np.where(np.all(mask == mask[i], axis=1))[0]
+        cols = np.where(np.invert(mask[i]))[0]
+        if len(rows) > len(cols) or np.any(used[cols]):
+            return [(np.arange(mask.shape[0]), np.arange(mask.shape[1]),
+                     mask)]
+        todo[rows] = False
+        used[cols] = True
+        blocks.append((rows, cols, mask[rows][:, cols]))
+    return blocks
+
+
+def _get_assignment(cost):
+    """
+    Returns the minimum cost assignment of the rows of cost to its
+    columns. The sum of the row minima is a lower bound on the cost of any
+    assignment, so when the cheapest columns of the rows are all distinct
+    they are the solution, and no linear assignment needs to be solved.
+    """
+    solution = np.argmin(cost, axis=1)
+    if np.max(np.bincount(solution)) == 1:
+        return solution
+    return LinearAssignment(cost).solution
+
+
+_worker_data = {}
+
+
+def _init_worker(matcher, prepared, anonymous):
+    """
+    Stores the data shared by all tasks in a process of the pools used by
+    StructureMatcher.group_structures and fit_many, so that it is only sent
+    once.
+    """
+    _worker_data["matcher"] = matcher
+    _worker_data["prepared"] = prepared
+    _worker_data["anonymous"] = anonymous
+
+
+def _prepare_worker(structure):
+    return _worker_data["matcher"].prepare(structure)
+
+
+def _group_worker(inds):
+    return _worker_data["matcher"]._group_sub_bucket(
+        _worker_data["prepared"], inds, _worker_data["anonymous"])
+
+
+def _fit_worker(args):
+    ref, candidates = args
+    matcher = _worker_data["matcher"]
+    prepared = _worker_data["prepared"]
+    return [matcher._fit_prepared(prepared[ref], prepared[i],
+                                  _worker_data["anonymous"])
+            for i in candidates]
@@ -0,0 +1,94 @@
+# coding: utf-8
+
+from __future__ import division, unicode_literals
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+
+from pymatgen.analysis.structure_index import StructureIndex
+from pymatgen.analysis.structure_matcher import StructureMatcher, \
+    ElementComparator
+from monty.json import MontyDecoder
+from pymatgen.core import Structure, Specie
+from pymatgen.util.testing import PymatgenTest
+
+test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
+                        'test_files')
+
+
+class StructureIndexTest(PymatgenTest):
+
+    def setUp(self):
+        with open(os.path.join(test_dir, "TiO2_entries.json"), 'r') as fp:
+            entries = json.load(fp, cls=MontyDecoder)
+        self.struct_list = [e.structure for e in entries]
+        np.random.seed(0)
+        self.strained = []
+        for s in self.struct_list:
+            s = s.copy()
+            s.apply_strain(np.random.uniform(-0.05, 0.05, 3))
+            self.strained.append(s)
+
+    def test_get_matches(self):
+        li2o = Structure.from_file(os.path.join(test_dir, "POSCAR.Li2O"))
+        for sm in [StructureMatcher(), StructureMatcher(scale=False),
+                   StructureMatcher(comparator=ElementComparator())]:
+            index = StructureIndex(structure_matcher=sm)
+            ids = index.extend(self.struct_list,
+                               keys=[str(i) for i in
+                                     range(len(self.struct_list))])
+            index.add(li2o)
+            self.assertEqual(len(index), len(self.struct_list) + 1)
+            for s in self.strained + [li2o]:
+                matches = [int(index.get_key(i))
+                           for i in index.get_matches(s)
+                           if index.get_key(i) is not None]
+                self.assertEqual(matches,
+                                 [i for i, s2 in enumerate(self.struct_list)
+                                  if sm.fit(s, s2)])
+            s = index.get_structure(ids[0])
+            self.assertTrue(sm.fit(s, self.struct_list[0]))
+
+        li2o_oxi = li2o.copy()
+        li2o_oxi.add_oxidation_state_by_element({"Li": 1, "O": -2})
+        index = StructureIndex()
+        i = index.add(li2o_oxi)
+        self.assertEqual(index.get_structure(i)[0].specie, Specie("Li", 1))
+        self.assertEqual(index.get_matches(li2o_oxi), [i])
+        self.assertEqual(index.get_matches(li2o), [])
+        self.assertEqual(index.get_matches(li2o, anonymous=True), [i])
+
+    def test_persistence(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, "index.sqlite")
+            sm = StructureMatcher(comparator=ElementComparator())
+            index = StructureIndex(filename, sm)
+            index.extend(self.struct_list[:5])
+            index.close()
+
+            index = StructureIndex(filename)
+            self.assertEqual(index.structure_matcher.as_dict(), sm.as_dict())
+            index.extend(self.struct_list[5:])
+            self.assertEqual(len(index), len(self.struct_list))
+            self.assertEqual(index.get_matches(self.struct_list[0]),
+                             index.get_matches(self.strained[0]))
+            index.close()
+
+            self.assertRaises(ValueError, StructureIndex, filename,
+                              StructureMatcher())
+            self.assertRaises(ValueError, StructureIndex, filename,
+                              symprec=0.1)
+        finally:
+            shutil.rmtree(tmp_dir)
+        self.assertRaises(ValueError, StructureIndex,
+                          structure_matcher=StructureMatcher(
+                              attempt_supercell=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,8 @@ import json
 import numpy as np
 
 from pymatgen.analysis.structure_matcher import StructureMatcher, \
-    ElementComparator, FrameworkComparator, OrderDisorderElementComparator
+    ElementComparator, FrameworkComparator, OrderDisorderElementComparator, \
+    _get_blocks
 from monty.json import MontyDecoder
 from pymatgen.core.operations import SymmOp
 from pymatgen.core import Structure, Element, Lattice
@@ -72,6 +73,12 @@ class StructureMatcherTest(PymatgenTest):
         self.assertFalse(sm._cmp_fstruct(s1, s2, frac_tol, mask2))
         self.assertFalse(sm._cmp_fstruct(s1, s3, frac_tol, mask3))
 
+        #blocks that can each be matched
+        s4 = np.array([[0.41, 0.52, 0.63], [0.11, 0.22, 0.33]])
+        mask4 = np.array([[True, False], [False, True]])
+        self.assertTrue(sm._cmp_fstruct(s1, s4, frac_tol, mask4))
+        self.assertFalse(sm._cmp_fstruct(s1, s4, frac_tol, ~mask4))
+
     def test_cart_dists(self):
         sm = StructureMatcher()
         l = Lattice.orthorhombic(1, 2, 3)
@@ -165,6 +172,26 @@ class StructureMatcherTest(PymatgenTest):
         self.assertTrue(i == 1)
         self.assertTrue(np.allclose(inds, [0, 2]))
 
+    def test_get_blocks(self):
+        mask = np.array([[1, 0, 1, 0, 0],
+                         [0, 1, 0, 1, 1],
+                         [1, 0, 1, 0, 0]], dtype=np.bool)
+        blocks = _get_blocks(mask)
+        self.assertEqual(len(blocks), 2)
+        self.assertArrayEqual(blocks[0][0], [0, 2])
+        self.assertArrayEqual(blocks[0][1], [1, 3, 4])
+        self.assertArrayEqual(blocks[1][0], [1])
+        self.assertArrayEqual(blocks[1][1], [0, 2])
+        for rows, cols, block_mask in blocks:
+            self.assertFalse(np.any(block_mask))
+
+        #masks that do not separate give a single block
+        for mask in [[[0, 0], [0, 1]], [[0, 1], [0, 1]]]:
+            mask = np.array(mask, dtype=np.bool)
+            blocks = _get_blocks(mask)
+            self.assertEqual(len(blocks), 1)
+            self.assertArrayEqual(blocks[0][2], mask)
+
     def test_get_supercells(self):
         sm = StructureMatcher(comparator=ElementComparator())
         l = Lattice.cubic(1)
@@ -264,6 +291,11 @@ class StructureMatcherTest(PymatgenTest):
         out = sm.group_structures(self.struct_list)
         self.assertEqual(list(map(len, out)), [4, 1, 1, 1, 1, 1, 1, 1, 2, 2, 1])
         self.assertEqual(sum(map(len, out)), len(self.struct_list))
+        # Parallel grouping gives exactly the same groups, with whole
+        # buckets or the fits to each reference sent to the processes.
+        self.assertEqual(sm.group_structures(self.struct_list, ncpus=2), out)
+        self.assertEqual(sm.group_structures(self.struct_list * 3, ncpus=2),
+                         sm.group_structures(self.struct_list * 3))
         for s in self.struct_list[::2]:
             s.replace_species({'Ti': 'Zr', 'O':'Ti'})
         out = sm.group_structures(self.struct_list, anonymous=True)
@@ -665,6 +697,67 @@ class StructureMatcherTest(PymatgenTest):
         self.assertEqual(sm.fit_anonymous(s1, s2), False)
         self.assertEqual(sm.get_mapping(s1, s2), None)
 
+    def test_prefilter(self):
+        # The prefilter must never reject a pair that fits.
+        np.random.seed(0)
+        structs = []
+        for s in self.struct_list[:6]:
+            s = s.copy()
+            s.apply_strain(np.random.uniform(-0.1, 0.1, 3))
+            structs.append(s)
+        for sm in [StructureMatcher(), StructureMatcher(scale=False),
+                   StructureMatcher(ltol=0.05, stol=0.1, angle_tol=2)]:
+            prepared = [sm.prepare(s) for s in self.struct_list + structs]
+            nsites = len(prepared[0])
+            prepared = [p for p in prepared if len(p) == nsites]
+            invariants = sm._get_invariants(prepared)
+            rejected = 0
+            for i in range(len(prepared)):
+                valid = sm._prefilter(invariants, i,
+                                      np.arange(len(prepared)))
+                self.assertTrue(valid[i])
+                for j in np.where(~valid)[0]:
+                    self.assertFalse(sm._fit_prepared(prepared[i],
+                                                      prepared[j]))
+                rejected += np.sum(~valid)
+            self.assertGreater(rejected, 0)
+
+        sm = StructureMatcher(scale=False)
+        groups = sm.group_structures(self.struct_list + structs)
+        self.assertEqual(sum(map(len, groups)), len(self.struct_list) + 6)
+        for g in groups:
+            for s in g[1:]:
+                self.assertTrue(sm.fit(g[0], s))
+
+    def test_fit_many(self):
+        #An exhaustive comparison over several matchers is done by
+        #dev_scripts/benchmark_structure_matcher.py --check-many.
+        np.random.seed(0)
+        structs = list(self.struct_list[:6])
+        s = structs[0].copy()
+        s.apply_strain(np.random.uniform(-0.05, 0.05, 3))
+        structs.append(s)
+        structs.append(self.oxi_structs[0])
+        sm = StructureMatcher()
+        prepared = [sm.prepare(s) for s in structs]
+        self.assertIs(sm.prepare(prepared[0]), prepared[0])
+        for ref in [structs[0], structs[-2], structs[-1]]:
+            fits = sm.fit_many(ref, structs)
+            self.assertEqual(fits, [sm.fit(ref, s) for s in structs])
+            self.assertEqual(sm.fit_many(ref, prepared), fits)
+            rms = sm.get_rms_dist_many(ref, prepared)
+            for s, r in zip(structs, rms):
+                r2 = sm.get_rms_dist(ref, s)
+                if r2 is None:
+                    self.assertIsNone(r)
+                else:
+                    self.assertArrayAlmostEqual(r, r2)
+        self.assertTrue(any(fits) and not all(fits))
+        self.assertEqual(sm.fit_many(structs[0], structs, ncpus=2),
+                         sm.fit_many(structs[0], structs))
+        self.assertRaises(ValueError,
+                          StructureMatcher(primitive_cell=False).fit_many,
+                          prepared[0], prepared)
 
 if __name__ == '__main__':
     unittest.main()
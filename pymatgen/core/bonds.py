@@ -17,21 +17,20 @@ __date__ = "Jul 26, 2012"
 
 
 import os
-import json
 import collections
 
 from pymatgen.core.periodic_table import get_el_sp
+from pymatgen.util.io_utils import loadfn_cached
 
 
 def _load_bond_length_data():
     """Loads bond length data from json file"""
-    with open(os.path.join(os.path.dirname(__file__),
-                           "bond_lengths.json")) as f:
-        data = collections.defaultdict(dict)
-        for row in json.load(f):
-            els = sorted(row['elements'])
-            data[tuple(els)][row['bond_order']] = row['length']
-        return data
+    data = collections.defaultdict(dict)
+    for row in loadfn_cached(os.path.join(os.path.dirname(__file__),
+                                          "bond_lengths.json")):
+        els = sorted(row['elements'])
+        data[tuple(els)][row['bond_order']] = row['length']
+    return data
 
 bond_lengths = _load_bond_length_data()
 
@@ -4,7 +4,8 @@ from __future__ import division, unicode_literals
 
 """
 This module implements a Composition class to represent compositions,
-and a ChemicalPotential class to represent potentials.
+a CompositionMatrix class to represent many compositions as an array, and a
+ChemicalPotential class to represent potentials.
 """
 
 __author__ = "Shyue Ping Ong"
@@ -21,15 +22,17 @@ import re
 import string
 
 import six
+import numpy as np
 from six.moves import filter, map, zip
 
 from fractions import gcd
 from functools import total_ordering
 from itertools import chain
+from monty.functools import lru_cache, lazy_property
 from pymatgen.core.periodic_table import get_el_sp, Element
 from pymatgen.util.string_utils import formula_double_format
 from pymatgen.serializers.json_coders import PMGSONable
-from pymatgen.core.units import unitized
+from pymatgen.core.units import unitized, MassArray
 
 
 @total_ordering
@@ -37,7 +40,9 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
     """
     Represents a Composition, which is essentially a {element:amount} mapping
     type. Composition is written to be immutable and hashable,
-    unlike a standard Python dict.
+    unlike a standard Python dict. Derived quantities such as the formulas,
+    reduced composition and weight are therefore computed once on first
+    access and cached.
 
     Note that the key can be either an Element or a Specie. Elements and Specie
     are treated differently. i.e., a Fe2+ is not the same as a Fe3+ Specie and
@@ -203,10 +208,11 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
         Minimally effective hash function that just distinguishes between
         Compositions with different elements.
         """
-        hashcode = 0
-        for el in self._elmap.keys():
-            hashcode += el.Z
-        return hashcode
+        return self._hash
+
+    @lazy_property
+    def _hash(self):
+        return sum(el.Z for el in self._elmap.keys())
 
     def __contains__(self, el):
         return el in self._elmap
@@ -217,7 +223,7 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
     def __iter__(self):
         return self._elmap.__iter__()
 
-    @property
+    @lazy_property
     def average_electroneg(self):
         return sum((el.X * abs(amt) for el, amt in self._elmap.items())) / \
             self.num_atoms
@@ -250,7 +256,7 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
     def copy(self):
         return Composition(self._elmap, allow_negative=self.allow_negative)
 
-    @property
+    @lazy_property
     def formula(self):
         """
         Returns a formula string, with elements sorted by electronegativity,
@@ -261,7 +267,7 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
         formula = [s + formula_double_format(sym_amt[s], False) for s in syms]
         return " ".join(formula)
 
-    @property
+    @lazy_property
     def alphabetical_formula(self):
         """
         Returns a formula string, with elements sorted by alphabetically
@@ -272,7 +278,7 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
         formula = [s + formula_double_format(sym_amt[s], False) for s in syms]
         return " ".join(formula)
 
-    @property
+    @lazy_property
     def element_composition(self):
         """
         Returns the composition replacing any species by the corresponding
@@ -281,7 +287,7 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
         return Composition(self.get_el_amt_dict(),
                            allow_negative=self.allow_negative)
 
-    @property
+    @lazy_property
     def fractional_composition(self):
         """
         Returns the normalized composition which the number of species sum to
@@ -292,7 +298,7 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
         """
         return self / self._natoms
 
-    @property
+    @lazy_property
     def reduced_composition(self):
         """
         Returns the reduced composition,i.e. amounts normalized by greatest
@@ -309,6 +315,10 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
             A normalized composition and a multiplicative factor, i.e.,
             Li4Fe4P4O16 returns (Composition("LiFePO4"), 4).
         """
+        return self._reduced_composition_and_factor
+
+    @lazy_property
+    def _reduced_composition_and_factor(self):
         factor = self.get_reduced_formula_and_factor()[1]
         return self / factor, factor
 
@@ -320,6 +330,10 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
             A pretty normalized formula and a multiplicative factor, i.e.,
             Li4Fe4P4O16 returns (LiFePO4, 4).
         """
+        return self._reduced_formula_and_factor
+
+    @lazy_property
+    def _reduced_formula_and_factor(self):
         all_int = all([x == int(x) for x in self._elmap.values()])
         if not all_int:
             return self.formula.replace(" ", ""), 1
@@ -332,7 +346,7 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
 
         return formula, factor
 
-    @property
+    @lazy_property
     def reduced_formula(self):
         """
         Returns a pretty normalized formula, i.e., LiFePO4 instead of
@@ -360,7 +374,7 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
         """
         return self._natoms
 
-    @property
+    @lazy_property
     @unitized("amu")
     def weight(self):
         """
@@ -401,32 +415,9 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
         Returns:
             Composition with that formula.
         """
-        def get_sym_dict(f, factor):
-            sym_dict = collections.defaultdict(float)
-            for m in re.finditer(r"([A-Z][a-z]*)([-*\.\d]*)", f):
-                el = m.group(1)
-                amt = 1
-                if m.group(2).strip() != "":
-                    amt = float(m.group(2))
-                sym_dict[el] += amt * factor
-                f = f.replace(m.group(), "", 1)
-            if f.strip():
-                raise CompositionError("{} is an invalid formula!".format(f))
-            return sym_dict
-
-        m = re.search(r"\(([^\(\)]+)\)([\.\d]*)", formula)
-        if m:
-            factor = 1
-            if m.group(2) != "":
-                factor = float(m.group(2))
-            unit_sym_dict = get_sym_dict(m.group(1), factor)
-            expanded_sym = "".join(["{}{}".format(el, amt)
-                                    for el, amt in unit_sym_dict.items()])
-            expanded_formula = formula.replace(m.group(), expanded_sym)
-            return self._parse_formula(expanded_formula)
-        return get_sym_dict(formula, 1)
+        return dict(_parse_formula(formula))
 
-    @property
+    @lazy_property
     def anonymized_formula(self):
         """
         An anonymized formula. Unique species are arranged in ordering of
@@ -709,6 +700,45 @@ class Composition(collections.Mapping, collections.Hashable, PMGSONable):
                         yield match
 
 
+@lru_cache(maxsize=4096)
+def _parse_formula(formula):
+    """
+    Parses a string formula into (symbol, amount) pairs. The result is
+    memoized since the same formulas are typically parsed over and over, e.g.,
+    when reading in large numbers of entries.
+
+    Args:
+        formula (str): A string formula, e.g. Fe2O3, Li3Fe2(PO4)3
+
+    Returns:
+        Tuple of (symbol, amount) pairs.
+    """
+    def get_sym_dict(f, factor):
+        sym_dict = collections.defaultdict(float)
+        for m in re.finditer(r"([A-Z][a-z]*)([-*\.\d]*)", f):
+            el = m.group(1)
+            amt = 1
+            if m.group(2).strip() != "":
+                amt = float(m.group(2))
+            sym_dict[el] += amt * factor
+            f = f.replace(m.group(), "", 1)
+        if f.strip():
+            raise CompositionError("{} is an invalid formula!".format(f))
+        return sym_dict
+
+    m = re.search(r"\(([^\(\)]+)\)([\.\d]*)", formula)
+    if m:
+        factor = 1
+        if m.group(2) != "":
+            factor = float(m.group(2))
+        unit_sym_dict = get_sym_dict(m.group(1), factor)
+        expanded_sym = "".join(["{}{}".format(el, amt)
+                                for el, amt in unit_sym_dict.items()])
+        expanded_formula = formula.replace(m.group(), expanded_sym)
+        return _parse_formula(expanded_formula)
+    return tuple(get_sym_dict(formula, 1).items())
+
+
 def reduce_formula(sym_amt):
     """
     Helper method to reduce a sym_amt dict to a reduced formula and factor.
@@ -822,6 +852,325 @@ class ChemicalPotential(dict, PMGSONable):
     def __repr__(self):
         return "ChemPots: " + super(ChemicalPotential, self).__repr__()
 
+class CompositionMatrix(object):
+    """
+    A batched representation of many compositions as a K x n_elements array
+    of amounts, with a shared list of elements indexing the columns. Useful
+    for the phase diagram, compatibility and battery code, which otherwise
+    loop over Composition objects element by element. Operations such as
+    normalization, reduction and weights are vectorized over all rows.
+
+    The matrix can either be a dense numpy array or a scipy.sparse csr_matrix,
+    which is preferable when the compositions span many elements but each
+    contains only a few.
+
+    >>> cm = CompositionMatrix.from_compositions(["LiFePO4", "Fe2O3"])
+    >>> cm.num_atoms
+    array([ 7.,  5.])
+    """
+
+    def __init__(self, matrix, elements, num_atoms=None):
+        """
+        Args:
+            matrix: K x n_elements array (or scipy.sparse matrix) of amounts.
+            elements ([Element/Specie]): Elements or species for the columns
+                of the matrix.
+            num_atoms: Optional array of K total number of atoms. Defaults to
+                the row sums of the absolute amounts. This can be set so that
+                fractions remain relative to the full composition when only a
+                subset of the elements is retained in the matrix.
+        """
+        self.elements = [get_el_sp(el) for el in elements]
+        self.is_sparse = _is_sparse(matrix)
+        if self.is_sparse:
+            self.matrix = matrix.tocsr().astype(float)
+        else:
+            self.matrix = np.array(matrix, dtype=float)
+        if self.matrix.shape[1] != len(self.elements):
+            raise CompositionError("Matrix has {} columns but {} elements "
+                                   "were given!".format(self.matrix.shape[1],
+                                                        len(self.elements)))
+        if num_atoms is None:
+            num_atoms = _row_sums(abs(self.matrix))
+        self.num_atoms = np.array(num_atoms, dtype=float)
+        self._el_index = {el: i for i, el in enumerate(self.elements)}
+
+    @classmethod
+    def from_compositions(cls, compositions, elements=None, sparse=False):
+        """
+        Creates a CompositionMatrix from a sequence of compositions.
+
+        Args:
+            compositions: Sequence of Composition objects or anything that
+                can be used to create one, e.g., formula strings or dicts.
+            elements ([Element/Specie]): Elements for the columns. Amounts of
+                any other element are dropped, but the number of atoms (and
+                hence fractions) still refers to the full composition. If None,
+                all elements present in the compositions are used, sorted by
+                electronegativity.
+            sparse (bool): Whether to store the amounts as a scipy.sparse
+                csr_matrix instead of a dense array.
+
+        Returns:
+            CompositionMatrix
+        """
+        comps = [c if isinstance(c, Composition) else Composition(c)
+                 for c in compositions]
+        if elements is None:
+            elements = sorted(set(chain.from_iterable(comps)))
+        elements = [get_el_sp(el) for el in elements]
+        index = {el: i for i, el in enumerate(elements)}
+        rows, cols, amts = [], [], []
+        for i, comp in enumerate(comps):
+            for el, amt in comp.items():
+                j = index.get(el)
+                if j is not None:
+                    rows.append(i)
+                    cols.append(j)
+                    amts.append(amt)
+        shape = (len(comps), len(elements))
+        if sparse:
+            from scipy.sparse import csr_matrix
+            matrix = csr_matrix((amts, (rows, cols)), shape=shape)
+        else:
+            matrix = np.zeros(shape)
+            matrix[rows, cols] = amts
+        return cls(matrix, elements,
+                   num_atoms=[comp.num_atoms for comp in comps])
+
+    @classmethod
+    def from_entries(cls, entries, elements=None, sparse=False):
+        """
+        Creates a CompositionMatrix from the compositions of a sequence of
+        entries, e.g., PDEntry or ComputedEntry objects.
+
+        Args:
+            entries: Sequence of entries having a composition attribute.
+            elements ([Element/Specie]): Elements for the columns. See
+                from_compositions.
+            sparse (bool): Whether to use a sparse matrix.
+
+        Returns:
+            CompositionMatrix
+        """
+        return cls.from_compositions([e.composition for e in entries],
+                                     elements=elements, sparse=sparse)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def __getitem__(self, i):
+        return self.get_composition(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get_composition(i)
+
+    def __repr__(self):
+        return "CompositionMatrix: {} compositions of {}".format(
+            len(self), " ".join([str(el) for el in self.elements]))
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def toarray(self):
+        """
+        Returns:
+            The amounts as a dense K x n_elements numpy array.
+        """
+        return self.matrix.toarray() if self.is_sparse else self.matrix
+
+    def get_composition(self, i):
+        """
+        Returns the i-th row of the matrix as a Composition.
+        """
+        if self.is_sparse:
+            row = self.matrix.getrow(i)
+            return Composition({self.elements[j]: amt for j, amt
+                                in zip(row.indices, row.data)})
+        return Composition({el: amt for el, amt in
+                            zip(self.elements, self.matrix[i]) if amt != 0})
+
+    def to_compositions(self):
+        """
+        Returns:
+            List of all rows as Composition objects.
+        """
+        return list(self)
+
+    def get_amounts(self, el):
+        """
+        Amounts of an element in all compositions.
+
+        Args:
+            el (Element/Specie): Element or Specie to get amounts for.
+
+        Returns:
+            Array of K amounts.
+        """
+        j = self._el_index.get(get_el_sp(el))
+        if j is None:
+            return np.zeros(len(self))
+        if self.is_sparse:
+            return self.matrix.getcol(j).toarray().ravel()
+        return self.matrix[:, j].copy()
+
+    def get_atomic_fractions(self, elements=None):
+        """
+        Vectorized Composition.get_atomic_fraction for a set of elements.
+
+        Args:
+            elements ([Element/Specie]): Elements to get fractions for, in
+                order. Defaults to all the elements of the matrix.
+
+        Returns:
+            Dense K x len(elements) array of atomic fractions.
+        """
+        if elements is None:
+            fracs = abs(self.toarray())
+        else:
+            fracs = np.abs(np.array([self.get_amounts(el)
+                                     for el in elements]).reshape(
+                (len(elements), len(self))).T)
+        return fracs / self.num_atoms[:, None]
+
+    @property
+    def fractional_composition(self):
+        """
+        The matrix with each row normalized such that the absolute amounts sum
+        to 1, i.e., the rows are Composition.fractional_composition.
+        """
+        return self.normalize(1)
+
+    def normalize(self, num_atoms=1):
+        """
+        Scales all compositions to the same number of atoms.
+
+        Args:
+            num_atoms (float): Number of atoms per composition.
+
+        Returns:
+            CompositionMatrix
+        """
+        return self._scale(num_atoms / self.num_atoms)
+
+    def get_reduced_composition_and_factor(self):
+        """
+        Vectorized Composition.get_reduced_composition_and_factor. Rows with
+        non-integer amounts are left unreduced with a factor of 1.
+
+        Returns:
+            (reduced CompositionMatrix, array of K factors).
+        """
+        factors = self.get_reduction_factors()
+        return self._scale(1 / factors), factors
+
+    def get_reduction_factors(self):
+        """
+        Reduction factors of each row, consistent with
+        Composition.get_reduced_formula_and_factor, i.e., the greatest common
+        divisor of the amounts except for special formulas. E.g., 4 for
+        Li4Fe4P4O16 and 1 for Li2O2.
+
+        Returns:
+            Array of K reduction factors.
+        """
+        if self.is_sparse:
+            #Pad the nonzero amounts of each row into a dense array, since
+            #each composition only has a handful of elements.
+            m = self.matrix
+            nnz = np.diff(m.indptr)
+            amts = np.zeros((len(self), max(nnz.max() if len(self) else 0, 1)))
+            cols = np.arange(m.nnz) - np.repeat(m.indptr[:-1], nnz)
+            amts[np.repeat(np.arange(len(self)), nnz), cols] = m.data
+        else:
+            amts = self.matrix
+        amts = np.abs(amts)
+        all_int = np.all(amts == np.floor(amts), axis=1)
+        ints = np.where(all_int[:, None], amts, 0).astype(np.int64)
+        factors = np.zeros(len(self), dtype=np.int64)
+        for col in ints.T:
+            factors = _gcd(factors, col)
+        factors = np.where(all_int & (factors > 0), factors, 1).astype(float)
+
+        #Special formulas such as Li2O2 are only reduced to two formula units.
+        reduced = self._scale(1 / factors).toarray()
+        for formula in Composition.special_formulas.values():
+            comp = Composition(formula)
+            if any([el not in self._el_index for el in comp]):
+                continue
+            target = np.zeros(len(self.elements))
+            for el, amt in comp.items():
+                target[self._el_index[el]] = amt / 2
+            match = all_int & np.all(reduced == target, axis=1)
+            factors[match] /= 2
+        return factors
+
+    @property
+    def weights(self):
+        """
+        Total molecular weights of all compositions in amu.
+        """
+        masses = np.array([el.atomic_mass for el in self.elements])
+        return MassArray(np.asarray(self.matrix.dot(masses)).ravel(), "amu")
+
+    def get_hashes(self):
+        """
+        Vectorized hash of all compositions. The hashes are identical to
+        hash(Composition), i.e., compositions with the same elements have the
+        same hash, so they can be used to bucket compositions before any
+        exact comparisons.
+
+        Returns:
+            Integer array of K hashes.
+        """
+        z = np.array([el.Z for el in self.elements], dtype=np.int64)
+        if self.is_sparse:
+            present = self.matrix.copy()
+            present.data = (present.data != 0).astype(np.int64)
+        else:
+            present = (self.matrix != 0).astype(np.int64)
+        return np.asarray(present.dot(z)).ravel()
+
+    def _scale(self, factors):
+        """
+        Returns a new CompositionMatrix with each row multiplied by factors.
+        """
+        factors = np.ones(len(self)) * factors
+        if self.is_sparse:
+            from scipy.sparse import diags
+            matrix = diags(factors, 0).dot(self.matrix)
+        else:
+            matrix = self.matrix * factors[:, None]
+        return CompositionMatrix(matrix, self.elements,
+                                 num_atoms=self.num_atoms * np.abs(factors))
+
+
+def _is_sparse(matrix):
+    try:
+        from scipy.sparse import issparse
+    except ImportError:
+        return False
+    return issparse(matrix)
+
+
+def _row_sums(matrix):
+    return np.asarray(matrix.sum(axis=1)).ravel()
+
+
+def _gcd(a, b):
+    """
+    Elementwise greatest common divisor of two integer arrays.
+    """
+    a, b = np.abs(a), np.abs(b)
+    while np.any(b):
+        nonzero = b != 0
+        a, b = np.where(nonzero, b, a), np.where(nonzero,
+                                                 a % np.where(nonzero, b, 1), 0)
+    return a
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
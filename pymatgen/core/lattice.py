@@ -17,6 +17,7 @@ __date__ = "Sep 23, 2011"
 
 import math
 import itertools
+import collections
 
 from six.moves import map, zip
 
@@ -25,9 +26,16 @@ from numpy.linalg import inv
 from numpy import pi, dot, transpose, radians
 
 from pyhull.voronoi import VoronoiTess
+from monty.functools import lazy_property
 
 from pymatgen.serializers.json_coders import PMGSONable
 from pymatgen.util.num_utils import abs_cap
+from pymatgen.util.coord_utils import find_points_in_spheres
+
+
+#Process-wide LRU cache of reduced lattices. See
+#Lattice._get_reduced_lattice.
+_reduced_lattice_cache = collections.OrderedDict()
 
 
 class Lattice(PMGSONable):
@@ -35,8 +43,16 @@ class Lattice(PMGSONable):
     A lattice object.  Essentially a matrix with conversion matrices. In
     general, it is assumed that length units are in Angstroms and angles are in
     degrees unless otherwise stated.
+
+    A Lattice is immutable. Derived quantities such as the inverse matrix,
+    the lattice parameters, the reciprocal lattices and the reduced lattices
+    are therefore computed on first use and cached.
     """
 
+    #Maximum number of reduced lattices kept in the process-wide cache shared
+    #by all Lattice objects.
+    reduction_cache_size = 1024
+
     def __init__(self, matrix):
         """
         Create a lattice from any sequence of 9 numbers. Note that the sequence
@@ -55,20 +71,28 @@ class Lattice(PMGSONable):
                 with lattice vectors [10, 0, 0], [20, 10, 0] and [0, 0, 30].
         """
         m = np.array(matrix, dtype=np.float64).reshape((3, 3))
-        lengths = np.sqrt(np.sum(m ** 2, axis=1))
+        m.flags.writeable = False
+        self._matrix = m
+        # The inverse matrix is lazily generated for efficiency.
+        self._inv_matrix = None
+        self._metric_tensor = None
+        self._reduced_lattices = {}
+        self._lattice_points = None
+
+    @lazy_property
+    def _lengths(self):
+        return np.sqrt(np.sum(self._matrix ** 2, axis=1))
+
+    @lazy_property
+    def _angles(self):
+        m = self._matrix
+        lengths = self._lengths
         angles = np.zeros(3)
         for i in range(3):
             j = (i + 1) % 3
             k = (i + 2) % 3
             angles[i] = abs_cap(dot(m[j], m[k]) / (lengths[j] * lengths[k]))
-
-        angles = np.arccos(angles) * 180. / pi
-        self._angles = angles
-        self._lengths = lengths
-        self._matrix = m
-        # The inverse matrix is lazily generated for efficiency.
-        self._inv_matrix = None
-        self._metric_tensor = None
+        return np.arccos(angles) * 180. / pi
 
     def copy(self):
         """Deep copy of self."""
@@ -324,7 +348,7 @@ class Lattice(PMGSONable):
         """
         return self._angles[2]
 
-    @property
+    @lazy_property
     def volume(self):
         """
         Volume of the unit cell.
@@ -355,7 +379,7 @@ class Lattice(PMGSONable):
             self._reciprocal_lattice = Lattice(v * 2 * np.pi)
             return self._reciprocal_lattice
 
-    @property
+    @lazy_property
     def reciprocal_lattice_crystallographic(self):
         """
         Returns the *crystallographic* reciprocal lattice, i.e., no factor of
@@ -406,7 +430,8 @@ class Lattice(PMGSONable):
                 "gamma": float(self.gamma),
                 "volume": float(self.volume)}
 
-    def find_all_mappings(self, other_lattice, ltol=1e-5, atol=1):
+    def find_all_mappings(self, other_lattice, ltol=1e-5, atol=1,
+                          sort_by_distortion=False):
         """
         Finds all mappings between current lattice and another lattice.
 
@@ -415,6 +440,12 @@ class Lattice(PMGSONable):
                 this one.
             ltol (float): Tolerance for matching lengths. Defaults to 1e-5.
             atol (float): Tolerance for matching angles. Defaults to 1.
+            sort_by_distortion (bool): If True, mappings are yielded in
+                order of increasing distortion, i.e., deviation of
+                the metric tensor of the aligned lattice from that of
+                other_lattice, so that the best mappings come first.
+                Defaults to False, in which case the mappings are yielded in
+                order of enumeration.
 
         Yields:
             (aligned_lattice, rotation_matrix, scale_matrix) if a mapping is
@@ -432,43 +463,99 @@ class Lattice(PMGSONable):
 
             None is returned if no matches are found.
         """
+        aligned_ms, scale_ms = self._get_mapping_candidates(other_lattice,
+                                                            ltol, atol)
+        if sort_by_distortion:
+            metric = other_lattice.metric_tensor
+            diff = np.einsum("nij,nkj->nik", aligned_ms, aligned_ms) - metric
+            distortion = np.sqrt(np.sum(diff ** 2, axis=(1, 2)))
+            order = np.argsort(distortion, kind="mergesort")
+            aligned_ms, scale_ms = aligned_ms[order], scale_ms[order]
+
+        for aligned_m, scale_m in zip(aligned_ms, scale_ms):
+            rotation_m = np.linalg.solve(aligned_m, other_lattice.matrix)
+            yield Lattice(aligned_m), rotation_m, scale_m
+
+    def _get_lattice_points(self, r):
+        """
+        Fractional coordinates and distances of the lattice points within a
+        sphere of radius r around the origin, in the order returned by
+        get_points_in_sphere. The points for the largest radius requested so
+        far are cached, since the same lattice is typically mapped onto many
+        others, e.g., by StructureMatcher.
+
+        Args:
+            r (float): Radius of the sphere.
+
+        Returns:
+            (frac_coords, dists)
+        """
+        if self._lattice_points is None or self._lattice_points[0] < r:
+            centers, indices, images, dists = self.get_points_in_spheres(
+                [[0, 0, 0]], [[0, 0, 0]], r)
+            frac = images.astype(np.float64)
+            frac.flags.writeable = False
+            dists.flags.writeable = False
+            self._lattice_points = (r, frac, dists)
+        rmax, frac, dists = self._lattice_points
+        if rmax == r:
+            return frac, dists
+        inside = dists <= r
+        return frac[inside], dists[inside]
+
+    def _get_mapping_candidates(self, other_lattice, ltol, atol):
+        """
+        Enumerates the triplets of lattice vectors of this lattice with the
+        lengths and angles of other_lattice. The length and angle tests are
+        done for all candidate vectors and pairs of vectors at once.
+
+        Args:
+            other_lattice (Lattice): Lattice to map onto.
+            ltol (float): Tolerance for matching lengths.
+            atol (float): Tolerance for matching angles.
+
+        Returns:
+            (aligned_matrices, scale_matrices) as (n, 3, 3) arrays of the
+            cartesian lattice vectors (float) and fractional lattice vectors
+            (int) of the n candidates with non-zero volume.
+        """
         (lengths, angles) = other_lattice.lengths_and_angles
         (alpha, beta, gamma) = angles
 
-        points = self.get_points_in_sphere([[0, 0, 0]], [0, 0, 0],
-                                           max(lengths) * (1 + ltol))
-        frac = np.array([p[0] for p in points])
-        dist = np.array([p[1] for p in points])
+        frac, dist = self._get_lattice_points(max(lengths) * (1 + ltol))
         cart = self.get_cartesian_coords(frac)
 
         inds = [np.abs(dist - l) / l <= ltol for l in lengths]
         c_cand = [cart[i] for i in inds]
         f_cand = [frac[i] for i in inds]
-        lengths = [np.sum(c ** 2, axis=-1) ** 0.5 for c in c_cand]
-
-        def get_angles(v1, v2, l1, l2):
-            x = np.inner(np.atleast_2d(v1), v2) / np.atleast_1d(l1)[:, None] / l2
-            x[x>1] = 1
-            x[x<-1] = -1
-            angles = np.arccos(x) * 180. / pi
-            return angles
-
-        gammas = get_angles(c_cand[0], c_cand[1], lengths[0], lengths[1])
-        for i, j in np.argwhere(np.abs(gammas - gamma) < atol):
-            alphas = get_angles(c_cand[1][j], c_cand[2], lengths[1][j],
-                                lengths[2])[0]
-            betas = get_angles(c_cand[0][i], c_cand[2], lengths[0][i],
-                               lengths[2])[0]
-            inds = np.logical_and(np.abs(alphas - alpha) < atol,
-                                  np.abs(betas - beta) < atol)
-
-            for c, f in zip(c_cand[2][inds], f_cand[2][inds]):
-                aligned_m = np.array([c_cand[0][i], c_cand[1][j], c])
-                scale_m = np.array([f_cand[0][i], f_cand[1][j], f])
-                if abs(np.linalg.det(scale_m)) < 1e-8:
-                    continue
-                rotation_m = np.linalg.solve(aligned_m, other_lattice.matrix)
-                yield Lattice(aligned_m), rotation_m, scale_m
+        lengths = [dist[i] for i in inds]
+
+        def angle_match(i, j, angle):
+            # Matrix of whether the angles between the candidates for
+            # vectors i and j match the given angle.
+            x = np.dot(c_cand[i], c_cand[j].T) / lengths[i][:, None] \
+                / lengths[j][None, :]
+            x = np.arccos(np.clip(x, -1, 1)) * 180. / pi
+            return np.abs(x - angle) < atol
+
+        gamma_match = angle_match(0, 1, gamma)
+        alpha_match = angle_match(1, 2, alpha)
+        beta_match = angle_match(0, 2, beta)
+
+        i, j = np.nonzero(gamma_match)
+        pairs, k = np.nonzero(alpha_match[j] & beta_match[i])
+        i, j = i[pairs], j[pairs]
+
+        aligned_ms = np.concatenate([c_cand[0][i][:, None, :],
+                                     c_cand[1][j][:, None, :],
+                                     c_cand[2][k][:, None, :]], axis=1)
+        scale_ms = np.concatenate([f_cand[0][i][:, None, :],
+                                   f_cand[1][j][:, None, :],
+                                   f_cand[2][k][:, None, :]], axis=1)
+        if len(scale_ms):
+            valid = np.abs(np.linalg.det(scale_ms)) >= 1e-8
+            aligned_ms, scale_ms = aligned_ms[valid], scale_ms[valid]
+        return aligned_ms, np.rint(scale_ms).astype(int)
 
     def find_mapping(self, other_lattice, ltol=1e-5, atol=1):
         """
@@ -515,9 +602,14 @@ class Lattice(PMGSONable):
         Returns:
             Reduced lattice.
         """
+        return self._get_reduced_lattice(
+            "lll", delta, lambda: self._calc_lll_reduced_lattice(delta))
+
+    def _calc_lll_reduced_lattice(self, delta):
         # Transpose the lattice matrix first so that basis vectors are columns.
-        # Makes life easier.
-        a = self._matrix.T
+        # Makes life easier. A copy is made since the basis vectors are
+        # reduced in place.
+        a = self._matrix.T.copy()
 
         b = np.zeros((3, 3))  # Vectors after the Gram-Schmidt process
         u = np.zeros((3, 3))  # Gram-Schmidt coeffieicnts
@@ -589,6 +681,10 @@ class Lattice(PMGSONable):
         Returns:
             Niggli-reduced lattice.
         """
+        return self._get_reduced_lattice(
+            "niggli", tol, lambda: self._calc_niggli_reduced_lattice(tol))
+
+    def _calc_niggli_reduced_lattice(self, tol):
         a = self._matrix[0]
         b = self._matrix[1]
         c = self._matrix[2]
@@ -696,6 +792,35 @@ class Lattice(PMGSONable):
             return mapped[0]
         raise ValueError("can't find niggli")
 
+    def _get_reduced_lattice(self, method, param, reduce_func):
+        """
+        Returns a reduced lattice, using cached results where possible.
+        Results are cached on the lattice itself, and in a bounded
+        process-wide LRU cache keyed on the lattice matrix rounded to 1e-10,
+        so that reductions of identical lattices in different objects (e.g.,
+        structures read from different files) are only done once.
+
+        Args:
+            method (str): Name of the reduction, e.g. "niggli".
+            param: Parameter of the reduction, e.g., the tolerance.
+            reduce_func: Function returning the reduced lattice.
+        """
+        try:
+            return self._reduced_lattices[(method, param)]
+        except KeyError:
+            pass
+        key = (method, param) + tuple(np.round(self._matrix, 10).flat)
+        try:
+            # Move the key to the end, i.e., mark it as recently used.
+            reduced = _reduced_lattice_cache.pop(key)
+        except KeyError:
+            reduced = reduce_func()
+        _reduced_lattice_cache[key] = reduced
+        while len(_reduced_lattice_cache) > Lattice.reduction_cache_size:
+            _reduced_lattice_cache.popitem(last=False)
+        self._reduced_lattices[(method, param)] = reduced
+        return reduced
+
     def scale(self, new_volume):
         """
         Return a new Lattice with volume new_volume by performing a
@@ -804,23 +929,37 @@ class Lattice(PMGSONable):
         """
         return np.sqrt(self.dot(coords, coords, frac_coords=frac_coords))
 
-    def get_points_in_sphere(self, frac_points, center, r):
+    def get_points_in_spheres(self, frac_points, centers, r):
         """
-        Find all points within a sphere from the point taking into account
-        periodic boundary conditions. This includes sites in other periodic
-        images.
+        Find all points within spheres around several centers, taking into
+        account periodic boundary conditions. This includes points in other
+        periodic images. The images are enumerated once for all centers and
+        the search uses a cell list, so this is much faster than calling
+        get_points_in_sphere for each center in turn.
 
-        Algorithm:
-
-        1. place sphere of radius r in crystal and determine minimum supercell
-           (parallelpiped) which would contain a sphere of radius r. for this
-           we need the projection of a_1 on a unit vector perpendicular
-           to a_2 & a_3 (i.e. the unit vector in the direction b_1) to
-           determine how many a_1"s it will take to contain the sphere.
+        Args:
+            frac_points: All points in the lattice in fractional coordinates.
+            centers: Cartesian coordinates of the centers of the spheres.
+            r: Radius of the spheres. Either a single value, or one value
+                per center.
 
-           Nxmax = r * length_of_b_1 / (2 Pi)
+        Returns:
+            (center_indices, point_indices, images, distances) as flat
+            arrays, ordered by center index. The point found is
+            frac_points[point_indices] + images, at distance distances from
+            centers[center_indices].
+        """
+        center_fcoords = self.get_fractional_coords(
+            np.reshape(np.array(centers, dtype=np.float64), (-1, 3)))
+        return find_points_in_spheres(frac_points, center_fcoords, r, self,
+                                      numerical_tol=None)
 
-        2. keep points falling within r.
+    def get_points_in_sphere(self, frac_points, center, r):
+        """
+        Find all points within a sphere from the point taking into account
+        periodic boundary conditions. This includes sites in other periodic
+        images. Use get_points_in_spheres to search around several centers at
+        once.
 
         Args:
             frac_points: All points in the lattice in fractional coordinates.
@@ -828,44 +967,16 @@ class Lattice(PMGSONable):
             r: radius of sphere.
 
         Returns:
-            [(fcoord, dist) ...] since most of the time, subsequent processing
-            requires the distance.
-        """
-        recp_len = np.array(self.reciprocal_lattice.abc)
-        sr = r + 0.15
-        nmax = sr * recp_len / (2 * math.pi)
-        pcoords = self.get_fractional_coords(center)
-        floor = math.floor
-
-        n = len(frac_points)
-        fcoords = np.array(frac_points)
-        pts = np.tile(center, (n, 1))
-        indices = np.array(list(range(n)))
-
-        arange = np.arange(start=int(floor(pcoords[0] - nmax[0])),
-                           stop=int(floor(pcoords[0] + nmax[0])) + 1)
-        brange = np.arange(start=int(floor(pcoords[1] - nmax[1])),
-                           stop=int(floor(pcoords[1] + nmax[1])) + 1)
-        crange = np.arange(start=int(floor(pcoords[2] - nmax[2])),
-                           stop=int(floor(pcoords[2] + nmax[2])) + 1)
-
-        arange = arange[:, None] * np.array([1, 0, 0])[None, :]
-        brange = brange[:, None] * np.array([0, 1, 0])[None, :]
-        crange = crange[:, None] * np.array([0, 0, 1])[None, :]
-
-        images = arange[:, None, None] + brange[None, :, None] +\
-            crange[None, None, :]
-
-        shifted_coords = fcoords[:, None, None, None, :] + images[None, :, :, :, :]
-        coords = self.get_cartesian_coords(shifted_coords)
-        dists = np.sqrt(np.sum((coords - pts[:, None, None, None, :]) ** 2,
-                               axis=4))
-        within_r = np.where(dists <= r)
-
-        return list(zip(shifted_coords[within_r], dists[within_r],
-                        indices[within_r[0]]))
+            [(fcoord, dist, index) ...] since most of the time, subsequent
+            processing requires the distance.
+        """
+        fcoords = np.reshape(np.array(frac_points, dtype=np.float64), (-1, 3))
+        centers, indices, images, dists = self.get_points_in_spheres(
+            fcoords, [center], r)
+        return list(zip(fcoords[indices] + images, dists, indices))
 
-    def get_all_distances(self, fcoords1, fcoords2):
+    def get_all_distances(self, fcoords1, fcoords2, max_memory=1e8,
+                          dtype=np.float64, cutoff=None):
         """
         Returns the distances between two lists of coordinates taking into
         account periodic boundary conditions and the lattice. Note that this
@@ -878,6 +989,17 @@ class Lattice(PMGSONable):
                 0.7] or [[1.1, 1.2, 4.3], [0.5, 0.6, 0.7]]. It can be a single
                 coord or any array of coords.
             fcoords2: Second set of fractional coordinates.
+            max_memory (float): Approximate upper bound in bytes on the
+                temporary arrays. The rows of fcoords1 are processed in
+                vectorized chunks that fit within this budget. Defaults to
+                1e8, i.e., 100 MB.
+            dtype: dtype of the returned distances, e.g., np.float32 to
+                halve the memory needed for large distance matrices.
+                Distances are always computed in double precision.
+            cutoff (float): If supplied, only the minimum image distances
+                that are <= cutoff are computed, using a cell list, and a
+                scipy.sparse.csr_matrix is returned instead of a dense array.
+                Coincident points are stored as explicit zeros.
 
         Returns:
             2d array of cartesian distances. E.g the distance between
@@ -886,6 +1008,18 @@ class Lattice(PMGSONable):
         #ensure correct shape
         fcoords1, fcoords2 = np.atleast_2d(fcoords1, fcoords2)
 
+        if cutoff is not None:
+            from scipy.sparse import csr_matrix
+            i, j, images, d = find_points_in_spheres(
+                fcoords2, fcoords1, cutoff, self, numerical_tol=None)
+            #keep only the shortest image of each pair
+            srt = np.lexsort((d, j, i))
+            i, j, d = i[srt], j[srt], d[srt]
+            first = np.ones(len(d), dtype=bool)
+            first[1:] = (i[1:] != i[:-1]) | (j[1:] != j[:-1])
+            return csr_matrix((d[first].astype(dtype), (i[first], j[first])),
+                              shape=(len(fcoords1), len(fcoords2)))
+
         #ensure that all points are in the unit cell
         fcoords1 = np.mod(fcoords1, 1)
         fcoords2 = np.mod(fcoords2, 1)
@@ -905,20 +1039,16 @@ class Lattice(PMGSONable):
         cart_f1 = self.get_cartesian_coords(fcoords1)
         cart_f2 = self.get_cartesian_coords(shifted_f2)
 
-        if cart_f1.size * cart_f2.size < 1e5:
+        #the vectors and squared distances take 27 * 4 doubles per pair
+        chunk = max(1, int(max_memory // (27 * 4 * 8 * max(len(cart_f2), 1))))
+        distances = np.empty((len(cart_f1), len(cart_f2)), dtype=dtype)
+        for i in range(0, len(cart_f1), chunk):
             #all vectors from f1 to f2
-            vectors = cart_f2[None, :, :, :] - cart_f1[:, None, None, :]
+            vectors = cart_f2[None, :, :, :] - \
+                cart_f1[i:i + chunk, None, None, :]
             d_2 = np.sum(vectors ** 2, axis=3)
-            distances = np.min(d_2, axis=2) ** 0.5
-            return distances
-        else:
-            #memory will overflow, so do a loop
-            distances = []
-            for c1 in cart_f1:
-                vectors = cart_f2[:, :, :] - c1[None, None, :]
-                d_2 = np.sum(vectors ** 2, axis=2)
-                distances.append(np.min(d_2, axis=1) ** 0.5)
-            return np.array(distances)
+            distances[i:i + chunk] = np.min(d_2, axis=2) ** 0.5
+        return distances
 
     def is_hexagonal(self, hex_angle_tol=5, hex_length_tol=0.01):
         lengths, angles = self.lengths_and_angles
@@ -431,3 +431,129 @@ class SymmOp(PMGSONable):
     @classmethod
     def from_dict(cls, d):
         return cls(d["matrix"], d["tolerance"])
+
+
+class SymmOpSet(object):
+    """
+    A set of symmetry operations, stored as a single (K, 4, 4) stack of
+    affine matrices so that the whole set can be applied to many points at
+    once, e.g., to generate the orbits of all sites of a structure.
+
+    .. attribute:: affine_matrices
+
+        A (K, 4, 4) numpy.array of the affine matrices of the K operations.
+    """
+
+    def __init__(self, symmops):
+        """
+        Args:
+            symmops ([SymmOp]): The symmetry operations.
+        """
+        self.symmops = list(symmops)
+        self.affine_matrices = np.array(
+            [op.affine_matrix for op in self.symmops],
+            dtype=np.float64).reshape((-1, 4, 4))
+
+    def __len__(self):
+        return len(self.symmops)
+
+    def __iter__(self):
+        return self.symmops.__iter__()
+
+    def __getitem__(self, ind):
+        return self.symmops[ind]
+
+    def operate_multi(self, points):
+        """
+        Apply all operations on a list of points.
+
+        Args:
+            points: (M, 3) array of coordinates, or a single point.
+
+        Returns:
+            (K, M, 3) numpy array of the coordinates after each of the K
+            operations, or a (K, 3) array if a single point is given.
+        """
+        points = np.array(points, dtype=np.float64)
+        affine_points = np.concatenate(
+            [points, np.ones(points.shape[:-1] + (1,))], axis=-1)
+        # np.inner gives a (M, K, 4) array.
+        new_points = np.inner(affine_points, self.affine_matrices)[..., :-1]
+        return np.swapaxes(new_points, 0, -2) if points.ndim == 2 \
+            else new_points
+
+    def get_orbits(self, points, tol=1e-5, pbc=False, ord=np.inf):
+        """
+        Returns the orbits of a list of points, i.e., the distinct images of
+        each point under all operations, in order of the operations. As in
+        a loop over the operations, an image is added to the orbit unless
+        it is within tol of an image that is already in the orbit.
+
+        Args:
+            points: (M, 3) array of coordinates.
+            tol (float): Tolerance for determining if two images are the
+                same. Set to 0 for exact matching.
+            pbc (bool): Whether the points are fractional coordinates in a
+                periodic cell. If True, images are brought into the unit
+                cell and compared taking periodic boundary conditions into
+                account.
+            ord: Order of the norm of the difference of two images that is
+                compared to tol, as in numpy.linalg.norm. Defaults to np.inf,
+                i.e., each coordinate is compared to tol. With ord=1, the sum
+                of the absolute differences of the coordinates is compared.
+
+        Returns:
+            ([array]) (n, 3) array of the orbit for each point.
+        """
+        images = self.operate_multi(np.reshape(points, (-1, 3)))
+        if pbc:
+            images -= np.floor(images)
+        return [_get_unique_points(images[:, i], tol, pbc, ord)
+                for i in range(images.shape[1])]
+
+    def get_orbit(self, point, tol=1e-5, pbc=False, ord=np.inf):
+        """
+        Returns the orbit for a point. See get_orbits.
+
+        Args:
+            point: Point as a 3x1 array.
+            tol (float): Tolerance for determining if two images are the
+                same. Set to 0 for exact matching.
+            pbc (bool): Whether the point is a fractional coordinate in a
+                periodic cell.
+            ord: Order of the norm compared to tol. See get_orbits.
+
+        Returns:
+            (n, 3) array of the orbit.
+        """
+        return self.get_orbits([point], tol=tol, pbc=pbc, ord=ord)[0]
+
+
+def _get_unique_points(points, tol, pbc, ord):
+    """
+    Returns the points which are not within tol of an earlier point that is
+    itself kept, i.e., the result of comparing each point to the unique
+    points found so far. Exact duplicates, which symmetry operations usually
+    generate, are first removed in one sort; this does not change the result
+    since a duplicate is close to exactly the same points as the original.
+    """
+    # lexsort is stable, so the first of each set of identical points is the
+    # earliest one.
+    order = np.lexsort(points.T[::-1])
+    sorted_points = points[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = np.any(sorted_points[1:] != sorted_points[:-1], axis=1)
+    unique = points[np.sort(order[first])]
+    if not tol or len(unique) < 2:
+        return unique
+    diff = unique[:, None, :] - unique[None, :, :]
+    if pbc:
+        diff -= np.round(diff)
+    close = np.linalg.norm(diff, ord=ord, axis=-1) < tol
+    covered = np.zeros(len(unique), dtype=bool)
+    keep = []
+    for i in range(len(unique)):
+        if not covered[i]:
+            keep.append(i)
+            covered |= close[i]
+    return unique[keep]
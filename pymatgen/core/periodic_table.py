@@ -18,20 +18,18 @@ __date__ = "Sep 23, 2011"
 
 import os
 import re
-import json
-from io import open
 
 from pymatgen.core.units import Mass, Length, unitized
-from monty.design_patterns import singleton, cached_class
+from monty.design_patterns import singleton
 from pymatgen.util.string_utils import formula_double_format
+from pymatgen.util.io_utils import loadfn_cached
 from pymatgen.serializers.json_coders import PMGSONable
 from functools import total_ordering
 
 
 #Loads element data from json file
-with open(os.path.join(os.path.dirname(__file__), "periodic_table.json"), "rt"
-          ) as f:
-    _pt_data = json.load(f)
+_pt_data = loadfn_cached(os.path.join(os.path.dirname(__file__),
+                                      "periodic_table.json"))
 
 _pt_row_sizes = (2, 8, 8, 18, 18, 32, 32)
 
@@ -86,7 +84,6 @@ def char2l(char):
 ALL_ELEMENT_SYMBOLS = set(_pt_data.keys())
 
 
-@cached_class
 @total_ordering
 class Element(object):
     """
@@ -314,9 +311,21 @@ class Element(object):
         {oxidation state: ionic radii}. Radii are given in ang.
     """
 
-    def __init__(self, symbol):
-        self._symbol = "%s" % symbol
-        self._data = _pt_data[symbol]
+    # Interned instances, keyed by symbol.
+    _instances = {}
+
+    def __new__(cls, symbol):
+        # Elements are immutable, so a single instance per symbol is shared.
+        # The symbol is normalized first so that Element(Element("Fe")) also
+        # returns the interned instance.
+        symbol = "%s" % symbol
+        try:
+            return Element._instances[symbol]
+        except KeyError:
+            pass
+        self = super(Element, cls).__new__(cls)
+        self._symbol = symbol
+        self._data = _pt_data[self._symbol]
 
         #Store key variables for quick access
         self._z = self._data["Atomic no"]
@@ -344,14 +353,12 @@ class Element(object):
         else:
             self.atomic_radius = Length(self._data["Atomic radius"], "ang")
         self.atomic_mass = Mass(self._data["Atomic mass"], "amu")
+        Element._instances[self._symbol] = self
+        return self
 
-    def __getnewargs__(self):
-        #function used by pickle to recreate object
-        return self._symbol,
-
-    def __getinitargs__(self):
-        # function used by pickle to recreate object
-        return self._symbol,
+    def __reduce__(self):
+        # Unpickling goes through __new__ and returns the interned instance.
+        return Element, (self._symbol,)
 
     @property
     def data(self):
@@ -492,9 +499,8 @@ class Element(object):
         Returns:
             Element with atomic number z.
         """
-        for sym, data in _pt_data.items():
-            if data["Atomic no"] == z:
-                return Element(sym)
+        if 0 < z < _MAXZ and _z2symbol[z] is not None:
+            return Element(_z2symbol[z])
         raise ValueError("No element with this atomic number %s" % z)
 
     @staticmethod
@@ -668,8 +674,11 @@ class Element(object):
         """
         return 88 < self._z < 104
 
+    def __copy__(self):
+        return self
+
     def __deepcopy__(self, memo):
-        return Element(self.symbol)
+        return self
 
     @staticmethod
     def from_dict(d):
@@ -689,7 +698,6 @@ class Element(object):
                 "element": self.symbol}
 
 
-@cached_class
 @total_ordering
 class Specie(PMGSONable):
     """
@@ -698,7 +706,9 @@ class Specie(PMGSONable):
     values, not calculated values. For example, high-spin Fe2+ may be
     assigned an idealized spin of +5, but an actual Fe2+ site may be
     calculated to have a magmom of +4.5. Calculated properties should be
-    assigned to Site objects, and not Specie.
+    assigned to Site objects, and not Specie. Like Element, only one
+    instance is stored for each combination of symbol, oxidation state and
+    properties.
 
     Args:
         symbol (str): Element symbol, e.g., Fe
@@ -722,21 +732,43 @@ class Specie(PMGSONable):
 
     supported_properties = ("spin",)
 
-    def __init__(self, symbol, oxidation_state, properties=None):
-        self._el = Element(symbol)
-        self._oxi_state = oxidation_state
-        self._properties = properties if properties else {}
-        for k in self._properties.keys():
+    # Interned instances, keyed by (symbol, oxidation state, properties).
+    _instances = {}
+
+    def __new__(cls, symbol, oxidation_state, properties=None):
+        # The properties are copied since the instance is shared, and must
+        # not change when the caller later modifies its dict.
+        symbol = "%s" % symbol
+        properties = dict(properties) if properties else {}
+        try:
+            # The type is part of the key since 2 == 2.0, and the instance
+            # must keep the oxidation state exactly as given.
+            key = (symbol, oxidation_state, type(oxidation_state),
+                   tuple(sorted(properties.items())))
+            return Specie._instances[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable properties; such a Specie is not interned.
+            key = None
+        for k in properties.keys():
             if k not in Specie.supported_properties:
                 raise ValueError("{} is not a supported property".format(k))
-
-    def __getnewargs__(self):
-        # function used by pickle to recreate object
-        return self._el.symbol, self._oxi_state, self._properties
-
-    def __getinitargs__(self):
-        # function used by pickle to recreate object
-        return self._el.symbol, self._oxi_state, self._properties
+        self = super(Specie, cls).__new__(cls)
+        self._el = Element(symbol)
+        self._oxi_state = oxidation_state
+        self._properties = properties
+        # Given that all oxidation states are below 100 in absolute value,
+        # this should effectively ensure that no two unequal Specie have the
+        # same hash.
+        self._hash = self._el._z * 1000 + int(oxidation_state)
+        if key is not None:
+            Specie._instances[key] = self
+        return self
+
+    def __reduce__(self):
+        # Unpickling goes through __new__ and returns the interned instance.
+        return Specie, (self._el.symbol, self._oxi_state, self._properties)
 
     def __getattr__(self, a):
         #overriding getattr doens't play nice with pickle, so we
@@ -764,12 +796,7 @@ class Specie(PMGSONable):
         return not self.__eq__(other)
 
     def __hash__(self):
-        """
-        Given that all oxidation states are below 100 in absolute value, this
-        should effectively ensure that no two unequal Specie have the same
-        hash.
-        """
-        return self._el._z * 1000 + int(self._oxi_state)
+        return self._hash
 
     def __lt__(self, other):
         """
@@ -900,8 +927,11 @@ class Specie(PMGSONable):
                 else:
                     return 10 - nelectrons
 
+    def __copy__(self):
+        return self
+
     def __deepcopy__(self, memo):
-        return Specie(self.symbol, self.oxi_state, self._properties)
+        return self
 
     def as_dict(self):
         return {"@module": self.__class__.__module__,
@@ -916,7 +946,6 @@ class Specie(PMGSONable):
                    d.get("properties", None))
 
 
-@cached_class
 @total_ordering
 class DummySpecie(PMGSONable):
     """
@@ -951,28 +980,43 @@ class DummySpecie(PMGSONable):
         DummySpecie is always assigned an electronegativity of 0.
     """
 
-    def __init__(self, symbol="X", oxidation_state=0, properties=None):
+    # Interned instances, keyed by (symbol, oxidation state, properties).
+    _instances = {}
+
+    def __new__(cls, symbol="X", oxidation_state=0, properties=None):
+        # The properties are copied since the instance is shared.
+        properties = dict(properties) if properties else {}
+        try:
+            # As for Specie, the type of the oxidation state is in the key.
+            key = (symbol, oxidation_state, type(oxidation_state),
+                   tuple(sorted(properties.items())))
+            return DummySpecie._instances[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable properties; such a DummySpecie is not interned.
+            key = None
         for i in range(1, min(2, len(symbol)) + 1):
             if Element.is_valid_symbol(symbol[:i]):
                 raise ValueError("{} contains {}, which is a valid element "
                                  "symbol.".format(symbol, symbol[:i]))
+        for k in properties.keys():
+            if k not in Specie.supported_properties:
+                raise ValueError("{} is not a supported property".format(k))
 
         # Set required attributes for DummySpecie to function like a Specie in
         # most instances.
+        self = super(DummySpecie, cls).__new__(cls)
         self._symbol = symbol
         self._oxi_state = oxidation_state
-        self._properties = properties if properties else {}
-        for k in self._properties.keys():
-            if k not in Specie.supported_properties:
-                raise ValueError("{} is not a supported property".format(k))
+        self._properties = properties
+        if key is not None:
+            DummySpecie._instances[key] = self
+        return self
 
-    def __getnewargs__(self):
-        # function used by pickle to recreate object
-        return self._symbol, self._oxi_state, self._properties
-
-    def __getinitargs__(self):
-        # function used by pickle to recreate object
-        return self._symbol, self._oxi_state, self._properties
+    def __reduce__(self):
+        # Unpickling goes through __new__ and returns the interned instance.
+        return DummySpecie, (self._symbol, self._oxi_state, self._properties)
 
     def __getattr__(self, a):
         #overriding getattr doens't play nice with pickle, so we
@@ -1041,8 +1085,11 @@ class DummySpecie(PMGSONable):
     def symbol(self):
         return self._symbol
 
+    def __copy__(self):
+        return self
+
     def __deepcopy__(self, memo):
-        return DummySpecie(self.symbol, self._oxi_state)
+        return self
 
     @staticmethod
     def from_string(species_string):
@@ -1181,23 +1228,43 @@ def get_el_sp(obj):
     Raises:
         ValueError if obj cannot be converted into an Element or Specie.
     """
-    if isinstance(obj, (Element, Specie, DummySpecie)):
+    if isinstance(obj, Element):
+        return obj
+
+    # Results are interned and depend only on str(obj), so parsed strings
+    # are cached. The cache is checked before the comparatively slow
+    # isinstance checks against the PMGSONable classes.
+    try:
+        return _el_sp_cache[obj]
+    except (KeyError, TypeError):
+        pass
+
+    if isinstance(obj, (Specie, DummySpecie)):
         return obj
 
     obj = str(obj)
+    try:
+        return _el_sp_cache[obj]
+    except KeyError:
+        pass
 
     try:
         z = int(obj)
-        return Element.from_Z(z)
+        el_sp = Element.from_Z(z)
     except ValueError:
         try:
-            return Specie.from_string(obj)
+            el_sp = Specie.from_string(obj)
         except (ValueError, KeyError):
             try:
-                return Element(obj)
+                el_sp = Element(obj)
             except (ValueError, KeyError):
                 try:
-                    return DummySpecie.from_string(obj)
+                    el_sp = DummySpecie.from_string(obj)
                 except:
                     raise ValueError("Can't parse Element or String from %s."
                                      % obj)
+    _el_sp_cache[obj] = el_sp
+    return el_sp
+
+
+_el_sp_cache = {}
@@ -320,6 +320,31 @@ class PeriodicSite(Site, PMGSONable):
             c_coords = lattice.get_cartesian_coords(self._fcoords)
         Site.__init__(self, atoms_n_occu, c_coords, properties)
 
+    @classmethod
+    def _from_trusted(cls, species, frac_coords, coords, lattice,
+                      properties):
+        """
+        Fast constructor which skips all input parsing and validation. Used
+        by array-backed structures to create lightweight site views on
+        demand.
+
+        Args:
+            species (Composition): Already validated species and occupancies.
+                Not copied.
+            frac_coords (3x1 array): Fractional coordinates.
+            coords (3x1 array): Matching cartesian coordinates.
+            lattice (Lattice): Lattice associated with the site.
+            properties (dict): Properties associated with the site.
+        """
+        site = cls.__new__(cls)
+        site._lattice = lattice
+        site._fcoords = frac_coords
+        site._coords = coords
+        site._species = species
+        site._is_ordered = species.num_atoms == 1 and len(species) == 1
+        site._properties = properties
+        return site
+
     def __hash__(self):
         """
         Minimally effective hash function that just distinguishes between Sites
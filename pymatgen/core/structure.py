@@ -45,13 +45,14 @@ from pymatgen.core.lattice import Lattice
 from pymatgen.core.periodic_table import Element, Specie, get_el_sp
 from pymatgen.serializers.json_coders import PMGSONable
 from pymatgen.core.sites import Site, PeriodicSite
-from pymatgen.core.bonds import CovalentBond, get_bond_length
+from pymatgen.core.bonds import CovalentBond, get_bond_length, bond_lengths
 from pymatgen.core.composition import Composition
 from pymatgen.util.coord_utils import get_angle, all_distances, \
-    lattice_points_in_supercell
+    lattice_points_in_supercell, find_points_in_spheres, \
+    find_cart_points_in_spheres, pbc_pair_shortest_vectors
+from pymatgen.util.io_utils import loadfn_cached
 from monty.design_patterns import singleton
 from pymatgen.core.units import Mass, Length
-from pymatgen.symmetry.groups import SpaceGroup
 from monty.io import zopen
 
 
@@ -283,6 +284,72 @@ class SiteCollection(six.with_metaclass(ABCMeta, collections.Sequence)):
         return math.degrees(math.atan2(np.linalg.norm(v2) * np.dot(v1, v23),
                             np.dot(v12, v23)))
 
+    def _get_vectors(self, i, j):
+        """
+        Returns the cartesian vectors from the sites with indices i to the
+        sites with indices j. Periodic structures override this to use the
+        minimum image convention.
+        """
+        cart_coords = self.cart_coords
+        return cart_coords[np.asarray(j)] - cart_coords[np.asarray(i)]
+
+    def get_distances(self, i, j):
+        """
+        Returns the distances between many pairs of sites at once. The
+        indices can be arrays of any (broadcastable) shape, and the
+        distances are returned as an array of the same shape.
+
+        Args:
+            i (array): Indices of first sites
+            j (array): Indices of second sites
+
+        Returns:
+            (array) Distances between the sites at indices i and j.
+        """
+        return np.sqrt(np.sum(self._get_vectors(i, j) ** 2, axis=-1))
+
+    def get_angles(self, i, j, k):
+        """
+        Returns many angles specified by three sites at once. See
+        get_distances for the handling of the index arrays.
+
+        Args:
+            i (array): Indices of first sites.
+            j (array): Indices of second (vertex) sites.
+            k (array): Indices of third sites.
+
+        Returns:
+            (array) Angles in degrees.
+        """
+        v1 = self._get_vectors(j, i)
+        v2 = self._get_vectors(j, k)
+        d = np.sum(v1 * v2, axis=-1) / np.sqrt(
+            np.sum(v1 ** 2, axis=-1) * np.sum(v2 ** 2, axis=-1))
+        return np.degrees(np.arccos(np.clip(d, -1, 1)))
+
+    def get_dihedrals(self, i, j, k, l):
+        """
+        Returns many dihedral angles specified by four sites at once. See
+        get_distances for the handling of the index arrays.
+
+        Args:
+            i (array): Indices of first sites
+            j (array): Indices of second sites
+            k (array): Indices of third sites
+            l (array): Indices of fourth sites
+
+        Returns:
+            (array) Dihedral angles in degrees.
+        """
+        v1 = self._get_vectors(l, k)
+        v2 = self._get_vectors(k, j)
+        v3 = self._get_vectors(j, i)
+        v23 = np.cross(v2, v3)
+        v12 = np.cross(v1, v2)
+        return np.degrees(np.arctan2(
+            np.sqrt(np.sum(v2 ** 2, axis=-1)) * np.sum(v1 * v23, axis=-1),
+            np.sum(v12 * v23, axis=-1)))
+
     def is_valid(self, tol=DISTANCE_TOLERANCE):
         """
         True if SiteCollection does not contain atoms that are too close
@@ -336,6 +403,13 @@ class IStructure(SiteCollection, PMGSONable):
     extends Sequence and Hashable, which means that in many cases,
     it can be used like any Python sequence. Iterating through a
     structure is equivalent to going through the sites in sequence.
+
+    The sites are stored as arrays, and the PeriodicSites returned by
+    indexing or iteration are views of them, created on first access and
+    cached until the structure is modified. Modifying a site, e.g., through
+    its private attributes, therefore does not modify the structure. Use the
+    methods of Structure, e.g., replace, translate_sites or
+    add_site_property, instead.
     """
 
     def __init__(self, lattice, species, coords, validate_proximity=False,
@@ -381,24 +455,144 @@ class IStructure(SiteCollection, PMGSONable):
         else:
             self._lattice = Lattice(lattice)
 
-        sites = []
-        for i in range(len(species)):
-            prop = None
-            if site_properties:
-
-                prop = {k: v[i]
-                        for k, v in site_properties.items()}
+        # Sites are stored as columns: an Nx3 array of fractional coords,
+        # an index array into a table of unique species and a list of values
+        # for each site property. PeriodicSites are only created on access,
+        # and cached until the structure is modified.
+        self._site_cache = {}
+        self._species_table, self._species_index = _index_species(species)
+
+        fcoords = np.array(coords, dtype=np.float64).reshape((-1, 3))
+        if coords_are_cartesian:
+            fcoords = self._lattice.get_fractional_coords(fcoords)
+        if to_unit_cell:
+            fcoords = np.mod(fcoords, 1)
+        self._frac_coords = fcoords
+
+        nsites = len(fcoords)
+        self._site_properties = {}
+        if site_properties:
+            for k, v in site_properties.items():
+                if len(v) < nsites:
+                    raise StructureError(
+                        "Site property %s must have a value for every "
+                        "site." % k)
+                self._site_properties[k] = list(v)[:nsites]
 
-            sites.append(
-                PeriodicSite(species[i], coords[i], self._lattice,
-                             to_unit_cell,
-                             coords_are_cartesian=coords_are_cartesian,
-                             properties=prop))
-        self._sites = tuple(sites)
         if validate_proximity and not self.is_valid():
             raise StructureError(("Structure contains sites that are ",
                                   "less than 0.01 Angstrom apart!"))
 
+    def _get_site(self, i, coords=None):
+        """
+        Returns a PeriodicSite view of the site at index i. Views are cached
+        per index, so repeated access to the same site is cheap.
+
+        Args:
+            i (int): Index of site.
+            coords (3x1 array): Precomputed cartesian coordinates of the
+                site. Computed from the fractional coordinates if None.
+        """
+        try:
+            return self._site_cache[i]
+        except KeyError:
+            pass
+        fcoords = self._frac_coords[i].copy()
+        if coords is None:
+            coords = self._lattice.get_cartesian_coords(fcoords)
+        props = {k: v[i] for k, v in self._site_properties.items()}
+        site = PeriodicSite._from_trusted(
+            self._species_table[self._species_index[i]], fcoords, coords,
+            self._lattice, props)
+        self._site_cache[i] = site
+        return site
+
+    def __getstate__(self):
+        # Site views are not pickled; they are rebuilt on demand.
+        d = self.__dict__.copy()
+        d.pop("_site_cache", None)
+        return d
+
+    def __setstate__(self, d):
+        self.__dict__.update(d)
+        self._site_cache = {}
+
+    def _get_species_order(self):
+        """
+        Returns the indices of the species table entries that are actually
+        used by sites, in order of first occurrence.
+        """
+        if len(self._species_index) == 0:
+            return []
+        used, first = np.unique(self._species_index, return_index=True)
+        return [int(i) for i in used[np.argsort(first)]]
+
+    @classmethod
+    def from_arrays(cls, lattice, species_index, species_table, coords,
+                    coords_are_cartesian=False, to_unit_cell=False,
+                    site_properties=None):
+        """
+        Fast constructor for parsers and other code which already has the
+        structure in array form. The species of the sites are specified as
+        indices into a table of unique species, so that each species is only
+        parsed once, and no per-site validation is done. The inputs are
+        trusted to be consistent, e.g., species_index must only contain
+        valid indices.
+
+        Args:
+            lattice (Lattice/3x3 array): The lattice.
+            species_index (array): Index of the species of each site in
+                species_table.
+            species_table: Sequence of the unique species, in any of the
+                forms accepted by the constructor, e.g., ["Li", "Fe2+"] or
+                [{"Fe": 0.5, "Mn": 0.5}, ...].
+            coords (Nx3 array): Fractional/cartesian coordinates of each
+                site.
+            coords_are_cartesian (bool): Set to True if you are providing
+                coordinates in cartesian coordinates. Defaults to False.
+            to_unit_cell (bool): Whether to map the fractional coordinates
+                into the unit cell. Defaults to False.
+            site_properties (dict): Properties associated with the sites as a
+                dict of sequences, e.g., {"magmom": [5, 5, 5, 5]}.
+
+        Returns:
+            (IStructure/Structure)
+        """
+        struct = cls.__new__(cls)
+        struct._site_cache = {}
+        struct._lattice = lattice if isinstance(lattice, Lattice) \
+            else Lattice(lattice)
+
+        table, inds = _index_species(species_table)
+        species_index = inds[np.asarray(species_index, dtype=np.int_)]
+        # Keep the table in order of first occurrence, as the constructor
+        # does.
+        if len(species_index):
+            used, first, species_index = np.unique(
+                species_index, return_index=True, return_inverse=True)
+            order = np.argsort(first)
+            table = [table[i] for i in used[order]]
+            rank = np.empty(len(order), dtype=np.int_)
+            rank[order] = np.arange(len(order))
+            species_index = rank[species_index]
+        struct._species_table = table
+        struct._species_index = species_index.astype(np.int_)
+
+        fcoords = np.array(coords, dtype=np.float64).reshape((-1, 3))
+        if coords_are_cartesian:
+            fcoords = struct._lattice.get_fractional_coords(fcoords)
+        if to_unit_cell:
+            fcoords = np.mod(fcoords, 1)
+        struct._frac_coords = fcoords
+        if len(fcoords) != len(species_index):
+            raise StructureError("The list of atomic species must be of the"
+                                 " same length as the list of fractional"
+                                 " coordinates.")
+
+        struct._site_properties = {
+            k: list(v) for k, v in (site_properties or {}).items()}
+        return struct
+
     @classmethod
     def from_sites(cls, sites, validate_proximity=False,
                    to_unit_cell=False):
@@ -481,6 +675,7 @@ class IStructure(SiteCollection, PMGSONable):
             tol (float): A fractional tolerance to deal with numerical
                precision issues in determining if orbits are the same.
         """
+        from pymatgen.symmetry.groups import SpaceGroup
         try:
             i = int(sg)
             sgp = SpaceGroup.from_int_number(i)
@@ -507,8 +702,8 @@ class IStructure(SiteCollection, PMGSONable):
         all_sp = []
         all_coords = []
         all_site_properties = collections.defaultdict(list)
-        for i, (sp, c) in enumerate(zip(species, frac_coords)):
-            cc = sgp.get_orbit(c, tol=tol)
+        orbits = sgp.get_orbits(frac_coords, tol=tol)
+        for i, (sp, cc) in enumerate(zip(species, orbits)):
             all_sp.extend([sp] * len(cc))
             all_coords.extend(cc)
             for k, v in props.items():
@@ -523,15 +718,283 @@ class IStructure(SiteCollection, PMGSONable):
         Returns the distance matrix between all sites in the structure. For
         periodic structures, this should return the nearest image distance.
         """
-        return self.lattice.get_all_distances(self.frac_coords,
-                                              self.frac_coords)
+        return self.get_distance_matrix()
+
+    def get_distance_matrix(self, cutoff=None, dtype=np.float64,
+                            max_memory=1e8):
+        """
+        Returns the nearest image distance matrix between all sites in the
+        structure, with control over the memory used. See
+        Lattice.get_all_distances.
+
+        Args:
+            cutoff (float): If supplied, only distances <= cutoff are
+                computed and a scipy.sparse.csr_matrix is returned. The
+                diagonal is not stored.
+            dtype: dtype of the returned distances, e.g., np.float32.
+            max_memory (float): Approximate upper bound in bytes on the
+                temporary arrays used to compute a dense matrix.
+
+        Returns:
+            NxN dense array or sparse matrix of distances.
+        """
+        if cutoff is None:
+            return self._lattice.get_all_distances(
+                self._frac_coords, self._frac_coords, max_memory=max_memory,
+                dtype=dtype)
+        d = self._lattice.get_all_distances(self._frac_coords,
+                                            self._frac_coords, dtype=dtype,
+                                            cutoff=cutoff).tocoo()
+        offdiag = d.row != d.col
+        return type(d)((d.data[offdiag], (d.row[offdiag], d.col[offdiag])),
+                       shape=d.shape).tocsr()
+
+    def is_valid(self, tol=SiteCollection.DISTANCE_TOLERANCE):
+        """
+        True if Structure does not contain atoms that are too close together,
+        taking periodic boundary conditions into account. Only distances
+        below tol are computed, so this is cheap even for large cells.
+
+        Args:
+            tol (float): Distance tolerance. Default is 0.01A.
+
+        Returns:
+            (bool) True if Structure does not contain atoms that are too
+            close together.
+        """
+        return self.get_distance_matrix(cutoff=tol).nnz == 0
 
     @property
     def sites(self):
         """
-        Returns an iterator for the sites in the Structure.
+        Returns a tuple of the sites in the Structure. Sites are views
+        created from the underlying arrays, so modifying a site does not
+        modify the Structure.
         """
-        return self._sites
+        return tuple(self)
+
+    def __iter__(self):
+        # Keep references to the current arrays so that iteration is over a
+        # consistent snapshot even if the structure is modified.
+        cart_coords = self.cart_coords
+        for i in range(len(cart_coords)):
+            yield self._get_site(i, cart_coords[i])
+
+    def __getitem__(self, ind):
+        if isinstance(ind, slice):
+            return self.sites[ind]
+        return self._get_site(ind)
+
+    def __len__(self):
+        return len(self._species_index)
+
+    def __contains__(self, site):
+        if not isinstance(site, PeriodicSite):
+            return site in self.sites
+        if site.lattice != self._lattice:
+            return False
+        props = [site.properties] if site.properties else None
+        return bool(self._contains_sites([site.species_and_occu], [0],
+                                         [site.coords], props)[0])
+
+    def _contains_sites(self, species_table, species_index, coords,
+                        properties=None):
+        """
+        Vectorized test of whether each of a set of sites, given as arrays,
+        is in the structure. The tests are the same as those of
+        PeriodicSite.__eq__, i.e., equal species and occupancies, cartesian
+        coordinates that are close to within Site.position_atol and equal
+        properties. The lattice is not compared.
+
+        Args:
+            species_table ([Composition]): Table of unique species.
+            species_index (array): Index into species_table for each site.
+            coords (Nx3 array): Cartesian coordinates of each site.
+            properties ([dict]): Properties of each site, or None if no site
+                has any properties.
+
+        Returns:
+            Boolean array of whether each site is in the structure.
+        """
+        species_index = np.array(species_index, dtype=np.int_)
+        coords = np.array(coords, dtype=np.float64).reshape((-1, 3))
+        nsites = len(coords)
+        my_coords = self.cart_coords
+        my_props = self._get_properties_list()
+        if properties is None and my_props is None:
+            props_equal = None
+        else:
+            if properties is None:
+                properties = [{}] * nsites
+            if my_props is None:
+                my_props = [{}] * len(self)
+            props_equal = lambda i, j: properties[i] == my_props[j]
+
+        # Species are only compared once for each pair of table entries. The
+        # tolerance follows np.allclose(site_coords, coords).
+        species_equal = np.array([[sp1 == sp2 for sp2 in self._species_table]
+                                  for sp1 in species_table], dtype=bool)
+        species_equal = species_equal.reshape((len(species_table),
+                                               len(self._species_table)))
+        tol = Site.position_atol + 1e-5 * np.abs(coords)
+
+        # Equal structures almost always have their sites in the same order,
+        # so sites are first compared with the site at the same index.
+        found = np.zeros(nsites, dtype=bool)
+        if nsites == len(self):
+            found = species_equal[species_index, self._species_index] & \
+                np.all(np.abs(my_coords - coords) <= tol, axis=1)
+            if props_equal is not None:
+                for i in np.nonzero(found)[0]:
+                    found[i] = props_equal(i, i)
+
+        # The remaining sites are compared with all sites in chunks to bound
+        # the memory of the broadcasted comparison.
+        todo = np.nonzero(~found)[0]
+        nchunks = int(math.ceil(len(todo) * max(len(self), 1) / 2 ** 20))
+        for chunk in np.array_split(todo, max(nchunks, 1)):
+            close = np.all(np.abs(my_coords[None, :, :] -
+                                  coords[chunk, None, :]) <=
+                           tol[chunk, None, :], axis=2)
+            close &= species_equal[species_index[chunk]][:,
+                                                         self._species_index]
+            if props_equal is None:
+                found[chunk] = np.any(close, axis=1)
+            else:
+                for i, row in zip(chunk, close):
+                    found[i] = any(props_equal(i, j)
+                                   for j in np.nonzero(row)[0])
+        return found
+
+    def _get_properties_list(self):
+        """
+        Returns the properties of each site as a list of dicts, or None if
+        there are no site properties.
+        """
+        if not self._site_properties:
+            return None
+        return [{k: v[i] for k, v in self._site_properties.items()}
+                for i in range(len(self))]
+
+    def indices_from_symbol(self, symbol):
+        """
+        Returns a tuple with the sequential indices of the sites
+        that contain an element with the given chemical symbol.
+        """
+        matches = []
+        for i in self._get_species_order():
+            comp = self._species_table[i]
+            if not (len(comp) == 1 and comp.num_atoms == 1):
+                raise AttributeError("specie property only works for ordered "
+                                     "sites!")
+            if list(comp.keys())[0].symbol == symbol:
+                matches.append(i)
+        return tuple(int(i) for i in
+                     np.nonzero(np.in1d(self._species_index, matches))[0])
+
+    @property
+    def species(self):
+        """
+        Only works for ordered structures.
+        Disordered structures will raise an AttributeError.
+
+        Returns:
+            ([Specie]) List of species at each site of the structure.
+        """
+        table = []
+        for comp in self._species_table:
+            if len(comp) == 1 and comp.num_atoms == 1:
+                table.append(list(comp.keys())[0])
+            else:
+                table.append(None)
+        species = [table[i] for i in self._species_index]
+        if any(sp is None for sp in species):
+            raise AttributeError("specie property only works for ordered "
+                                 "sites!")
+        return species
+
+    @property
+    def species_and_occu(self):
+        """
+        List of species and occupancies at each site of the structure.
+        """
+        return [self._species_table[i] for i in self._species_index]
+
+    @property
+    def types_of_specie(self):
+        """
+        List of types of specie. Only works for ordered structures.
+        Disordered structures will raise an AttributeError.
+        """
+        types = []
+        for i in self._get_species_order():
+            comp = self._species_table[i]
+            if not (len(comp) == 1 and comp.num_atoms == 1):
+                raise AttributeError("specie property only works for "
+                                     "ordered sites!")
+            sp = list(comp.keys())[0]
+            if sp not in types:
+                types.append(sp)
+        return types
+
+    @property
+    def atomic_numbers(self):
+        """List of atomic numbers."""
+        return [sp.number for sp in self.species]
+
+    @property
+    def site_properties(self):
+        """
+        Returns the site properties as a dict of sequences. E.g.,
+        {"magmom": (5,-5), "charge": (-4,4)}.
+        """
+        return {k: list(v) for k, v in self._site_properties.items()}
+
+    @property
+    def cart_coords(self):
+        """
+        Returns a Nx3 numpy array of the cartesian coordinates of sites in the
+        structure.
+        """
+        return self._lattice.get_cartesian_coords(self._frac_coords)
+
+    @property
+    def composition(self):
+        """
+        (Composition) Returns the composition
+        """
+        counts = np.bincount(self._species_index,
+                             minlength=len(self._species_table))
+        elmap = collections.defaultdict(float)
+        for comp, count in zip(self._species_table, counts):
+            if count:
+                for species, occu in comp.items():
+                    elmap[species] += occu * int(count)
+        return Composition(elmap)
+
+    @property
+    def charge(self):
+        """
+        Returns the net charge of the structure based on oxidation states. If
+        Elements are found, a charge of 0 is assumed.
+        """
+        counts = np.bincount(self._species_index,
+                             minlength=len(self._species_table))
+        charge = 0
+        for comp, count in zip(self._species_table, counts):
+            for specie, amt in comp.items():
+                charge += getattr(specie, "oxi_state", 0) * amt * int(count)
+        return charge
+
+    @property
+    def is_ordered(self):
+        """
+        Checks if structure is ordered, meaning no partial occupancies in any
+        of the sites.
+        """
+        return all(len(comp) == 1 and comp.num_atoms == 1
+                   for comp in (self._species_table[i]
+                                for i in self._get_species_order()))
 
     @property
     def lattice(self):
@@ -576,6 +1039,10 @@ class IStructure(SiteCollection, PMGSONable):
             return False
         if self.lattice != other.lattice:
             return False
+        if isinstance(other, IStructure):
+            return bool(np.all(other._contains_sites(
+                self._species_table, self._species_index, self.cart_coords,
+                self._get_properties_list())))
         for site in self:
             if site not in other:
                 return False
@@ -585,15 +1052,27 @@ class IStructure(SiteCollection, PMGSONable):
         return not self.__eq__(other)
 
     def __hash__(self):
-        # For now, just use the composition hash code.
-        return self.composition.__hash__()
+        # Only invariants that __eq__ cannot cross within its tolerances go
+        # into the hash, i.e., the number of sites of each set of species.
+        # This still distinguishes e.g. Fe2O3 from Fe4O6, unlike the
+        # composition hash.
+        counts = np.bincount(self._species_index,
+                             minlength=len(self._species_table))
+        nsites = collections.defaultdict(int)
+        for comp, count in zip(self._species_table, counts):
+            if count:
+                nsites[tuple(sorted(str(sp) for sp in comp))] += int(count)
+        return hash(tuple(sorted(nsites.items())))
 
     @property
     def frac_coords(self):
         """
-        Fractional coordinates as a Nx3 numpy array.
+        Fractional coordinates as a Nx3 numpy array. This is a read-only view
+        of the underlying storage, i.e., no copy is made.
         """
-        return np.array([site.frac_coords for site in self._sites])
+        fcoords = self._frac_coords.view()
+        fcoords.flags.writeable = False
+        return fcoords
 
     @property
     def volume(self):
@@ -620,24 +1099,46 @@ class IStructure(SiteCollection, PMGSONable):
         Returns:
             distance
         """
-        return self[i].distance(self[j], jimage)
+        return self._lattice.get_distance_and_image(
+            self._frac_coords[i], self._frac_coords[j], jimage=jimage)[0]
 
-    def get_sites_in_sphere(self, pt, r, include_index=False):
+    def _get_vectors(self, i, j, jimage=None):
         """
-        Find all sites within a sphere from the point. This includes sites
-        in other periodic images.
+        Returns the cartesian vectors from the sites with indices i to the
+        sites with indices j, using the minimum image convention unless the
+        periodic images jimage of the sites j are given.
+        """
+        fcoords1 = self._frac_coords[np.asarray(i)]
+        fcoords2 = self._frac_coords[np.asarray(j)]
+        if jimage is not None:
+            return self._lattice.get_cartesian_coords(
+                fcoords2 + jimage - fcoords1)
+        return pbc_pair_shortest_vectors(self._lattice, fcoords1, fcoords2)
 
-        Algorithm:
+    def get_distances(self, i, j, jimage=None):
+        """
+        Get the distances between many pairs of sites at once, assuming
+        periodic boundary conditions. This is the vectorized version of
+        get_distance, for arrays of indices of any (broadcastable) shape.
+        get_angles and get_dihedrals also use the minimum image convention
+        for periodic structures.
 
-        1. place sphere of radius r in crystal and determine minimum supercell
-           (parallelpiped) which would contain a sphere of radius r. for this
-           we need the projection of a_1 on a unit vector perpendicular
-           to a_2 & a_3 (i.e. the unit vector in the direction b_1) to
-           determine how many a_1"s it will take to contain the sphere.
+        Args:
+            i (array): Indices of first sites
+            j (array): Indices of second sites
+            jimage: Array of the number of lattice translations of the
+                second sites in each lattice direction, e.g., [[0, 0, 1],
+                ...]. Default is None for the nearest images.
 
-           Nxmax = r * length_of_b_1 / (2 Pi)
+        Returns:
+            (array) Distances between the sites at indices i and j.
+        """
+        return np.sqrt(np.sum(self._get_vectors(i, j, jimage) ** 2, axis=-1))
 
-        2. keep points falling within r.
+    def get_sites_in_sphere(self, pt, r, include_index=False):
+        """
+        Find all sites within a sphere from the point. This includes sites
+        in other periodic images.
 
         Args:
             pt (3x1 array): cartesian coordinates of center of sphere.
@@ -649,15 +1150,49 @@ class IStructure(SiteCollection, PMGSONable):
             [(site, dist) ...] since most of the time, subsequent processing
             requires the distance.
         """
-        site_fcoords = np.mod(self.frac_coords, 1)
-        neighbors = []
-        for fcoord, dist, i in self._lattice.get_points_in_sphere(
-                site_fcoords, pt, r):
-            nnsite = PeriodicSite(self[i].species_and_occu,
-                                  fcoord, self._lattice,
-                                  properties=self[i].properties)
-            neighbors.append((nnsite, dist) if not include_index
-                             else (nnsite, dist, i))
+        return self.get_sites_in_spheres([pt], r,
+                                         include_index=include_index)[0]
+
+    def get_sites_in_spheres(self, pts, r, include_index=False):
+        """
+        Find all sites within spheres around several points. This includes
+        sites in other periodic images. All spheres are searched in a single
+        pass, which is much faster than calling get_sites_in_sphere for each
+        point.
+
+        Args:
+            pts (Mx3 array): Cartesian coordinates of the centers of the
+                spheres.
+            r (float): Radius of the spheres. Either a single value, or one
+                value per point.
+            include_index (bool): Whether the non-supercell site index
+                is included in the returned data
+
+        Returns:
+            A list of lists of [(site, dist) ...] for each point.
+        """
+        centers, points, images, dists = self._lattice.get_points_in_spheres(
+            self._frac_coords, pts, r)
+        return self._get_neighbor_sites(len(pts), centers, points, images,
+                                        dists, include_index)
+
+    def _get_neighbor_sites(self, ncenters, centers, points, images, dists,
+                            include_index):
+        """
+        Builds [[(site, dist[, index]) ...], ...] lists for the output of
+        the array based neighbor searches.
+        """
+        latt = self._lattice
+        fcoords = self._frac_coords[points] + images
+        coords = latt.get_cartesian_coords(fcoords)
+        neighbors = [list() for i in range(ncenters)]
+        for i, j, fc, c, d in zip(centers, points, fcoords, coords, dists):
+            props = {k: v[j] for k, v in self._site_properties.items()}
+            nnsite = PeriodicSite._from_trusted(
+                self._species_table[self._species_index[j]], fc, c, latt,
+                props)
+            neighbors[i].append((nnsite, d, j) if include_index
+                                else (nnsite, d))
         return neighbors
 
     def get_neighbors(self, site, r, include_index=False):
@@ -682,6 +1217,30 @@ class IStructure(SiteCollection, PMGSONable):
                                       include_index=include_index)
         return [d for d in nn if site != d[0]]
 
+    def get_neighbor_list(self, r, numerical_tol=1e-8):
+        """
+        Get neighbors for each atom in the unit cell, out to a distance r, as
+        flat arrays rather than site objects. A cell list is used, so the cost
+        scales linearly with the number of sites for a fixed r. Use this
+        method when only indices and distances are needed, e.g., for
+        pairwise energy models on large cells.
+
+        Args:
+            r (float): Radius of sphere.
+            numerical_tol (float): Pairs closer than this distance are
+                excluded, which removes each site from its own neighbors.
+
+        Returns:
+            (center_indices, points_indices, images, distances), ordered by
+            center index. The neighbor of site center_indices[k] is site
+            points_indices[k] translated by the lattice vector images[k],
+            i.e., at fractional coords
+            frac_coords[points_indices[k]] + images[k].
+        """
+        return find_points_in_spheres(self._frac_coords, self._frac_coords,
+                                      r, self._lattice,
+                                      numerical_tol=numerical_tol)
+
     def get_all_neighbors(self, r, include_index=False):
         """
         Get neighbors for each atom in the unit cell, out to a distance r
@@ -690,8 +1249,9 @@ class IStructure(SiteCollection, PMGSONable):
         crystal. If you only want neighbors for a particular site, use the
         method get_neighbors as it may not have to build such a large supercell
         However if you are looping over all sites in the crystal, this method
-        is more efficient since it only performs one pass over a large enough
-        supercell to contain all possible atoms out to a distance r.
+        is more efficient since it finds all neighbors in a single pass.
+        This is a convenience wrapper around get_neighbor_list, which
+        should be preferred when site objects are not needed.
         The return type is a [(site, dist) ...] since most of the time,
         subsequent processing requires the distance.
 
@@ -708,36 +1268,9 @@ class IStructure(SiteCollection, PMGSONable):
             structure. This is needed for ewaldmatrix by keeping track of which
             sites contribute to the ewald sum.
         """
-        # Use same algorithm as get_sites_in_sphere to determine supercell but
-        # loop over all atoms in crystal
-        recp_len = np.array(self.lattice.reciprocal_lattice.abc)
-        maxr = np.ceil((r + 0.15) * recp_len / (2 * math.pi))
-        nmin = np.floor(np.min(self.frac_coords, axis=0)) - maxr
-        nmax = np.ceil(np.max(self.frac_coords, axis=0)) + maxr
-
-        all_ranges = [np.arange(x, y) for x, y in zip(nmin, nmax)]
-
-        latt = self._lattice
-        neighbors = [list() for i in range(len(self._sites))]
-        all_fcoords = np.mod(self.frac_coords, 1)
-        coords_in_cell = latt.get_cartesian_coords(all_fcoords)
-        site_coords = self.cart_coords
-
-        indices = np.arange(len(self))
-        for image in itertools.product(*all_ranges):
-            coords = latt.get_cartesian_coords(image) + coords_in_cell
-            all_dists = all_distances(coords, site_coords)
-            all_within_r = np.bitwise_and(all_dists <= r, all_dists > 1e-8)
-
-            for (j, d, within_r) in zip(indices, all_dists, all_within_r):
-                nnsite = PeriodicSite(self[j].species_and_occu, coords[j],
-                                      latt, properties=self[j].properties,
-                                      coords_are_cartesian=True)
-                for i in indices[within_r]:
-                    item = (nnsite, d[i], j) if include_index else (
-                        nnsite, d[i])
-                    neighbors[i].append(item)
-        return neighbors
+        centers, points, images, dists = self.get_neighbor_list(r)
+        return self._get_neighbor_sites(len(self), centers, points, images,
+                                        dists, include_index)
 
     def get_neighbors_in_shell(self, origin, r, dr):
         """
@@ -819,10 +1352,9 @@ class IStructure(SiteCollection, PMGSONable):
         if site_properties:
             props.update(site_properties)
         if not sanitize:
-            return self.__class__(self._lattice,
-                                  self.species_and_occu,
-                                  self.frac_coords,
-                                  site_properties=props)
+            return self.__class__.from_arrays(
+                self._lattice, self._species_index, self._species_table,
+                self._frac_coords.copy(), site_properties=props)
         else:
             reduced_latt = self._lattice.get_lll_reduced_lattice()
             new_sites = []
@@ -955,12 +1487,23 @@ class IStructure(SiteCollection, PMGSONable):
         Returns:
             The most primitive structure found.
         """
-        # group sites by species string
-        k = lambda s: s.species_string
-        sites = sorted(self._sites, key=k)
-        grouped_sites = [list(a[1]) for a in itertools.groupby(sites, key=k)]
-        grouped_fcoords = [np.array([s.frac_coords for s in g])
-                           for g in grouped_sites]
+        # group sites by species string. The sites in each group keep their
+        # order in the structure.
+        used, first = np.unique(self._species_index, return_index=True)
+        table_strings = {i: self._get_site(j).species_string
+                         for i, j in zip(used, first)}
+        grouped_inds = []
+        for string in sorted(set(table_strings.values())):
+            table_inds = [i for i, v in table_strings.items() if v == string]
+            grouped_inds.append(
+                np.nonzero(np.in1d(self._species_index, table_inds))[0])
+        grouped_fcoords = [self._frac_coords[inds] for inds in grouped_inds]
+
+        # the number of formula units in the cell bounds the size of the
+        # supercells that need to be tried, so it is checked first
+        num_fu = six.moves.reduce(gcd, map(len, grouped_inds))
+        if num_fu == 1:
+            return Structure.from_sites(self)
 
         # min_vecs are approximate periodicities of the cell. The exact
         # periodicities from the supercell matrices are checked against these
@@ -972,50 +1515,69 @@ class IStructure(SiteCollection, PMGSONable):
         super_ftol = np.divide(tolerance, self.lattice.abc)
         super_ftol_2 = super_ftol * 2
 
-        def pbc_coord_intersection(fc1, fc2, tol):
+        def pbc_translations(vecs, fcoords, tol):
             """
-            Returns the fractional coords in fc1 that have coordinates
-            within tolerance to some coordinate in fc2
+            Returns the vectors in vecs that map every coordinate in fcoords
+            to within tolerance of some coordinate in fcoords. Most vectors
+            fail on the first few coordinates, so the coordinates are tested
+            in chunks of increasing size, dropping vectors as soon as they
+            fail. The chunks are capped to bound the memory used.
             """
-            d = fc1[:, None, :] - fc2[None, :, :]
-            d -= np.round(d)
-            np.abs(d, d)
-            return fc1[np.any(np.all(d < tol, axis=-1), axis=-1)]
+            i, chunk = 0, 1
+            while i < len(fcoords) and len(vecs) > 0:
+                fc = fcoords[i:i + chunk]
+                # only pairs that are close along a are compared along b and c
+                d = vecs[:, None, None, 0] + fc[None, :, None, 0] - \
+                    fcoords[None, None, :, 0]
+                d -= np.round(d)
+                iv, ifc, ig = np.nonzero(np.abs(d) < tol[0])
+                d = vecs[iv, 1:] + fc[ifc, 1:] - fcoords[ig, 1:]
+                d -= np.round(d)
+                close = np.all(np.abs(d) < tol[1:], axis=-1)
+                maps = np.zeros((len(vecs), len(fc)), dtype=bool)
+                maps[iv[close], ifc[close]] = True
+                vecs = vecs[np.all(maps, axis=1)]
+                i += chunk
+                chunk = min(2 * chunk, max(1, 2 ** 20 // max(
+                    1, len(vecs) * len(fcoords))))
+            return vecs
 
         # here we reduce the number of min_vecs by enforcing that every
         # vector in min_vecs approximately maps each site onto a similar site.
-        # The subsequent processing is O(fu^3 * min_vecs) = O(n^4) if we do no
-        # reduction.
-        # This reduction is O(n^3) so usually is an improvement. Using double
-        # the tolerance because both vectors are approximate
+        # Using double the tolerance because both vectors are approximate
         for g in sorted(grouped_fcoords, key=lambda x: len(x)):
-            for f in g:
-                min_vecs = pbc_coord_intersection(min_vecs, g - f, super_ftol_2)
+            min_vecs = pbc_translations(min_vecs, g, super_ftol_2)
 
         def get_hnf(fu):
             """
             Returns all possible distinct supercell matrices given a
             number of formula units in the supercell. Batches the matrices
             by the values in the diagonal (for less numpy overhead).
-            Computational complexity is O(n^3), and difficult to improve.
-            Might be able to do something smart with checking combinations of a
-            and b first, though unlikely to reduce to O(n^2).
             """
             def factors(n):
                 for i in range(1, n+1):
                     if n % i == 0:
                         yield i
 
-            for det in factors(fu):
-                if det == 1:
+            # the largest supercells are tried first, so that usually a single
+            # pass finds the primitive cell. A supercell of det primitive cells
+            # needs det distinct translations, all of which must be in
+            # min_vecs, which rules out most of the large ones immediately.
+            for det in reversed(list(factors(fu))):
+                if det == 1 or det > len(min_vecs):
                     continue
                 for a in factors(det):
                     for e in factors(det // a):
                         g = det // a // e
-                        yield det, np.array(
-                            [[[a, b, c], [0, e, f], [0, 0, g]]
-                            for b, c, f in itertools.product(range(a), range(a),
-                                                             range(e))])
+                        b, c, f = np.mgrid[0:a, 0:a, 0:e].reshape((3, -1))
+                        ms = np.zeros((len(b), 3, 3), dtype=np.int_)
+                        ms[:, 0, 0] = a
+                        ms[:, 0, 1] = b
+                        ms[:, 0, 2] = c
+                        ms[:, 1, 1] = e
+                        ms[:, 1, 2] = f
+                        ms[:, 2, 2] = g
+                        yield det, ms
 
         # we cant let sites match to their neighbors in the supercell
         grouped_non_nbrs = []
@@ -1028,7 +1590,19 @@ class IStructure(SiteCollection, PMGSONable):
             np.fill_diagonal(non_nbrs, True)
             grouped_non_nbrs.append(non_nbrs)
 
-        num_fu = six.moves.reduce(gcd, map(len, grouped_sites))
+        def get_groups(ms, ftols, gfcoords, non_nbrs):
+            """
+            Returns the adjacency matrices of the sites in gfcoords that are
+            equivalent in the primitive cell, for a stack of supercell
+            matrices.
+            """
+            all_frac = np.dot(gfcoords, ms).transpose((1, 0, 2))
+            fdist = all_frac[:, None, :, :] - all_frac[:, :, None, :]
+            fdist -= np.round(fdist)
+            np.abs(fdist, fdist)
+            close_in_prim = np.all(fdist < ftols[:, None, None, :], axis=-1)
+            return np.logical_and(close_in_prim, non_nbrs[None, :, :])
+
         for size, ms in get_hnf(num_fu):
             inv_ms = np.linalg.inv(ms)
 
@@ -1039,55 +1613,56 @@ class IStructure(SiteCollection, PMGSONable):
             is_close = np.all(dist < super_ftol, axis=-1)
             any_close = np.any(is_close, axis=-1)
             inds = np.all(any_close, axis=-1)
+            inv_ms, ms = inv_ms[inds], ms[inds]
+            if len(ms) == 0:
+                continue
+
+            new_ms = np.dot(inv_ms, self.lattice.matrix)
+            ftols = np.divide(tolerance, np.sqrt(np.sum(new_ms ** 2, axis=2)))
+
+            # all remaining candidates are tested at once, one group of sites
+            # at a time, in chunks to bound the memory used. Candidates keep
+            # their order so that the first valid one is the one used.
+            candidates = np.arange(len(ms))
+            for gfcoords, non_nbrs in zip(grouped_fcoords, grouped_non_nbrs):
+                chunk = max(1, 2 ** 22 // (3 * len(gfcoords) ** 2))
+                valid = []
+                for i in range(0, len(candidates), chunk):
+                    c = candidates[i:i + chunk]
+                    groups = get_groups(ms[c], ftols[c], gfcoords, non_nbrs)
+                    # check that groups are correct
+                    ok = np.all(np.sum(groups, axis=1) == size, axis=-1)
+                    # check that groups are all cliques, i.e., any two sites
+                    # that are both equivalent to some site are equivalent
+                    for j in np.nonzero(ok)[0]:
+                        g = groups[j].astype(np.int_)
+                        ok[j] = np.all(groups[j] | (np.dot(g, g) == 0))
+                    valid.append(c[ok])
+                candidates = np.concatenate(valid)
+                if len(candidates) == 0:
+                    break
 
-            for inv_m, m in zip(inv_ms[inds], ms[inds]):
-                new_m = np.dot(inv_m, self.lattice.matrix)
-                ftol = np.divide(tolerance, np.sqrt(np.sum(new_m ** 2, axis=1)))
-
-                valid = True
-                new_coords = []
-                new_sp = []
-                for gsites, gfcoords, non_nbrs in zip(grouped_sites,
-                                                      grouped_fcoords,
-                                                      grouped_non_nbrs):
-                    all_frac = np.dot(gfcoords, m)
-
-                    # calculate grouping of equivalent sites, represented by
-                    # adjacency matrix
-                    fdist = all_frac[None, :, :] - all_frac[:, None, :]
-                    fdist = np.abs(fdist - np.round(fdist))
-                    close_in_prim = np.all(fdist < ftol[None, None, :], axis=-1)
-                    groups = np.logical_and(close_in_prim, non_nbrs)
-
-                    #check that groups are correct
-                    if not np.all(np.sum(groups, axis=0) == size):
-                        valid = False
-                        break
-
-                    #check that groups are all cliques
-                    for g in groups:
-                        if not np.all(groups[g][:, g]):
-                            valid = False
-                            break
-                    if not valid:
-                        break
-
-                    #add the new sites
-                    added = np.zeros(len(gsites))
-                    for i, s in enumerate(gsites):
-                        if not added[i]:
-                            added[groups[i]] = True
-                            new_sp.append(s.species_and_occu)
-                            new_coords.append(s.coords)
-
-                if valid:
-                    inv_m = np.linalg.inv(m)
-                    new_l = Lattice(np.dot(inv_m, self.lattice.matrix))
-                    s = Structure(new_l, new_sp, new_coords,
-                                  coords_are_cartesian=True)
-
-                    return s.get_primitive_structure(
-                        tolerance).get_reduced_structure()
+            if len(candidates) > 0:
+                m = ms[candidates[0]]
+                # add one site for each group of equivalent sites
+                new_inds = []
+                for ginds, gfcoords, non_nbrs in zip(grouped_inds,
+                                                     grouped_fcoords,
+                                                     grouped_non_nbrs):
+                    groups = get_groups(m[None, :, :],
+                                        ftols[candidates[:1]], gfcoords,
+                                        non_nbrs)[0]
+                    first = np.argmax(groups, axis=1)
+                    new_inds.extend(ginds[first == np.arange(len(ginds))])
+                inv_m = np.linalg.inv(m)
+                new_l = Lattice(np.dot(inv_m, self.lattice.matrix))
+                new_sp = [self._species_table[self._species_index[i]]
+                          for i in new_inds]
+                s = Structure(new_l, new_sp, self.cart_coords[new_inds],
+                              coords_are_cartesian=True)
+
+                return s.get_primitive_structure(
+                    tolerance).get_reduced_structure()
 
         return Structure.from_sites(self)
 
@@ -1474,33 +2049,35 @@ class IMolecule(SiteCollection, PMGSONable):
             breaking the bond.
         """
         sites = self._sites
-        clusters = [[sites[ind1]], [sites[ind2]]]
-
-        sites = [site for i, site in enumerate(sites) if i not in (ind1, ind2)]
-
-        def belongs_to_cluster(site, cluster):
-            for test_site in cluster:
-                if CovalentBond.is_bonded(site, test_site, tol=tol):
-                    return True
-            return False
-
-        while len(sites) > 0:
+        bonded = [[] for site in sites]
+        for i, j in zip(*self._get_bonded_pairs(tol)):
+            bonded[i].append(j)
+            bonded[j].append(i)
+
+        # Sites are added to the clusters in passes, exactly as if each site
+        # were tested against every site already in the clusters, but only
+        # the bonded neighbors of a site need to be looked up.
+        labels = [None] * len(sites)
+        labels[ind1] = 0
+        labels[ind2] = 1
+        clusters = [[ind1], [ind2]]
+        remaining = [i for i in range(len(sites)) if i not in (ind1, ind2)]
+        while len(remaining) > 0:
             unmatched = []
-            for site in sites:
-                found = False
-                for cluster in clusters:
-                    if belongs_to_cluster(site, cluster):
-                        cluster.append(site)
-                        found = True
-                        break
-                if not found:
-                    unmatched.append(site)
+            for i in remaining:
+                found = [labels[j] for j in bonded[i]
+                         if labels[j] is not None]
+                if found:
+                    labels[i] = min(found)
+                    clusters[labels[i]].append(i)
+                else:
+                    unmatched.append(i)
 
-            if len(unmatched) == len(sites):
+            if len(unmatched) == len(remaining):
                 raise ValueError("Not all sites are matched!")
-            sites = unmatched
+            remaining = unmatched
 
-        return (self.__class__.from_sites(cluster)
+        return (self.__class__.from_sites([sites[i] for i in cluster])
                 for cluster in clusters)
 
     def get_covalent_bonds(self, tol=0.2):
@@ -1514,11 +2091,73 @@ class IMolecule(SiteCollection, PMGSONable):
         Returns:
             List of bonds
         """
-        bonds = []
-        for site1, site2 in itertools.combinations(self._sites, 2):
-            if CovalentBond.is_bonded(site1, site2, tol):
-                bonds.append(CovalentBond(site1, site2))
-        return bonds
+        sites = self._sites
+        return [CovalentBond(sites[i], sites[j])
+                for i, j in zip(*self._get_bonded_pairs(tol))]
+
+    def _get_bonded_pairs(self, tol=0.2):
+        """
+        Finds all pairs of bonded sites with the same criterion as
+        CovalentBond.is_bonded, using a cell list with the longest bond
+        length present as the cutoff, so that the cost scales linearly
+        with the number of sites.
+
+        Args:
+            tol (float): The tol to determine bonds. See
+                CovalentBond.is_bonded.
+
+        Returns:
+            (i, j) arrays of site indices with i < j, in the order of
+            itertools.combinations.
+        """
+        symbols = [list(site.species_and_occu.keys())[0].symbol
+                   for site in self._sites]
+        if len(symbols) < 2:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        table, inds = np.unique(symbols, return_inverse=True)
+        counts = np.bincount(inds)
+        max_lengths = np.zeros((len(table), len(table)))
+        for a, b in itertools.combinations_with_replacement(
+                range(len(table)), 2):
+            if a == b and counts[a] < 2:
+                continue
+            key = tuple(sorted([table[a], table[b]]))
+            if key not in bond_lengths:
+                raise ValueError("No bond data for elements {} - {}"
+                                 .format(*key))
+            max_lengths[a, b] = max_lengths[b, a] = \
+                (1 + tol) * max(bond_lengths[key].values())
+        coords = self.cart_coords
+        i, j, dists = find_cart_points_in_spheres(
+            coords, coords, np.max(max_lengths), numerical_tol=None)
+        bonded = (i < j) & (dists < max_lengths[inds[i], inds[j]])
+        return i[bonded], j[bonded]
+
+    def get_fragments(self, tol=0.2):
+        """
+        Splits a molecule into its covalently bonded fragments, i.e., the
+        connected components of the bond graph, e.g., to separate the
+        molecules in a cluster or a solvation shell.
+
+        Args:
+            tol (float): The tol to determine bonds. See
+                CovalentBond.is_bonded.
+
+        Returns:
+            List of Molecule objects, ordered by the index of the first site
+            in each fragment.
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+        n = len(self._sites)
+        i, j = self._get_bonded_pairs(tol)
+        graph = coo_matrix((np.ones(len(i)), (i, j)), shape=(n, n))
+        nfrags, labels = connected_components(graph, directed=False)
+        first = np.zeros(nfrags, dtype=np.int64)
+        first[labels[::-1]] = np.arange(n)[::-1]
+        return [self.__class__.from_sites(
+                [self._sites[k] for k in np.where(labels == l)[0]])
+                for l in np.argsort(first)]
 
     def __eq__(self, other):
         if other is None:
@@ -1631,13 +2270,49 @@ class IMolecule(SiteCollection, PMGSONable):
             [(site, dist) ...] since most of the time, subsequent processing
             requires the distance.
         """
-        neighbors = []
-        for site in self._sites:
-            dist = site.distance_from_point(pt)
-            if dist <= r:
-                neighbors.append((site, dist))
+        return self.get_sites_in_spheres([pt], r)[0]
+
+    def get_sites_in_spheres(self, pts, r):
+        """
+        Find all sites within spheres around several points. All spheres are
+        searched in a single pass, which is much faster than calling
+        get_sites_in_sphere for each point.
+
+        Args:
+            pts (Mx3 array): Cartesian coordinates of the centers of the
+                spheres.
+            r (float): Radius of the spheres. Either a single value, or one
+                value per point.
+
+        Returns:
+            A list of lists of [(site, dist) ...] for each point.
+        """
+        centers, points, dists = find_cart_points_in_spheres(
+            self.cart_coords, pts, r, numerical_tol=None)
+        neighbors = [list() for i in range(len(pts))]
+        for i, j, d in zip(centers, points, dists):
+            neighbors[i].append((self._sites[j], d))
         return neighbors
 
+    def get_neighbor_list(self, r, numerical_tol=1e-8):
+        """
+        Get neighbors for each site, out to a distance r, as flat arrays
+        rather than site objects. A cell list is used, so the cost scales
+        linearly with the number of sites for a fixed r.
+
+        Args:
+            r (float): Radius of sphere.
+            numerical_tol (float): Pairs closer than this distance are
+                excluded, which removes each site from its own neighbors.
+
+        Returns:
+            (center_indices, points_indices, distances), ordered by center
+            index.
+        """
+        coords = self.cart_coords
+        return find_cart_points_in_spheres(coords, coords, r,
+                                           numerical_tol=numerical_tol)
+
     def get_neighbors(self, site, r):
         """
         Get all neighbors to a site within a sphere of radius r.  Excludes the
@@ -1886,10 +2561,18 @@ class IMolecule(SiteCollection, PMGSONable):
 
 class Structure(IStructure, collections.MutableSequence):
     """
-    Mutable version of structure.
+    Mutable version of structure. As for IStructure, sites are read-only
+    views; the structure itself is modified through its methods.
     """
     __hash__ = None
 
+    def __setattr__(self, name, value):
+        # Replacing any of the site arrays invalidates the cached site views.
+        if name in ("_lattice", "_frac_coords", "_species_index",
+                    "_species_table", "_site_properties"):
+            self.__dict__["_site_cache"] = {}
+        super(Structure, self).__setattr__(name, value)
+
     def __init__(self, lattice, species, coords, validate_proximity=False,
                  to_unit_cell=False, coords_are_cartesian=False,
                  site_properties=None):
@@ -1927,7 +2610,62 @@ class Structure(IStructure, collections.MutableSequence):
             coords_are_cartesian=coords_are_cartesian,
             site_properties=site_properties)
 
-        self._sites = list(self._sites)
+    @property
+    def sites(self):
+        """
+        Returns a list of the sites in the Structure. Sites are views
+        created from the underlying arrays, so modifying the list does not
+        modify the Structure.
+        """
+        return list(self)
+
+    def _set_site(self, i, species, frac_coords, properties):
+        """
+        Sets the species, fractional coordinates and properties of site i.
+        Properties which are not specified are set to None.
+        """
+        i = range(len(self))[i]
+        self._species_table, ind = _index_species([species],
+                                                  self._species_table)
+        self._species_index[i] = ind[0]
+        fcoords = self._frac_coords.copy()
+        fcoords[i] = frac_coords
+        self._frac_coords = fcoords
+        properties = properties or {}
+        for k in properties.keys():
+            if k not in self._site_properties:
+                self._site_properties[k] = [None] * len(self)
+        for k, v in self._site_properties.items():
+            v[i] = properties.get(k)
+        self._site_cache = {}
+
+    def _select_sites(self, indices):
+        """
+        Keeps only the sites at indices, in the order given.
+        """
+        indices = np.array(indices, dtype=np.int_).reshape(-1)
+        self._species_index = self._species_index[indices]
+        self._frac_coords = self._frac_coords[indices]
+        self._site_properties = {k: [v[i] for i in indices]
+                                 for k, v in self._site_properties.items()}
+
+    def _remap_species(self, func):
+        """
+        Applies a function to every species and occupancy in use and
+        re-indexes the sites accordingly. Unused species are dropped from
+        the species table.
+
+        Args:
+            func: Function that takes a Composition and returns a new
+                species-like object or dict of species and occupancies.
+        """
+        order = self._get_species_order()
+        new_species = [func(self._species_table[i]) for i in order]
+        table, ind = _index_species(new_species)
+        mapping = np.zeros(len(self._species_table), dtype=np.int_)
+        mapping[order] = ind
+        self._species_table = table
+        self._species_index = mapping[self._species_index]
 
     def __setitem__(self, i, site):
         """
@@ -1952,28 +2690,30 @@ class Structure(IStructure, collections.MutableSequence):
             if site.lattice != self._lattice:
                 raise ValueError("PeriodicSite added must have same lattice "
                                  "as Structure!")
-            self._sites[i] = site
+            self._set_site(i, site.species_and_occu, site.frac_coords,
+                           site.properties)
         else:
             if isinstance(site, six.string_types) or (not isinstance(site, \
                     collections.Sequence)):
                 sp = site
-                frac_coords = self._sites[i].frac_coords
-                properties = self._sites[i].properties
+                frac_coords = self._frac_coords[i]
+                properties = self[i].properties
             else:
                 sp = site[0]
-                frac_coords = site[1] if len(site) > 1 else self._sites[i]\
-                    .frac_coords
-                properties = site[2] if len(site) > 2 else self._sites[i]\
+                frac_coords = site[1] if len(site) > 1 else \
+                    self._frac_coords[i]
+                properties = site[2] if len(site) > 2 else self[i]\
                     .properties
 
-            self._sites[i] = PeriodicSite(sp, frac_coords, self._lattice,
-                                          properties=properties)
+            self._set_site(i, sp, frac_coords, properties)
 
     def __delitem__(self, i):
         """
         Deletes a site from the Structure.
         """
-        self._sites.__delitem__(i)
+        keep = np.ones(len(self), dtype=bool)
+        keep[i] = False
+        self._select_sites(np.where(keep)[0])
 
     def append(self, species, coords, coords_are_cartesian=False,
                validate_proximity=False, properties=None):
@@ -2014,20 +2754,31 @@ class Structure(IStructure, collections.MutableSequence):
             New structure with inserted site.
         """
         if not coords_are_cartesian:
-            new_site = PeriodicSite(species, coords, self._lattice,
-                                    properties=properties)
+            frac_coords = np.array(coords, dtype=np.float64)
         else:
             frac_coords = self._lattice.get_fractional_coords(coords)
-            new_site = PeriodicSite(species, frac_coords, self._lattice,
-                                    properties=properties)
-
-        if validate_proximity:
-            for site in self:
-                if site.distance(new_site) < self.DISTANCE_TOLERANCE:
-                    raise ValueError("New site is too close to an existing "
-                                     "site!")
 
-        self._sites.insert(i, new_site)
+        if validate_proximity and len(self) > 0:
+            dists = self._lattice.get_all_distances(self._frac_coords,
+                                                    frac_coords)
+            if np.min(dists) < self.DISTANCE_TOLERANCE:
+                raise ValueError("New site is too close to an existing "
+                                 "site!")
+
+        # Same index semantics as list.insert.
+        n = len(self)
+        i = min(max(n + i, 0) if i < 0 else i, n)
+        self._species_table, ind = _index_species([species],
+                                                  self._species_table)
+        self._species_index = np.insert(self._species_index, i, ind[0])
+        self._frac_coords = np.insert(self._frac_coords, i, frac_coords,
+                                      axis=0)
+        properties = properties or {}
+        for k in properties.keys():
+            if k not in self._site_properties:
+                self._site_properties[k] = [None] * n
+        for k, v in self._site_properties.items():
+            v.insert(i, properties.get(k))
 
     def add_site_property(self, property_name, values):
         """
@@ -2038,17 +2789,10 @@ class Structure(IStructure, collections.MutableSequence):
             values: A sequence of values. Must be same length as number of
                 sites.
         """
-        if len(values) != len(self._sites):
+        if len(values) != len(self):
             raise ValueError("Values must be same length as sites.")
-        for i in range(len(self._sites)):
-            site = self._sites[i]
-            props = site.properties
-            if not props:
-                props = {}
-            props[property_name] = values[i]
-            self._sites[i] = PeriodicSite(site.species_and_occu,
-                                          site.frac_coords, self._lattice,
-                                          properties=props)
+        self._site_properties[property_name] = list(values)
+        self._site_cache = {}
 
     def replace_species(self, species_mapping):
         """
@@ -2062,22 +2806,20 @@ class Structure(IStructure, collections.MutableSequence):
                 passed the mapping {Element('Si): {Element('Ge'):0.75,
                 Element('C'):0.25} } will have .375 Ge and .125 C.
         """
-        latt = self._lattice
         species_mapping = {get_el_sp(k): v
                            for k, v in species_mapping.items()}
 
-        def mod_site(site):
+        def mod_species(species_and_occu):
             c = Composition()
-            for sp, amt in site.species_and_occu.items():
+            for sp, amt in species_and_occu.items():
                 new_sp = species_mapping.get(sp, sp)
                 if isinstance(new_sp, collections.Mapping):
                     c += Composition(new_sp) * amt
                 else:
                     c += {new_sp: amt}
-            return PeriodicSite(c, site.frac_coords, latt,
-                                properties=site.properties)
+            return c
 
-        self._sites = list(map(mod_site, self._sites))
+        self._remap_species(mod_species)
 
     def replace(self, i, species, coords=None, coords_are_cartesian=False,
                 properties=None):
@@ -2086,7 +2828,7 @@ class Structure(IStructure, collections.MutableSequence):
         occupations.
 
         Args:
-            i (int): Index of the site in the _sites list.
+            i (int): Index of the site.
             species (species-like): Species of replacement site
             coords (3x1 array): Coordinates of replacement site. If None,
                 the current coordinates are assumed.
@@ -2096,15 +2838,13 @@ class Structure(IStructure, collections.MutableSequence):
                 too close to an existing site. Defaults to False.
         """
         if coords is None:
-            frac_coords = self[i].frac_coords
+            frac_coords = self._frac_coords[i]
         elif coords_are_cartesian:
             frac_coords = self._lattice.get_fractional_coords(coords)
         else:
             frac_coords = coords
 
-        new_site = PeriodicSite(species, frac_coords, self._lattice,
-                                properties=properties)
-        self._sites[i] = new_site
+        self._set_site(i, species, frac_coords, properties)
 
     def remove_species(self, species):
         """
@@ -2113,17 +2853,13 @@ class Structure(IStructure, collections.MutableSequence):
         Args:
             species: Sequence of species to remove, e.g., ["Li", "Na"].
         """
-        new_sites = []
         species = list(map(get_el_sp, species))
 
-        for site in self._sites:
-            new_sp_occu = {sp: amt for sp, amt in site.species_and_occu.items()
-                           if sp not in species}
-            if len(new_sp_occu) > 0:
-                new_sites.append(PeriodicSite(
-                    new_sp_occu, site.frac_coords, self._lattice,
-                    properties=site.properties))
-        self._sites = new_sites
+        self._remap_species(lambda c: {sp: amt for sp, amt in c.items()
+                                       if sp not in species})
+        keep = np.array([len(comp) > 0 for comp in self._species_table],
+                        dtype=bool)
+        self._select_sites(np.where(keep[self._species_index])[0])
 
     def remove_sites(self, indices):
         """
@@ -2132,8 +2868,7 @@ class Structure(IStructure, collections.MutableSequence):
         Args:
             indices: Sequence of indices of sites to delete.
         """
-        self._sites = [s for i, s in enumerate(self._sites)
-                       if i not in indices]
+        self._select_sites([i for i in range(len(self)) if i not in indices])
 
     def apply_operation(self, symmop):
         """
@@ -2144,15 +2879,10 @@ class Structure(IStructure, collections.MutableSequence):
         Args:
             symmop (SymmOp): Symmetry operation to apply.
         """
+        new_cart = symmop.operate_multi(self.cart_coords)
         self._lattice = Lattice([symmop.apply_rotation_only(row)
                                  for row in self._lattice.matrix])
-
-        def operate_site(site):
-            new_cart = symmop.operate(site.coords)
-            new_frac = self._lattice.get_fractional_coords(new_cart)
-            return PeriodicSite(site.species_and_occu, new_frac, self._lattice,
-                                properties=site.properties)
-        self._sites = list(map(operate_site, self._sites))
+        self._frac_coords = self._lattice.get_fractional_coords(new_cart)
 
     def modify_lattice(self, new_lattice):
         """
@@ -2163,13 +2893,6 @@ class Structure(IStructure, collections.MutableSequence):
             new_lattice (Lattice): New lattice
         """
         self._lattice = new_lattice
-        new_sites = []
-        for site in self._sites:
-            new_sites.append(PeriodicSite(site.species_and_occu,
-                                          site.frac_coords,
-                                          self._lattice,
-                                          properties=site.properties))
-        self._sites = new_sites
 
     def apply_strain(self, strain):
         """
@@ -2201,7 +2924,11 @@ class Structure(IStructure, collections.MutableSequence):
             reverse (bool): If set to True, then the list elements are sorted
                 as if each comparison were reversed.
         """
-        self._sites = sorted(self._sites, key=key, reverse=reverse)
+        sites = self.sites
+        sort_key = (lambda i: sites[i]) if key is None else \
+            (lambda i: key(sites[i]))
+        self._select_sites(sorted(range(len(sites)), key=sort_key,
+                                  reverse=reverse))
 
     def translate_sites(self, indices, vector, frac_coords=True,
                         to_unit_cell=True):
@@ -2220,19 +2947,15 @@ class Structure(IStructure, collections.MutableSequence):
         """
         if not isinstance(indices, collections.Iterable):
             indices = [indices]
+        indices = np.array(indices, dtype=np.int_)
 
-        for i in indices:
-            site = self._sites[i]
-            if frac_coords:
-                fcoords = site.frac_coords + vector
-            else:
-                fcoords = self._lattice.get_fractional_coords(site.coords
-                                                              + vector)
-            new_site = PeriodicSite(site.species_and_occu, fcoords,
-                                    self._lattice, to_unit_cell=to_unit_cell,
-                                    coords_are_cartesian=False,
-                                    properties=site.properties)
-            self._sites[i] = new_site
+        if not frac_coords:
+            vector = self._lattice.get_fractional_coords(vector)
+        fcoords = self._frac_coords.copy()
+        np.add.at(fcoords, indices, vector)
+        if to_unit_cell:
+            fcoords[indices] = np.mod(fcoords[indices], 1)
+        self._frac_coords = fcoords
 
     def perturb(self, distance):
         """
@@ -2249,8 +2972,11 @@ class Structure(IStructure, collections.MutableSequence):
             vnorm = np.linalg.norm(vector)
             return vector / vnorm * distance if vnorm != 0 else get_rand_vec()
 
-        for i in range(len(self._sites)):
-            self.translate_sites([i], get_rand_vec(), frac_coords=False)
+        vectors = np.array([get_rand_vec() for i in range(len(self))])
+        if len(vectors):
+            fcoords = self._frac_coords + \
+                self._lattice.get_fractional_coords(vectors)
+            self._frac_coords = np.mod(fcoords, 1)
 
     def add_oxidation_state_by_element(self, oxidation_states):
         """
@@ -2260,18 +2986,15 @@ class Structure(IStructure, collections.MutableSequence):
             oxidation_states (dict): Dict of oxidation states.
                 E.g., {"Li":1, "Fe":2, "P":5, "O":-2}
         """
-        try:
-            for i, site in enumerate(self._sites):
-                new_sp = {}
-                for el, occu in site.species_and_occu.items():
-                    sym = el.symbol
-                    new_sp[Specie(sym, oxidation_states[sym])] = occu
-                new_site = PeriodicSite(new_sp, site.frac_coords,
-                                        self._lattice,
-                                        coords_are_cartesian=False,
-                                        properties=site.properties)
-                self._sites[i] = new_site
+        def add_oxi(species_and_occu):
+            new_sp = {}
+            for el, occu in species_and_occu.items():
+                sym = el.symbol
+                new_sp[Specie(sym, oxidation_states[sym])] = occu
+            return new_sp
 
+        try:
+            self._remap_species(add_oxi)
         except KeyError:
             raise ValueError("Oxidation state of all elements must be "
                              "specified in the dictionary.")
@@ -2285,35 +3008,31 @@ class Structure(IStructure, collections.MutableSequence):
                 E.g., [1, 1, 1, 1, 2, 2, 2, 2, 5, 5, 5, 5, -2, -2, -2, -2]
         """
         try:
-            for i, site in enumerate(self._sites):
+            new_species = []
+            for i, species_and_occu in enumerate(self.species_and_occu):
                 new_sp = {}
-                for el, occu in site.species_and_occu.items():
+                for el, occu in species_and_occu.items():
                     sym = el.symbol
                     new_sp[Specie(sym, oxidation_states[i])] = occu
-                new_site = PeriodicSite(new_sp, site.frac_coords,
-                                        self._lattice,
-                                        coords_are_cartesian=False,
-                                        properties=site.properties)
-                self._sites[i] = new_site
-
+                new_species.append(new_sp)
         except IndexError:
             raise ValueError("Oxidation state of all sites must be "
                              "specified in the dictionary.")
+        self._species_table, self._species_index = \
+            _index_species(new_species)
 
     def remove_oxidation_states(self):
         """
         Removes oxidation states from a structure.
         """
-        for i, site in enumerate(self._sites):
+        def remove_oxi(species_and_occu):
             new_sp = collections.defaultdict(float)
-            for el, occu in site.species_and_occu.items():
+            for el, occu in species_and_occu.items():
                 sym = el.symbol
                 new_sp[Element(sym)] += occu
-            new_site = PeriodicSite(new_sp, site.frac_coords,
-                                    self._lattice,
-                                    coords_are_cartesian=False,
-                                    properties=site.properties)
-            self._sites[i] = new_site
+            return new_sp
+
+        self._remap_species(remove_oxi)
 
     def make_supercell(self, scaling_matrix):
         """
@@ -2340,16 +3059,17 @@ class Structure(IStructure, collections.MutableSequence):
         new_lattice = Lattice(np.dot(scale_matrix, self._lattice.matrix))
 
         f_lat = lattice_points_in_supercell(scale_matrix)
-        c_lat = new_lattice.get_cartesian_coords(f_lat)
-
-        new_sites = []
-        for site in self:
-            for v in c_lat:
-                s = PeriodicSite(site.species_and_occu, site.coords + v,
-                                 new_lattice, properties=site.properties,
-                                 coords_are_cartesian=True, to_unit_cell=True)
-                new_sites.append(s)
-        self._sites = new_sites
+        nimages = len(f_lat)
+
+        # Fractional coords in the new lattice are f . S^-1, so all images of
+        # all sites are generated with a single broadcasted operation.
+        fcoords = np.dot(self._frac_coords, np.linalg.inv(scale_matrix))
+        new_fcoords = np.mod(fcoords[:, None, :] + f_lat[None, :, :], 1)
+        self._frac_coords = new_fcoords.reshape((-1, 3))
+        self._species_index = np.repeat(self._species_index, nimages)
+        self._site_properties = {
+            k: [x for x in v for i in range(nimages)]
+            for k, v in self._site_properties.items()}
         self._lattice = new_lattice
 
     def scale_lattice(self, volume):
@@ -2366,9 +3086,11 @@ class Structure(IStructure, collections.MutableSequence):
         """
         Merges sites (adding occupancies) within tol of each other
         """
-        d = self.distance_matrix
-        d[np.triu_indices(len(d))] = np.inf
-        for inds in np.sort(np.argwhere(d < tol), axis=0)[::-1]:
+        d = self.get_distance_matrix(cutoff=tol).tocoo()
+        close = (d.row > d.col) & (d.data < tol)
+        pairs = np.column_stack([d.row[close], d.col[close]])
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        for inds in np.sort(pairs, axis=0)[::-1]:
             i, j = inds
             # j < i always, and largest i first, so any previously deleted
             # site is after i and j (so indices are still correct)
@@ -2379,6 +3101,7 @@ class Structure(IStructure, collections.MutableSequence):
             del self[i]
 
 
+
 class Molecule(IMolecule, collections.MutableSequence):
     """
     Mutable Molecule. It has all the methods in IMolecule, but in addition,
@@ -2760,6 +3483,54 @@ class Molecule(IMolecule, collections.MutableSequence):
             self._sites.append(site)
 
 
+def _index_species(species, table=None):
+    """
+    Converts a sequence of species into a table of unique species and an
+    index array into that table. Each distinct species is parsed and
+    validated only once, regardless of how many sites it occupies.
+
+    Args:
+        species: Sequence of species in any of the forms accepted by
+            PeriodicSite, e.g., "Fe", Element("Fe"), 26 or {"Fe": 0.5}.
+        table ([Composition]): An existing species table to extend. Defaults
+            to None, i.e., start from an empty table.
+
+    Returns:
+        ([Composition], numpy int array) of the species table and the index
+        of each site's species in the table.
+    """
+    table = [] if table is None else list(table)
+    lookup = {frozenset(comp.items()): i for i, comp in enumerate(table)}
+    parsed = {}
+    parsed_mappings = {}
+    indices = np.zeros(len(species), dtype=np.int_)
+    for n, sp in enumerate(species):
+        is_mapping = isinstance(sp, collections.Mapping)
+        cache, key = (parsed_mappings, id(sp)) if is_mapping else (parsed, sp)
+        try:
+            indices[n] = cache[key]
+            continue
+        except (KeyError, TypeError):
+            pass
+        if is_mapping:
+            comp = Composition(sp)
+            if comp.num_atoms > 1 + Composition.amount_tolerance:
+                raise ValueError("Species occupancies sum to more than 1!")
+        else:
+            comp = Composition({get_el_sp(sp): 1})
+        comp_key = frozenset(comp.items())
+        i = lookup.get(comp_key)
+        if i is None:
+            i = lookup[comp_key] = len(table)
+            table.append(comp)
+        try:
+            cache[key] = i
+        except TypeError:
+            pass
+        indices[n] = i
+    return table, indices
+
+
 class StructureError(Exception):
     """
     Exception class for Structure.
@@ -2778,7 +3549,6 @@ class FunctionalGroups(dict):
         has to be under the same directory of this function
         """
         dict.__init__(self)
-        with open(os.path.join(os.path.dirname(__file__),
-                               "func_groups.json"), "rt") as f:
-            for k, v in json.load(f).items():
-                self[k] = Molecule(v["species"], v["coords"])
+        for k, v in loadfn_cached(os.path.join(os.path.dirname(__file__),
+                                               "func_groups.json")).items():
+            self[k] = Molecule(v["species"], v["coords"])
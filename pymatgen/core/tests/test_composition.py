@@ -22,7 +22,9 @@ import unittest
 
 from pymatgen.core.periodic_table import Element
 from pymatgen.core.composition import Composition, CompositionError, \
-    ChemicalPotential
+    ChemicalPotential, CompositionMatrix
+from pymatgen.util.testing import PymatgenTest
+from pymatgen.phasediagram.entries import PDEntry
 import random
 
 
@@ -324,6 +326,79 @@ class CompositionTest(unittest.TestCase):
         for k, v in special_formulas.items():
             self.assertEqual(Composition(k).reduced_formula, v)
 
+    def test_cached_properties(self):
+        c = Composition("Li4Fe4P4O16")
+        self.assertIs(c.reduced_composition, c.reduced_composition)
+        self.assertEqual(c.get_reduced_formula_and_factor(), ("LiFePO4", 4))
+        self.assertEqual(c.get_reduced_composition_and_factor(),
+                         (Composition("LiFePO4"), 4))
+        self.assertEqual(c.weight, c.weight)
+        self.assertEqual(str(c.weight.unit), "amu")
+        self.assertEqual(hash(c), hash(Composition("LiFePO4")))
+
+        #Memoized parsing must not leak state between compositions, e.g.,
+        #zero amounts are stripped from each new composition.
+        for i in range(2):
+            c = Composition("Li0FeO")
+            self.assertEqual(c.formula, "Fe1 O1")
+            self.assertEqual(Composition("Ca3(PO4)2").formula, "Ca3 P2 O8")
+        self.assertRaises(CompositionError, Composition, "(co2)(po4)2")
+        self.assertRaises(CompositionError, Composition, "(co2)(po4)2")
+
+
+class CompositionMatrixTest(PymatgenTest):
+
+    def setUp(self):
+        self.comps = [Composition(f) for f in
+                      ["Li4Fe4P4O16", "Fe2O3", "Li2O2", "LiO", "O2",
+                       "Li1.5Si0.5", "Li3Fe2(PO4)3"]]
+
+    def test_matrix(self):
+        for sparse in [False, True]:
+            cm = CompositionMatrix.from_compositions(self.comps,
+                                                     sparse=sparse)
+            self.assertEqual(len(cm), 7)
+            self.assertEqual(cm.shape, (7, 5))
+            self.assertEqual(cm.to_compositions(), self.comps)
+            self.assertArrayAlmostEqual(cm.num_atoms,
+                                        [c.num_atoms for c in self.comps])
+            self.assertArrayAlmostEqual(cm.weights,
+                                        [c.weight for c in self.comps])
+            self.assertArrayEqual(cm.get_hashes(),
+                                  [hash(c) for c in self.comps])
+            self.assertArrayAlmostEqual(cm.get_amounts("Fe"),
+                                        [4, 2, 0, 0, 0, 0, 2])
+            self.assertArrayAlmostEqual(cm.get_amounts("Na"), [0] * 7)
+
+            els = [Element("Li"), Element("O")]
+            self.assertArrayAlmostEqual(
+                cm.get_atomic_fractions(els),
+                [[c.get_atomic_fraction(el) for el in els]
+                 for c in self.comps])
+            self.assertEqual(cm.fractional_composition.to_compositions(),
+                             [c.fractional_composition for c in self.comps])
+            self.assertArrayAlmostEqual(cm.normalize(10).num_atoms, [10] * 7)
+
+            reduced, factors = cm.get_reduced_composition_and_factor()
+            self.assertArrayAlmostEqual(
+                factors, [c.get_reduced_composition_and_factor()[1]
+                          for c in self.comps])
+            self.assertEqual(reduced.to_compositions(),
+                             [c.get_reduced_composition_and_factor()[0]
+                              for c in self.comps])
+
+    def test_elements_subset(self):
+        entries = [PDEntry(c, 0) for c in self.comps]
+        cm = CompositionMatrix.from_entries(entries, ["Li", "O"])
+        self.assertEqual(cm.shape, (7, 2))
+        #Fractions are still relative to the full composition.
+        self.assertArrayAlmostEqual(
+            cm.get_atomic_fractions(),
+            [[c.get_atomic_fraction(Element("Li")),
+              c.get_atomic_fraction(Element("O"))] for c in self.comps])
+        self.assertRaises(CompositionError, CompositionMatrix, [[1, 2]],
+                          ["Li"])
+
 
 class ChemicalPotentialTest(unittest.TestCase):
 
@@ -170,6 +170,20 @@ class LatticeTestCase(PymatgenTest):
             self.assertAlmostEqual(reduced_random_latt.volume,
                                    random_latt.volume)
 
+    def test_reduced_lattice_cache(self):
+        matrix = [[2.0, 0, 0], [7.0, 3.0, 0], [1.0, 5.0, 4.0]]
+        latt = Lattice(matrix)
+        lll = latt.get_lll_reduced_lattice()
+        #The LLL reduction must not modify the original lattice.
+        self.assertArrayAlmostEqual(latt.matrix, matrix)
+        self.assertIs(latt.get_lll_reduced_lattice(), lll)
+        self.assertIsNot(latt.get_lll_reduced_lattice(0.5), lll)
+        niggli = latt.get_niggli_reduced_lattice()
+        self.assertIs(latt.get_niggli_reduced_lattice(), niggli)
+        #Identical lattices share results through the process-wide cache.
+        self.assertIs(Lattice(matrix).get_niggli_reduced_lattice(), niggli)
+        self.assertIs(Lattice(matrix).get_lll_reduced_lattice(), lll)
+
     def test_get_niggli_reduced_lattice(self):
         latt = Lattice.from_parameters(3, 5.196, 2, 103 + 55 / 60,
                                        109 + 28 / 60,
@@ -241,6 +255,7 @@ class LatticeTestCase(PymatgenTest):
         for (aligned_out, rot_out, scale_out) in latt.find_all_mappings(latt2):
             self.assertArrayAlmostEqual(np.inner(latt2.matrix, rot_out), aligned_out.matrix)
             self.assertArrayAlmostEqual(np.dot(scale_out, latt.matrix), aligned_out.matrix)
+            self.assertTrue(np.issubdtype(scale_out.dtype, np.integer))
             self.assertArrayAlmostEqual(aligned_out.lengths_and_angles, latt2.lengths_and_angles)
             self.assertFalse(np.allclose(aligned_out.lengths_and_angles,
                                          latt.lengths_and_angles))
@@ -248,11 +263,35 @@ class LatticeTestCase(PymatgenTest):
         latt = Lattice.orthorhombic(9, 9, 5)
         self.assertEqual(len(list(latt.find_all_mappings(latt))), 16)
 
+        #the lattice points of the largest radius so far are reused
+        latt = Lattice(m)
+        mappings = list(latt.find_all_mappings(latt2))
+        self.assertEqual(len(list(latt.find_all_mappings(latt2))),
+                         len(mappings))
+        for r in [3, 1.5]:
+            frac, dists = latt._get_lattice_points(r)
+            pts = latt.get_points_in_sphere([[0, 0, 0]], [0, 0, 0], r)
+            self.assertArrayAlmostEqual(frac, [p[0] for p in pts])
+            self.assertArrayAlmostEqual(dists, [p[1] for p in pts])
+        self.assertEqual(latt._lattice_points[0], 3)
+
         #catch the singular matrix error
         latt = Lattice.from_lengths_and_angles([1,1,1], [10,10,10])
         for l, _, _ in latt.find_all_mappings(latt, ltol=0.05, atol=11):
             self.assertTrue(isinstance(l, Lattice))
 
+        #mappings sorted by distortion, the unswapped axes come first
+        latt = Lattice.orthorhombic(9, 9.2, 5)
+        latt2 = Lattice.orthorhombic(9.1, 9.1, 5)
+        mappings = list(latt.find_all_mappings(latt2, ltol=0.05, atol=1))
+        sorted_mappings = list(latt.find_all_mappings(
+            latt2, ltol=0.05, atol=1, sort_by_distortion=True))
+        self.assertEqual(len(sorted_mappings), len(mappings))
+        self.assertArrayAlmostEqual(sorted_mappings[0][0].abc, latt.abc)
+        distortions = [np.linalg.norm(l.metric_tensor - latt2.metric_tensor)
+                       for l, _, _ in sorted_mappings]
+        self.assertEqual(distortions, sorted(distortions))
+
     def test_to_from_dict(self):
         d = self.tetragonal.as_dict()
         t = Lattice.from_dict(d)
@@ -316,6 +355,32 @@ class LatticeTestCase(PymatgenTest):
         self.assertEqual(len(latt.get_points_in_sphere(
             pts, [0.5, 0.5, 0.5], 0.5)), 515)
 
+    def test_get_points_in_spheres(self):
+        latt = Lattice.cubic(1)
+        pts = []
+        for a, b, c in itertools.product(range(10), range(10), range(10)):
+            pts.append([a / 10, b / 10, c / 10])
+        sphere_centers = np.array([[0, 0, 0], [0.5, 0.5, 0.5],
+                                   [3.5, -0.5, 0.5]])
+        centers, indices, images, dists = latt.get_points_in_spheres(
+            pts, sphere_centers, [0.1, 0.5, 0.5])
+        self.assertArrayEqual(np.bincount(centers), [7, 515, 515])
+        coords = latt.get_cartesian_coords(np.array(pts)[indices] + images)
+        self.assertArrayAlmostEqual(
+            np.sum((coords - sphere_centers[centers]) ** 2, axis=1) ** 0.5,
+            dists)
+
+        #now try with small loop threshold
+        from pymatgen.util import coord_utils
+        prev_threshold = coord_utils.LOOP_THRESHOLD
+        coord_utils.LOOP_THRESHOLD = 10
+        chunked = latt.get_points_in_spheres(
+            pts, [[0, 0, 0], [0.5, 0.5, 0.5], [3.5, -0.5, 0.5]],
+            [0.1, 0.5, 0.5])
+        coord_utils.LOOP_THRESHOLD = prev_threshold
+        for a, b in zip(chunked, [centers, indices, images, dists]):
+            self.assertArrayAlmostEqual(a, b)
+
     def test_get_all_distances(self):
         fcoords = np.array([[0.3, 0.3, 0.5],
                             [0.1, 0.1, 0.3],
@@ -338,6 +403,17 @@ class LatticeTestCase(PymatgenTest):
         f1 = [0, 0, 17]
         f2 = [0, 0, 10]
         self.assertEqual(lattice.get_all_distances(f1, f2)[0, 0], 0)
+        #test chunked evaluation and single precision output
+        output3 = lattice.get_all_distances(fcoords, fcoords, max_memory=1,
+                                            dtype=np.float32)
+        self.assertEqual(output3.dtype, np.float32)
+        self.assertArrayAlmostEqual(output3, expected, 3)
+        #test sparse output
+        sparse = lattice.get_all_distances(fcoords, fcoords, cutoff=3.3)
+        self.assertEqual(sparse.shape, (5, 5))
+        self.assertArrayAlmostEqual(sparse.toarray(),
+                                    np.where(expected <= 3.3, expected, 0), 3)
+        self.assertEqual(sparse.nnz, np.sum(expected <= 3.3))
 
     def test_monoclinic(self):
         lengths, angles = self.monoclinic.lengths_and_angles
@@ -3,7 +3,7 @@
 from __future__ import unicode_literals
 
 from pymatgen.util.testing import PymatgenTest
-from pymatgen.core.operations import SymmOp
+from pymatgen.core.operations import SymmOp, SymmOpSet
 import numpy as np
 
 
@@ -109,6 +109,52 @@ class SymmOpTestCase(PymatgenTest):
         self.assertRaises(ValueError, self.op.as_xyz_string)
 
 
+class SymmOpSetTestCase(PymatgenTest):
+
+    def setUp(self):
+        ops = ["x, y, z", "-x, -y, -z", "-x, y, -z+1/2", "x, -y, z+1/2"]
+        self.opset = SymmOpSet([SymmOp.from_xyz_string(s) for s in ops])
+
+    def test_operate_multi(self):
+        points = np.array([[0.1, 0.2, 0.3], [0.5, 0, 0.25]])
+        images = self.opset.operate_multi(points)
+        self.assertEqual(images.shape, (4, 2, 3))
+        for op, im in zip(self.opset, images):
+            self.assertArrayAlmostEqual(op.operate_multi(points), im)
+        self.assertArrayAlmostEqual(self.opset.operate_multi(points[0]),
+                                    images[:, 0])
+
+    def test_get_orbits(self):
+        orbits = self.opset.get_orbits([[0.1, 0.2, 0.3], [0, 0.3, 0.25],
+                                        [0, 0, 0]], pbc=True)
+        self.assertEqual([len(o) for o in orbits], [4, 2, 2])
+        self.assertArrayAlmostEqual(orbits[0], [[0.1, 0.2, 0.3],
+                                                [0.9, 0.8, 0.7],
+                                                [0.9, 0.2, 0.2],
+                                                [0.1, 0.8, 0.8]])
+        #images on opposite sides of the cell are the same point
+        orbit = self.opset.get_orbit([0, 0.3, 0.2500001], pbc=True)
+        self.assertEqual(len(orbit), 2)
+        orbit = self.opset.get_orbit([1e-7, 0, 0], pbc=True)
+        self.assertEqual(len(orbit), 2)
+        #no periodic boundary conditions
+        orbit = self.opset.get_orbit([0, 0, 0])
+        self.assertArrayAlmostEqual(orbit, [[0, 0, 0], [0, 0, 0.5]])
+        self.assertEqual(len(self.opset.get_orbit([0, 0, 0.25])), 3)
+
+    def test_get_orbit_tolerance(self):
+        opset = SymmOpSet([SymmOp.from_rotation_and_translation(
+            np.eye(3), [x, 0, 0]) for x in [0, 0.06, 0.12]])
+        #Each image is only compared to the images kept so far, so the
+        #third image is kept although it is close to the dropped second.
+        self.assertArrayAlmostEqual(opset.get_orbit([0, 0, 0], tol=0.1),
+                                    [[0, 0, 0], [0.12, 0, 0]])
+        opset = SymmOpSet([SymmOp.from_rotation_and_translation(
+            np.eye(3), [x, x, x]) for x in [0, 0.04]])
+        self.assertEqual(len(opset.get_orbit([0, 0, 0], tol=0.1)), 1)
+        self.assertEqual(len(opset.get_orbit([0, 0, 0], tol=0.1, ord=1)), 2)
+
+
 if __name__ == '__main__':
     import unittest
     unittest.main()
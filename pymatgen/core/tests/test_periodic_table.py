@@ -121,6 +121,15 @@ class ElementTestCase(unittest.TestCase):
         el1 = Element("Fe")
         o = pickle.dumps(el1)
         self.assertEqual(el1, pickle.loads(o))
+        #Test that interned instances are preserved
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            self.assertIs(pickle.loads(pickle.dumps(el1, protocol)), el1)
+        self.assertIs(deepcopy(el1), el1)
+
+    def test_interning(self):
+        el = Element("Fe")
+        self.assertIs(Element(el), el)
+        self.assertIs(Element("Fe"), el)
 
 
 class SpecieTestCase(unittest.TestCase):
@@ -169,6 +178,28 @@ class SpecieTestCase(unittest.TestCase):
 
     def test_pickle(self):
         self.assertEqual(self.specie1, pickle.loads(pickle.dumps(self.specie1)))
+        self.assertIs(pickle.loads(pickle.dumps(self.specie4)), self.specie4)
+        self.assertIs(deepcopy(self.specie4), self.specie4)
+
+    def test_interning(self):
+        self.assertIs(Specie("Fe", 2), self.specie3)
+        self.assertIs(Specie("Fe", 2, {"spin": 5}), self.specie4)
+        self.assertIsNot(self.specie3, self.specie4)
+        self.assertIs(get_el_sp("Fe2+"), get_el_sp("Fe2+"))
+        self.assertEqual(get_el_sp("Fe2+"), self.specie3)
+        self.assertEqual(hash(Specie("Fe", 2)), 26002)
+        self.assertIs(Specie(Element("Fe"), 2), self.specie3)
+        #The interned instance must not share the caller's properties dict.
+        p = {"spin": 4}
+        sp = Specie("Fe", 3, p)
+        p["spin"] = 1
+        self.assertEqual(sp.spin, 4)
+        self.assertEqual(Specie("Fe", 3, {"spin": 4}).spin, 4)
+        #Equal int and float oxidation states are kept as given.
+        self.assertIsInstance(Specie("Fe", 2.0).oxi_state, float)
+        self.assertIsInstance(Specie("Fe", 2).oxi_state, int)
+        self.assertEqual(Specie("Fe", 2.0), Specie("Fe", 2))
+        self.assertEqual(Specie("Fe", 2.0).as_dict()["oxidation_state"], 2.0)
 
     def test_get_crystal_field_spin(self):
         self.assertEqual(Specie("Fe", 2).get_crystal_field_spin(), 4)
@@ -224,6 +255,9 @@ class DummySpecieTestCase(unittest.TestCase):
         self.assertFalse(DummySpecie("Xg") == DummySpecie("Xh"))
         self.assertFalse(DummySpecie("Xg") == DummySpecie("Xg", 3))
         self.assertTrue(DummySpecie("Xg", 3) == DummySpecie("Xg", 3))
+        self.assertIsInstance(DummySpecie("Xg", 3.0).oxi_state, float)
+        self.assertIsInstance(DummySpecie("Xg", 3).oxi_state, int)
+        self.assertTrue(DummySpecie("Xg", 3.0) == DummySpecie("Xg", 3))
 
     def test_from_string(self):
         sp = DummySpecie.from_string("X")
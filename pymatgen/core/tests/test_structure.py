@@ -9,7 +9,11 @@ from pymatgen.core.operations import SymmOp
 from pymatgen.core.structure import IStructure, Structure, IMolecule, \
     StructureError, Molecule
 from pymatgen.core.lattice import Lattice
+from pymatgen.core.sites import PeriodicSite
+from pymatgen.core.bonds import CovalentBond
 import random
+import pickle
+import numpy as np
 import warnings
 import os
 
@@ -35,6 +39,56 @@ class IStructureTest(PymatgenTest):
             self.lattice, ["Si"] * 2, coords,
             site_properties={'magmom': [5, -5]})
 
+    def test_hash(self):
+        s = self.struct
+        #Site order and numerical noise do not change the hash.
+        s2 = IStructure(self.lattice, ["Si"] * 2,
+                        [[0.75, 0.5, 0.75 + 1e-9], [0, 0, 0]])
+        self.assertEqual(s2, s)
+        self.assertEqual(hash(s2), hash(s))
+        s3 = IStructure(self.lattice, ["Si"] * 2, [[0, 0, 0], [0.7, 0.5, 0.75]])
+        self.assertNotEqual(s3, s)
+        self.assertEqual(len({s, s2, s3}), 2)
+        #Different numbers of sites of the same composition do not collide.
+        s4 = IStructure(self.lattice, ["Si"], [[0, 0, 0]])
+        self.assertNotEqual(hash(s4), hash(s))
+        #Equal structures on either side of a quantization boundary must
+        #still compare and hash equal.
+        for a1, a2 in [(4.0, 3.999999999999), (3.84499999, 3.84500001)]:
+            t1 = IStructure(Lattice.cubic(a1), ["Si"], [[0, 0, 0]])
+            t2 = IStructure(Lattice.cubic(a2), ["Si"], [[0, 0, 0]])
+            self.assertEqual(t1, t2)
+            self.assertEqual(hash(t1), hash(t2))
+            self.assertEqual(len({t1, t2}), 1)
+
+    def test_contains_and_eq(self):
+        s = self.struct
+        for site in s:
+            self.assertIn(site, s)
+        site = PeriodicSite("Si", [0.75, 0.5, 0.75 + 1e-7], self.lattice)
+        self.assertIn(site, s)
+        self.assertNotIn(PeriodicSite("Si", [0.75, 0.5, 0.76], self.lattice),
+                         s)
+        self.assertNotIn(PeriodicSite("Ge", [0, 0, 0], self.lattice), s)
+        self.assertNotIn(PeriodicSite("Si", [0, 0, 0], self.lattice,
+                                      properties={"magmom": 5}), s)
+        self.assertNotIn(PeriodicSite("Si", [0, 0, 0], Lattice.cubic(3)), s)
+        self.assertIn(PeriodicSite("Si", [0, 0, 0], self.lattice,
+                                   properties={"magmom": 5}),
+                      self.propertied_structure)
+        self.assertNotIn(PeriodicSite("Si", [0, 0, 0], self.lattice),
+                         self.propertied_structure)
+
+        reordered = IStructure.from_sites([s[1], s[0]])
+        self.assertEqual(reordered, s)
+        self.assertEqual(Structure.from_sites(s), s)
+        other = IStructure(self.lattice, ["Si", "Ge"],
+                           [[0, 0, 0], [0.75, 0.5, 0.75]])
+        self.assertNotEqual(other, s)
+        self.assertEqual(other.indices_from_symbol("Ge"), (1,))
+        self.assertEqual(other.indices_from_symbol("Si"), (0,))
+        self.assertEqual(other.indices_from_symbol("Fe"), ())
+
     def test_bad_structure(self):
         coords = list()
         coords.append([0, 0, 0])
@@ -95,6 +149,49 @@ class IStructureTest(PymatgenTest):
                                1.50332963784, 2,
                                "Distance calculated wrongly!")
 
+    def test_from_arrays(self):
+        s = IStructure.from_arrays(self.lattice, [1, 0, 1],
+                                   ["O", {"Fe": 0.5, "Mn": 0.5}],
+                                   [[0, 0, 0], [0.5, 0.5, 0.5], [1.2, 0, 0]],
+                                   to_unit_cell=True,
+                                   site_properties={"magmom": [1, 2, 3]})
+        self.assertEqual(s, IStructure(
+            self.lattice, [{"Fe": 0.5, "Mn": 0.5}, "O", {"Fe": 0.5, "Mn": 0.5}],
+            [[0, 0, 0], [0.5, 0.5, 0.5], [0.2, 0, 0]],
+            site_properties={"magmom": [1, 2, 3]}))
+        self.assertEqual(s.species_and_occu[1], Composition("O"))
+        self.assertArrayAlmostEqual(s.frac_coords[2], [0.2, 0, 0])
+        self.assertEqual(s.site_properties["magmom"], [1, 2, 3])
+        self.assertEqual(s.composition.formula, "Mn1 Fe1 O1")
+        s = Structure.from_arrays(self.lattice.matrix, [0, 0], ["Si"],
+                                  self.struct.cart_coords,
+                                  coords_are_cartesian=True)
+        self.assertEqual(s, self.struct)
+        s.append("Li", [0.5, 0, 0])
+        self.assertEqual(s.formula, "Li1 Si2")
+        self.assertRaises(StructureError, IStructure.from_arrays,
+                          self.lattice, [0], ["Si"], [[0, 0, 0], [0.5, 0, 0]])
+
+    def test_get_distances(self):
+        s = self.get_structure("LiFePO4")
+        i, j = np.triu_indices(len(s))
+        self.assertArrayAlmostEqual(s.get_distances(i, j),
+                                    [s.get_distance(a, b) for a, b in zip(i, j)])
+        self.assertArrayAlmostEqual(s.get_distances(i, j),
+                                    s.distance_matrix[i, j])
+        jimage = np.random.randint(-2, 3, (len(i), 3))
+        self.assertArrayAlmostEqual(
+            s.get_distances(i, j, jimage),
+            [s.get_distance(a, b, x) for a, b, x in zip(i, j, jimage)])
+        self.assertEqual(s.get_distances([[0, 1]], 2).shape, (1, 2))
+        #angles and dihedrals use the minimum image convention
+        s = Structure(Lattice.cubic(3), ["Li"] * 4,
+                      [[0, 0, 0], [0.9, 0, 0], [0.9, 0.9, 0], [0.9, 0.9, 0.9]])
+        self.assertArrayAlmostEqual(s.get_angles([1, 0], [0, 1], [2, 2]),
+                                    [45, 90])
+        self.assertArrayAlmostEqual(s.get_dihedrals([0], [1], [2], [3]),
+                                    [-90])
+
     def test_as_dict(self):
         si = Specie("Si", 4)
         mn = Element("Mn")
@@ -277,6 +374,13 @@ class IStructureTest(PymatgenTest):
         self.assertEqual(len(fcc_ag_prim), 1)
         self.assertAlmostEqual(fcc_ag_prim.volume, 17.10448225)
 
+        nacl = Structure(Lattice.cubic(5.69), ["Na", "Cl"],
+                         [[0, 0, 0], [0.5, 0.5, 0.5]])
+        nacl.make_supercell([[1, 1, 0], [-1, 1, 0], [0, 0, 3]])
+        nacl_prim = nacl.get_primitive_structure()
+        self.assertEqual(nacl_prim.formula, "Na1 Cl1")
+        self.assertAlmostEqual(nacl_prim.volume, 5.69 ** 3)
+
     def test_primitive_positions(self):
         coords = [[0, 0, 0], [0.3, 0.35, 0.45]]
         s = Structure(Lattice.from_parameters(1,2,3,50,66,88), ["Ag"] * 2, coords)
@@ -319,6 +423,30 @@ class IStructureTest(PymatgenTest):
         s.make_supercell([2,2,2])
         self.assertEqual(sum(map(len, s.get_all_neighbors(3))), 976)
 
+    def test_get_sites_in_spheres(self):
+        s = self.struct
+        pts = [[0, 0, 0], [1.5, 2, -1], s[1].coords]
+        all_nn = s.get_sites_in_spheres(pts, [2.5, 3, 4], include_index=True)
+        for pt, r, nn in zip(pts, [2.5, 3, 4], all_nn):
+            single = s.get_sites_in_sphere(pt, r, include_index=True)
+            self.assertEqual(len(nn), len(single))
+            for (site, d, i), (site2, d2, i2) in zip(nn, single):
+                self.assertEqual(site, site2)
+                self.assertAlmostEqual(d, site.distance_from_point(pt))
+                self.assertTrue(site.is_periodic_image(s[i]))
+
+    def test_get_neighbor_list(self):
+        s = self.struct
+        r = random.uniform(3, 6)
+        centers, points, images, dists = s.get_neighbor_list(r)
+        all_nn = s.get_all_neighbors(r, True)
+        self.assertEqual(len(dists), sum(map(len, all_nn)))
+        for i in range(len(s)):
+            self.assertEqual(np.sum(centers == i), len(all_nn[i]))
+        fcoords = s.frac_coords[points] + images
+        d = s.lattice.get_cartesian_coords(fcoords) - s.cart_coords[centers]
+        self.assertArrayAlmostEqual(np.sum(d ** 2, axis=1) ** 0.5, dists)
+
     def test_get_all_neighbors_outside_cell(self):
         s = Structure(Lattice.cubic(2), ['Li', 'Li', 'Li', 'Si'],
                       [[3.1] * 3, [0.11] * 3, [-1.91] * 3, [0.5] * 3])
@@ -334,6 +462,10 @@ class IStructureTest(PymatgenTest):
         ans = [[0., 2.3516318],
                [2.3516318, 0.]]
         self.assertArrayAlmostEqual(self.struct.distance_matrix, ans)
+        d = self.struct.get_distance_matrix(cutoff=3, dtype=np.float32)
+        self.assertEqual(d.dtype, np.float32)
+        self.assertArrayAlmostEqual(d.toarray(), ans)
+        self.assertEqual(self.struct.get_distance_matrix(cutoff=2).nnz, 0)
 
     def test_to_from_file_string(self):
         for fmt in ["cif", "json", "poscar", "cssr"]:
@@ -367,6 +499,23 @@ class StructureTest(PymatgenTest):
                            [0.00, -2.2171384943, 3.1355090603]])
         self.structure = Structure(lattice, ["Si", "Si"], coords)
 
+    def test_site_views(self):
+        s = self.structure
+        #Site views are cached until the structure is modified.
+        self.assertIs(s[1], s[1])
+        self.assertIs(list(s)[1], s[1])
+        site = s[1]
+        s.translate_sites([1], [0.1, 0, 0])
+        self.assertIsNot(s[1], site)
+        self.assertArrayAlmostEqual(s[1].frac_coords, [0.85, 0.5, 0.75])
+        s.add_site_property("magmom", [1, 2])
+        self.assertEqual(s[1].magmom, 2)
+        s[1] = "Ge"
+        self.assertEqual(s[1].specie, Element("Ge"))
+        s2 = pickle.loads(pickle.dumps(s))
+        self.assertEqual(s2, s)
+        self.assertEqual(s2[1].specie, Element("Ge"))
+
     def test_mutable_sequence_methods(self):
         s = self.structure
         s[0] = "Fe"
@@ -388,6 +537,23 @@ class StructureTest(PymatgenTest):
     def test_non_hash(self):
         self.assertRaises(TypeError, dict, [(self.structure, 1)])
 
+    def test_array_storage(self):
+        s = self.structure
+        fcoords = s.frac_coords
+        self.assertFalse(fcoords.flags.writeable)
+        s.translate_sites([0], [0.1, 0, 0])
+        # Earlier snapshots are not affected by later mutations.
+        self.assertArrayAlmostEqual(fcoords[0], [0, 0, 0])
+        self.assertArrayAlmostEqual(s[0].frac_coords, [0.1, 0, 0])
+        # Sites are views; modifying a returned site does not alter s.
+        site = s[1]
+        site.properties["magmom"] = 3
+        self.assertNotIn("magmom", s.site_properties)
+        s.append("O", [0.5, 0.5, 0.5])
+        s.replace_species({"Si": "Ge"})
+        self.assertEqual(s.formula, "Ge2 O1")
+        self.assertEqual(len(s._species_table), 2)
+
     def test_sort(self):
         s = self.structure
         s[0] = "F"
@@ -561,6 +727,17 @@ class StructureTest(PymatgenTest):
         self.assertArrayAlmostEqual(self.structure.lattice.abc,
                                     [15.360792, 35.195996, 7.680396], 5)
 
+        s = Structure(Lattice.cubic(3), ["Li", "O"],
+                      [[0.1, 0.2, 0.3], [0.5, 0.5, 0.5]],
+                      site_properties={"magmom": [1, 2]})
+        s.make_supercell([[2, 1, 0], [0, 3, 0], [1, 0, 1]])
+        self.assertEqual(s.formula, "Li6 O6")
+        self.assertEqual(s.site_properties["magmom"], [1] * 6 + [2] * 6)
+        self.assertTrue(np.all((s.frac_coords >= 0) & (s.frac_coords < 1)))
+        # Every site is a periodic image of the original site.
+        diff = s.cart_coords[:6] - [0.3, 0.6, 0.9]
+        self.assertArrayAlmostEqual(diff / 3, np.round(diff / 3))
+
     def test_disordered_supercell_primitive_cell(self):
         l = Lattice.cubic(2)
         f = [[0.5, 0.5, 0.5]]
@@ -690,8 +867,39 @@ class IMoleculeTest(PymatgenTest):
         self.mol2 = Molecule(["C", "O", "N", "S"], coords)
         self.assertAlmostEqual(self.mol2.get_dihedral(0, 1, 2, 3), -90)
 
+        self.assertArrayAlmostEqual(self.mol.get_angles([1, 3], [0, 1], [2, 2]),
+                                    [109.47122144618737, 60.00001388659683])
+        self.assertArrayAlmostEqual(
+            self.mol.get_dihedrals([0, 0], [1, 2], [2, 1], [3, 3]),
+            [self.mol.get_dihedral(0, 1, 2, 3),
+             self.mol.get_dihedral(0, 2, 1, 3)])
+        self.assertArrayAlmostEqual(self.mol.get_distances([0, 1], [1, 2]),
+                                    [self.mol.get_distance(0, 1),
+                                     self.mol.get_distance(1, 2)])
+
     def test_get_covalent_bonds(self):
         self.assertEqual(len(self.mol.get_covalent_bonds()), 4)
+        mol = Molecule(["C", "H", "H", "H", "H"] * 2,
+                       self.coords + [[c[0], c[1], c[2] + 2.5]
+                                      for c in self.coords])
+        bonds = mol.get_covalent_bonds()
+        self.assertEqual(len(bonds), 8)
+        for b in bonds:
+            self.assertTrue(CovalentBond.is_bonded(b.site1, b.site2))
+        self.assertRaises(ValueError,
+                          Molecule(["C", "Zr"], [[0, 0, 0], [0, 0, 1]])
+                          .get_covalent_bonds)
+
+    def test_get_fragments(self):
+        self.assertEqual(len(self.mol.get_fragments()), 1)
+        coords = self.coords + [[c[0] + 5, c[1], c[2]]
+                                for c in self.coords[:3]]
+        mol = Molecule(["C", "H", "H", "H", "H", "C", "H", "H"], coords)
+        frags = mol.get_fragments()
+        self.assertEqual([f.formula for f in frags], ["H4 C1", "H2 C1"])
+        (mol1, mol2) = mol.break_bond(0, 5)
+        self.assertEqual(mol1, frags[0])
+        self.assertEqual(mol2, frags[1])
 
     def test_properties(self):
         self.assertEqual(len(self.mol), 5)
@@ -745,6 +953,16 @@ Site: H (-0.5134, 0.8892, -0.3630)"""
         nn = self.mol.get_neighbors(self.mol[0], 2)
         self.assertEqual(len(nn), 4)
 
+    def test_get_sites_in_spheres(self):
+        nn = self.mol.get_sites_in_spheres([[0, 0, 0], [0, 0, 1.089]],
+                                           [1.5, 0.5])
+        self.assertEqual(len(nn[0]), 5)
+        self.assertEqual(nn[1], [(self.mol[1], 0)])
+        centers, points, dists = self.mol.get_neighbor_list(1.5)
+        self.assertArrayEqual(centers, [0, 0, 0, 0, 1, 2, 3, 4])
+        self.assertArrayEqual(points, [1, 2, 3, 4, 0, 0, 0, 0])
+        self.assertArrayAlmostEqual(dists, [1.089] * 8, decimal=5)
+
     def test_get_neighbors_in_shell(self):
         nn = self.mol.get_neighbors_in_shell([0, 0, 0], 0, 1)
         self.assertEqual(len(nn), 1)
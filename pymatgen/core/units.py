@@ -26,7 +26,7 @@ import six
 import collections
 from numbers import Number
 import numbers
-from functools import partial
+from functools import partial, wraps
 from pymatgen.core.physical_constants import N_a, e
 import re
 
@@ -801,6 +801,7 @@ def unitized(unit):
 
     """
     def wrap(f):
+        @wraps(f)
         def wrapped_f(*args, **kwargs):
             val = f(*args, **kwargs)
             #print(val)
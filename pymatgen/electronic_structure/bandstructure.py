@@ -303,13 +303,14 @@ class BandStructure(object):
                             for i in range(len(self._kpoints))]
                             for j in range(self._nb_bands)]
 
+            species = [str(sp) for sp in structure.species]
             for i, j, k in itertools.product(
                     list(range(self._nb_bands)), list(range(len(self._kpoints))),
                     list(range(structure.num_sites))):
                 for orb in self._projections[Spin.up][i][j]:
-                    if str(structure[k].specie) in dictio:
-                        if str(orb)[0] in dictio[str(structure[k].specie)]:
-                            result[spin][i][j][str(structure[k].specie)]\
+                    if species[k] in dictio:
+                        if str(orb)[0] in dictio[species[k]]:
+                            result[spin][i][j][species[k]]\
                                 [str(orb)[0]] += \
                                 self._projections[spin][i][j][orb][k]
         return result
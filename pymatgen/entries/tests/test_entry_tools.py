@@ -36,6 +36,8 @@ class FuncTest(unittest.TestCase):
         self.assertLess(len(groups), len(entries))
         #Make sure no entries are left behind
         self.assertEqual(sum([len(g) for g in groups]), len(entries))
+        self.assertEqual(group_entries_by_structure(entries, ncpus=2),
+                         groups)
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
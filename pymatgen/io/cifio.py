@@ -16,7 +16,6 @@ __status__ = "Production"
 __date__ = "Sep 23, 2011"
 
 
-import math
 import re
 import textwrap
 import warnings
@@ -29,11 +28,10 @@ import numpy as np
 
 from pymatgen.core.periodic_table import Element, Specie
 from monty.io import zopen
-from pymatgen.util.coord_utils import in_coord_list_pbc
 from monty.string import remove_non_ascii
 from pymatgen.core.lattice import Lattice
 from pymatgen.core.structure import Structure
-from pymatgen.core.operations import SymmOp
+from pymatgen.core.operations import SymmOp, SymmOpSet
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 
 
@@ -273,13 +271,8 @@ class CifParser(object):
         """
         Generate unique coordinates using coord and symmetry positions.
         """
-        coords = []
-        for op in self.symmetry_operations:
-            coord = op.operate(coord_in)
-            coord = np.array([i - math.floor(i) for i in coord])
-            if not in_coord_list_pbc(coords, coord, atol=1e-3):
-                coords.append(coord)
-        return coords
+        return list(SymmOpSet(self.symmetry_operations).get_orbit(
+            coord_in, tol=1e-3, pbc=True))
 
     def _get_structure(self, data, primitive):
         """
@@ -351,13 +344,13 @@ class CifParser(object):
                 else:
                     coord_to_species[coord][el] = occu
 
-        allspecies = []
-        allcoords = []
-
-        for coord, species in coord_to_species.items():
-            coords = self._unique_coords(coord)
-            allcoords.extend(coords)
-            allspecies.extend(len(coords) * [species])
+        symmop_set = SymmOpSet(self.symmetry_operations)
+        orbits = symmop_set.get_orbits(list(coord_to_species.keys()),
+                                       tol=1e-3, pbc=True)
+        allspecies = list(coord_to_species.values())
+        allcoords = np.concatenate(orbits) if orbits else np.zeros((0, 3))
+        species_index = np.repeat(np.arange(len(orbits)),
+                                  [len(coords) for coords in orbits])
 
         #rescale occupancies if necessary
         for species in allspecies:
@@ -366,7 +359,8 @@ class CifParser(object):
                 for key, value in six.iteritems(species):
                     species[key] = value / totaloccu
 
-        struct = Structure(lattice, allspecies, allcoords)
+        struct = Structure.from_arrays(lattice, species_index, allspecies,
+                                       allcoords)
         if primitive:
             struct = struct.get_primitive_structure().get_reduced_structure()
         return struct.get_sorted_structure()
@@ -312,7 +312,10 @@ class Poscar(PMGSONable):
                 selective_dynamics.append([tok.upper()[0] == "T"
                                            for tok in toks[3:6]])
 
-        struct = Structure(lattice, atomic_symbols, coords, False, False, cart)
+        species_table, species_index = np.unique(atomic_symbols,
+                                                 return_inverse=True)
+        struct = Structure.from_arrays(lattice, species_index, species_table,
+                                       coords, coords_are_cartesian=cart)
 
         #parse velocities if any
         velocities = []
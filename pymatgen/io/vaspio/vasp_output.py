@@ -858,7 +858,9 @@ class Vasprun(PMGSONable):
     def _parse_structure(self, elem):
         latt = _parse_varray(elem.find("crystal").find("varray"))
         pos = _parse_varray(elem.find("varray"))
-        return Structure(latt, self.atomic_symbols, pos)
+        species_table, species_index = np.unique(self.atomic_symbols,
+                                                 return_inverse=True)
+        return Structure.from_arrays(latt, species_index, species_table, pos)
 
     def _parse_diel(self, elem):
         imag = [[float(l) for l in r.text.split()] for r in elem.find("imag").find("array").find("set").findall("r")]
@@ -1735,22 +1737,19 @@ class VolumetricData(object):
         a = self.dim
         if ind not in self._distance_matrix or\
                 self._distance_matrix[ind]["max_radius"] < radius:
-            coords = []
-            for (x, y, z) in itertools.product(*[list(range(i)) for i in a]):
-                coords.append([x / a[0], y / a[1], z / a[2]])
-            sites_dist = struct.lattice.get_points_in_sphere(
-                coords, struct[ind].coords, radius)
+            coords = np.indices(a).reshape((3, -1)).T / np.array(a)
+            centers, points, images, dists = \
+                struct.lattice.get_points_in_spheres(
+                    coords, [struct[ind].coords], radius)
             self._distance_matrix[ind] = {"max_radius": radius,
-                                          "data": np.array(sites_dist)}
+                                          "points": points, "dists": dists}
 
-        data = self._distance_matrix[ind]["data"]
+        data = self._distance_matrix[ind]
 
         #Use boolean indexing to find all charges within the desired distance.
-        inds = data[:, 1] <= radius
-        dists = data[inds, 1]
-        data_inds = np.rint(np.mod(list(data[inds, 0]), 1) *
-                            np.tile(a, (len(dists), 1))).astype(int)
-        vals = [self.data["diff"][x, y, z] for x, y, z in data_inds]
+        inds = data["dists"] <= radius
+        dists = data["dists"][inds]
+        vals = np.ravel(self.data["diff"])[data["points"][inds]]
 
         hist, edges = np.histogram(dists, bins=nbins,
                                    range=[0, radius],
@@ -50,7 +50,6 @@ class LinearAssignment(object):
         self.orig_c = np.array(costs, dtype=np.float64)
         self.nx, self.ny = self.orig_c.shape
         self.n = self.ny
-        self._inds = np.arange(self.n)
 
         self.epsilon = abs(epsilon)
 
@@ -77,8 +76,6 @@ class LinearAssignment(object):
         #paths until one is found
         if self._column_reduction():
             self._augmenting_row_reduction()
-            #initialize the reduced costs
-            self._update_cred()
             while -1 in self._x:
                 self._augment()
         
@@ -151,13 +148,15 @@ class LinearAssignment(object):
                 if k == -1 or abs(u1 - u2) < self.epsilon:
                     break
 
-    def _update_cred(self):
+    def _get_cred(self, i):
         """
-        Updates the reduced costs with the values from the
-        dual solution
+        Returns the reduced costs of row i, which must be assigned, with
+        the values from the dual solution. Only the rows in the tree of
+        an augmenting path are needed, so they are computed on demand
+        rather than for the whole matrix after each augmentation.
         """
-        ui = self.c[self._inds, self._x] - self._v[self._x]
-        self.cred = self.c - ui[:, None] - self._v[None, :]
+        j = self._x[i]
+        return self.c[i] - self._v - (self.c[i, j] - self._v[j])
 
     def _augment(self):
         """
@@ -180,7 +179,6 @@ class LinearAssignment(object):
             self._x[i] = k
             if i == istar:
                 break
-        self._update_cred()
 
     def _build_tree(self):
         """
@@ -226,7 +224,7 @@ class LinearAssignment(object):
             _ready[_jstar] = True
 
             #find shorter distances
-            newdists = mu + self.cred[i, :]
+            newdists = mu + self._get_cred(i)
             shorter = np.logical_and(newdists < self._d, _todo)
 
             #update distances
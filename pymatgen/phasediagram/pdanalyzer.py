@@ -24,7 +24,7 @@ from monty.functools import lru_cache
 
 from pyhull.simplex import Simplex
 
-from pymatgen.core.composition import Composition
+from pymatgen.core.composition import Composition, CompositionMatrix
 from pymatgen.phasediagram.pdmaker import PhaseDiagram, \
     GrandPotentialPhaseDiagram, get_facets
 from pymatgen.analysis.reaction_calculator import Reaction
@@ -62,8 +62,8 @@ class PDAnalyzer(object):
         Helper function to generates a normalized composition matrix from a
         list of compositions.
         """
-        return np.array([[comp.get_atomic_fraction(el)
-                          for el in self._pd.elements] for comp in complist])
+        return CompositionMatrix.from_compositions(
+            complist, self._pd.elements).get_atomic_fractions()
 
     @lru_cache(1)
     def _get_facet(self, comp):
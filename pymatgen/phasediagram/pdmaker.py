@@ -32,7 +32,7 @@ except ImportError:
     HULL_METHOD = "pyhull"
 
 from pymatgen.core.periodic_table import get_el_sp
-from pymatgen.core.composition import Composition
+from pymatgen.core.composition import Composition, CompositionMatrix
 from pymatgen.phasediagram.entries import GrandPotPDEntry, TransformedPDEntry
 from pymatgen.entries.computed_entries import ComputedEntry
 
@@ -121,13 +121,10 @@ class PhaseDiagram (PMGSONable):
                     .format(el))
             el_refs[el] = min(el_entries, key=lambda e: e.energy_per_atom)
 
-        data = []
-        for entry in entries:
-            comp = entry.composition
-            row = [comp.get_atomic_fraction(el) for el in elements]
-            row.append(entry.energy_per_atom)
-            data.append(row)
-        data = np.array(data)
+        fracs = CompositionMatrix.from_entries(
+            entries, elements).get_atomic_fractions()
+        data = np.column_stack([fracs,
+                                [e.energy_per_atom for e in entries]])
         self.all_entries_hulldata = data[:, 1:]
 
         #use only entries with negative formation energy
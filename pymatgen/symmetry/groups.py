@@ -20,12 +20,13 @@ from itertools import product
 from fractions import Fraction
 import numpy as np
 
-from monty.serialization import loadfn
+from pymatgen.util.io_utils import loadfn_cached
 
-from pymatgen.core.operations import SymmOp
+from pymatgen.core.operations import SymmOp, SymmOpSet
 
 
-SYMM_DATA = loadfn(os.path.join(os.path.dirname(__file__), "symm_data.yaml"))
+SYMM_DATA = loadfn_cached(os.path.join(os.path.dirname(__file__),
+                                      "symm_data.yaml"))
 
 
 GENERATOR_MATRICES = SYMM_DATA["generator_matrices"]
@@ -53,6 +54,10 @@ class PointGroup(object):
     .. attribute:: symmetry_ops
 
         Full set of symmetry operations as matrices.
+
+    .. attribute:: symmop_set
+
+        The symmetry operations as a SymmOpSet.
     """
 
     def __init__(self, int_symbol):
@@ -68,6 +73,7 @@ class PointGroup(object):
         self.symmetry_ops = [SymmOp.from_rotation_and_translation(m)
                              for m in self._generate_full_symmetry_ops()]
         self.order = len(self.symmetry_ops)
+        self.symmop_set = SymmOpSet(self.symmetry_ops)
 
     def _generate_full_symmetry_ops(self):
         symm_ops = list(self.generators)
@@ -88,19 +94,15 @@ class PointGroup(object):
 
         Args:
             p: Point as a 3x1 array.
-            tol: Tolerance for determining if sites are the same. 1e-5 should
-                be sufficient for most purposes. Set to 0 for exact matching
-                (and also needed for symbolic orbits).
+            tol: Tolerance for determining if sites are the same, compared to
+                the sum of the absolute differences of the coordinates. 1e-5
+                should be sufficient for most purposes. Set to 0 for exact
+                matching (and also needed for symbolic orbits).
 
         Returns:
             ([array]) Orbit for point.
         """
-        orbit = []
-        for o in self.symmetry_ops:
-            pp = o.operate(p)
-            if not in_array_list(orbit, pp, tol=tol):
-                orbit.append(pp)
-        return orbit
+        return list(self.symmop_set.get_orbit(p, tol=tol, ord=1))
 
 
 class SpaceGroup(object):
@@ -176,6 +178,7 @@ class SpaceGroup(object):
         self.patterson_symmetry = data["patterson_symmetry"]
         self.point_group = data["point_group"]
         self._symmetry_ops = None
+        self._symmop_set = None
 
     def _generate_full_symmetry_ops(self):
         symm_ops = np.array(self.generators)
@@ -208,26 +211,53 @@ class SpaceGroup(object):
                 SymmOp(m) for m in self._generate_full_symmetry_ops()]
         return self._symmetry_ops
 
+    @property
+    def symmop_set(self):
+        """
+        The symmetry operations as a SymmOpSet, for applying all of them at
+        once.
+        """
+        if self._symmop_set is None:
+            self._symmop_set = SymmOpSet(self.symmetry_ops)
+        return self._symmop_set
+
     def get_orbit(self, p, tol=1e-5):
         """
         Returns the orbit for a point.
 
+        Images are brought into the unit cell and compared taking periodic
+        boundary conditions into account, so that images on opposite faces
+        of the cell, e.g., at x = 0 and x = 0.9999999, are the same site.
+
         Args:
             p: Point as a 3x1 array.
-            tol: Tolerance for determining if sites are the same. 1e-5 should
-                be sufficient for most purposes. Set to 0 for exact matching
-                (and also needed for symbolic orbits).
+            tol: Tolerance for determining if sites are the same, compared to
+                the sum of the absolute differences of the fractional
+                coordinates. 1e-5 should be sufficient for most purposes. Set
+                to 0 for exact matching (and also needed for symbolic
+                orbits).
 
         Returns:
             ([array]) Orbit for point.
         """
-        orbit = []
-        for o in self.symmetry_ops:
-            pp = o.operate(p)
-            pp = np.mod(pp, 1)
-            if not in_array_list(orbit, pp, tol=tol):
-                orbit.append(pp)
-        return orbit
+        return list(self.symmop_set.get_orbit(p, tol=tol, pbc=True, ord=1))
+
+    def get_orbits(self, points, tol=1e-5):
+        """
+        Returns the orbits for a list of points. All symmetry operations are
+        applied to all points at once, which is much faster than calling
+        get_orbit for each point.
+
+        Args:
+            points: List of points as 3x1 arrays.
+            tol: Tolerance for determining if sites are the same. See
+                get_orbit.
+
+        Returns:
+            ([[array]]) Orbit for each point.
+        """
+        return [list(orbit) for orbit in
+                self.symmop_set.get_orbits(points, tol=tol, pbc=True, ord=1)]
 
     def is_compatible(self, lattice, tol=1e-5, angle_tol=5):
         """
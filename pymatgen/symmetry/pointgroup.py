@@ -10,7 +10,7 @@ __email__ = "shyuep@gmail.com"
 __date__ = "5/8/13"
 
 
-import pymatgen
+import pymatgen.symmetry.analyzer
 import warnings
 from monty.dev import deprecated
 
@@ -17,6 +17,8 @@ __maintainer__ = "Shyue Ping Ong"
 __email__ = "shyuep@gmail.com"
 __date__ = "Nov 27, 2011"
 
+import itertools
+
 import numpy as np
 import math
 
@@ -105,7 +107,8 @@ def coord_list_mapping(subset, superset):
 def coord_list_mapping_pbc(subset, superset, atol=1e-8):
     """
     Gives the index mapping from a subset to a superset.
-    Subset and superset cannot contain duplicate rows
+    Subset and superset cannot contain duplicate rows. Large lists are
+    mapped using a PBCCoordIndex of the superset.
 
     Args:
         subset, superset: List of frac_coords
@@ -115,6 +118,8 @@ def coord_list_mapping_pbc(subset, superset, atol=1e-8):
     """
     c1 = np.array(subset)
     c2 = np.array(superset)
+    if c1.size * c2.size >= LOOP_THRESHOLD:
+        return PBCCoordIndex(c2, atol).get_mapping(c1)
 
     diff = c1[:, None, :] - c2[None, :, :]
     diff -= np.round(diff)
@@ -125,7 +130,7 @@ def coord_list_mapping_pbc(subset, superset, atol=1e-8):
     test = c2[inds] - c1
     test -= np.round(test)
     if not np.allclose(test, 0):
-        if not is_coord_subset_pbc(subset, superset):
+        if not is_coord_subset_pbc(subset, superset, atol=atol):
             raise ValueError("subset is not a subset of superset")
     if not test.shape == c1.shape:
         raise ValueError("Something wrong with the inputs, likely duplicates "
@@ -254,6 +259,43 @@ def pbc_shortest_vectors(lattice, fcoords1, fcoords2):
         return shortest
 
 
+def pbc_pair_shortest_vectors(lattice, fcoords1, fcoords2):
+    """
+    Returns the shortest vectors between corresponding pairs of coordinates
+    taking into account periodic boundary conditions and the lattice. Unlike
+    pbc_shortest_vectors, which computes the vectors between all points of
+    two lists, this computes only the vectors from fcoords1[n] to
+    fcoords2[n], so that it scales to millions of pairs. The same 27
+    periodic images are tested, in chunks of at most LOOP_THRESHOLD
+    elements.
+
+    Args:
+        lattice: lattice to use
+        fcoords1: First set of fractional coordinates, as a (N, 3) array.
+        fcoords2: Second set of fractional coordinates. Must broadcast
+            against fcoords1, e.g., a single coord or a (N, 3) array.
+
+    Returns:
+        (N, 3) array of displacement vectors from fcoords1 to fcoords2.
+    """
+    fdiff = np.subtract(fcoords2, fcoords1)
+    shape = fdiff.shape
+    fdiff = fdiff.reshape((-1, 3))
+    fdiff -= np.round(fdiff)
+
+    images = np.array(list(itertools.product([-1, 0, 1], repeat=3)))
+    shortest = np.zeros(fdiff.shape)
+    chunk_size = max(int(LOOP_THRESHOLD // images.size), 1)
+    for start in range(0, len(fdiff), chunk_size):
+        chunk = fdiff[start:start + chunk_size]
+        vectors = lattice.get_cartesian_coords(chunk[:, None, :] +
+                                               images[None, :, :])
+        d_2 = np.sum(vectors ** 2, axis=-1)
+        shortest[start:start + chunk_size] = \
+            vectors[np.arange(len(vectors)), np.argmin(d_2, axis=-1)]
+    return shortest.reshape(shape)
+
+
 def find_in_coord_list_pbc(fcoord_list, fcoord, atol=1e-8):
     """
     Get the indices of all points in a fractional coord list that are
@@ -294,6 +336,7 @@ def in_coord_list_pbc(fcoord_list, fcoord, atol=1e-8):
 def is_coord_subset_pbc(subset, superset, atol=1e-8):
     """
     Tests if all fractional coords in subset are contained in superset.
+    Large lists are compared using a PBCCoordIndex of the superset.
 
     Args:
         subset, superset: List of fractional coords
@@ -303,6 +346,8 @@ def is_coord_subset_pbc(subset, superset, atol=1e-8):
     """
     c1 = np.array(subset)
     c2 = np.array(superset)
+    if c1.size * c2.size >= LOOP_THRESHOLD:
+        return np.all(PBCCoordIndex(c2, atol).contains(c1))
     dist = c1[:, None, :] - c2[None, :, :]
     dist -= np.round(dist)
     is_close = np.all(np.abs(dist) < atol, axis=-1)
@@ -310,6 +355,318 @@ def is_coord_subset_pbc(subset, superset, atol=1e-8):
     return np.all(any_close)
 
 
+class PBCCoordIndex(object):
+    """
+    Spatial hash of a list of fractional coords for repeated lookups taking
+    into account periodic boundary conditions. The unit cell is divided into
+    a grid of bins no smaller than the tolerance, so that all matches of a
+    query coord lie in the bin of the coord or one of its 26 neighbours.
+    Building the index takes O(N log N) time and each query then takes
+    O(log N) time instead of the O(N) of find_in_coord_list_pbc, with the
+    same tolerance semantics, i.e., two coords match if the components of
+    their periodic difference are all less than atol.
+    """
+
+    def __init__(self, fcoord_list, atol=1e-8):
+        """
+        Args:
+            fcoord_list: List of fractional coords to index.
+            atol: Absolute tolerance. Defaults to 1e-8. Accepts both scalar
+                and array.
+        """
+        self.fcoords = np.array(fcoord_list, dtype=np.float64).reshape(
+            (-1, 3))
+        self.atol = np.ones(3) * atol
+        # Bins are at least atol wide, and on average hold about one coord.
+        # Tolerances of 1 / nmax or less (including 0) all give nmax bins.
+        nmax = max(int(math.ceil(len(self.fcoords) ** (1 / 3))), 1)
+        self._nbins = np.array([max(int(1 / a), 1) if a > 1 / nmax else nmax
+                                for a in self.atol])
+        keys = self._get_keys(self._get_bins(self.fcoords))
+        self._order = np.argsort(keys, kind="mergesort")
+        self._sorted_keys = keys[self._order]
+        self._offsets = np.array(list(itertools.product(
+            *[[-1, 0, 1] if n >= 3 else range(n) for n in self._nbins])))
+
+    def __len__(self):
+        return len(self.fcoords)
+
+    def _get_bins(self, fcoords):
+        fcoords = fcoords - np.floor(fcoords)
+        return np.floor(fcoords * self._nbins).astype(np.int64) % self._nbins
+
+    def _get_keys(self, bins):
+        return (bins[..., 0] * self._nbins[1] + bins[..., 1]) * \
+            self._nbins[2] + bins[..., 2]
+
+    def query(self, fcoords):
+        """
+        Finds all matches of a list of fractional coords.
+
+        Args:
+            fcoords: List of fractional coords to look up.
+
+        Returns:
+            (query_indices, indices) arrays such that fcoords[query_indices]
+            matches fcoord_list[indices], in order of the query coords.
+        """
+        fcoords = np.array(fcoords, dtype=np.float64).reshape((-1, 3))
+        bins = self._get_bins(fcoords)
+        neighbours = bins[:, None, :] + self._offsets[None, :, :]
+        neighbours %= self._nbins
+        keys = self._get_keys(neighbours).ravel()
+        starts = np.searchsorted(self._sorted_keys, keys, side="left")
+        ends = np.searchsorted(self._sorted_keys, keys, side="right")
+        cand, owners = _ragged_arange(starts, ends - starts)
+        query_inds = owners // len(self._offsets)
+        inds = self._order[cand]
+        diff = self.fcoords[inds] - fcoords[query_inds]
+        diff -= np.round(diff)
+        close = np.all(np.abs(diff) < self.atol, axis=-1)
+        query_inds, inds = query_inds[close], inds[close]
+        order = np.lexsort((inds, query_inds))
+        return query_inds[order], inds[order]
+
+    def find(self, fcoord):
+        """
+        Get the indices of all indexed coords that are equal to a fractional
+        coord. Equivalent to find_in_coord_list_pbc.
+
+        Args:
+            fcoord: A specific fractional coord to test.
+
+        Returns:
+            Indices of matches, e.g., [0, 1, 2, 3]. Empty list if not found.
+        """
+        return self.query([fcoord])[1]
+
+    def contains(self, fcoords):
+        """
+        Tests which of a list of fractional coords are in the index.
+
+        Args:
+            fcoords: List of fractional coords to test.
+
+        Returns:
+            Boolean array, True for the coords that are in the index.
+        """
+        fcoords = np.reshape(fcoords, (-1, 3))
+        query_inds = self.query(fcoords)[0]
+        return np.bincount(query_inds, minlength=len(fcoords)) > 0
+
+    def find_nearest(self, fcoords):
+        """
+        Finds the closest match of each of a list of fractional coords.
+
+        Args:
+            fcoords: List of fractional coords to look up.
+
+        Returns:
+            Array with the index of the closest match (by the largest
+            component of the periodic difference) of each coord, or -1 if
+            there is no match.
+        """
+        fcoords = np.array(fcoords, dtype=np.float64).reshape((-1, 3))
+        query_inds, inds = self.query(fcoords)
+        diff = self.fcoords[inds] - fcoords[query_inds]
+        diff -= np.round(diff)
+        dist = np.max(np.abs(diff), axis=-1)
+        # Sort the matches by distance, and take the first of each query.
+        order = np.lexsort((dist, query_inds))
+        query_inds, inds = query_inds[order], inds[order]
+        first = np.ones(len(query_inds), dtype=bool)
+        first[1:] = query_inds[1:] != query_inds[:-1]
+        nearest = -np.ones(len(fcoords), dtype=np.int64)
+        nearest[query_inds[first]] = inds[first]
+        return nearest
+
+    def get_mapping(self, subset):
+        """
+        Gives the index mapping from a subset to the indexed coords.
+        Equivalent to coord_list_mapping_pbc(subset, fcoord_list).
+
+        Args:
+            subset: List of frac_coords
+
+        Returns:
+            list of indices such that fcoord_list[indices] = subset
+        """
+        subset = np.reshape(subset, (-1, 3))
+        query_inds, inds = self.query(subset)
+        counts = np.bincount(query_inds, minlength=len(subset))
+        if np.any(counts == 0):
+            raise ValueError("subset is not a subset of superset")
+        if np.any(counts > 1):
+            raise ValueError("Something wrong with the inputs, likely "
+                             "duplicates in superset")
+        return inds
+
+
+def _ragged_arange(starts, counts):
+    """
+    Concatenation of np.arange(s, s + c) for all (s, c) in zip(starts,
+    counts), together with the index of the range each element came from.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    owners = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    local = np.arange(int(np.sum(counts))) - offsets[owners]
+    return np.asarray(starts, dtype=np.int64)[owners] + local, owners
+
+
+def find_points_in_spheres(all_fcoords, center_fcoords, r, lattice,
+                           numerical_tol=1e-8):
+    """
+    Finds all periodic images of a set of points that lie within a distance
+    r of each of a set of centers. The search uses a cell list on a grid of
+    cubes of side r, so the cost scales linearly with the number of points
+    for a fixed cutoff instead of quadratically. Candidate pairs are
+    evaluated in chunks of at most LOOP_THRESHOLD pairs to bound the peak
+    memory.
+
+    Args:
+        all_fcoords: Fractional coordinates of the periodic points (Nx3).
+        center_fcoords: Fractional coordinates of the centers (Mx3).
+        r (float): Cutoff radius. Either a single value, or a sequence of
+            M values giving a separate radius for each center.
+        lattice: Lattice defining the periodicity.
+        numerical_tol (float): Pairs separated by less than this distance
+            are discarded, e.g., to exclude a center from its own neighbor
+            list. Use None to keep them.
+
+    Returns:
+        (center_indices, point_indices, images, distances) as flat arrays,
+        ordered by center index and then point index. images are the
+        integer lattice translations such that
+        all_fcoords[point_indices] + images lies within r of
+        center_fcoords[center_indices].
+    """
+    all_fcoords = np.reshape(np.array(all_fcoords, dtype=np.float64), (-1, 3))
+    center_fcoords = np.reshape(np.array(center_fcoords, dtype=np.float64),
+                                (-1, 3))
+    radii = np.broadcast_to(np.array(r, dtype=np.float64),
+                            (len(center_fcoords),))
+    rmax = np.max(radii) if len(radii) else 0
+    if rmax <= 0 or len(all_fcoords) == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros((0, 3), dtype=np.int64), np.zeros(0))
+
+    # Work with both sets wrapped into the unit cell. The translations are
+    # restored when the images are returned.
+    p_shift = np.floor(all_fcoords)
+    c_shift = np.floor(center_fcoords)
+    pf = all_fcoords - p_shift
+    cf = center_fcoords - c_shift
+
+    # A point can only be within r of a center if each of its fractional
+    # coordinates is within r * |b_i| of that of the center, where b_i are the
+    # reciprocal lattice vectors. Enumerate exactly the images that fall in
+    # the padded bounding box of the centers.
+    recp_len = np.array(lattice.reciprocal_lattice_crystallographic.abc)
+    pad = rmax * recp_len + 1e-8
+    lo = np.ceil(np.min(cf, axis=0) - pad - pf).astype(np.int64)
+    n = np.floor(np.max(cf, axis=0) + pad - pf).astype(np.int64) - lo + 1
+    n = np.maximum(n, 0)
+    ind, owners = _ragged_arange(np.zeros(len(pf)), np.prod(n, axis=1))
+    nb, nc = n[owners, 1], n[owners, 2]
+    images = lo[owners] + np.column_stack(
+        [ind // (nb * nc), (ind // nc) % nb, ind % nc])
+    pcart = lattice.get_cartesian_coords(pf[owners] + images)
+    ccart = lattice.get_cartesian_coords(cf)
+    ci, pj, dists = _find_cart_points_in_spheres(pcart, ccart, radii,
+                                                 numerical_tol)
+    point_indices = owners[pj]
+    images = images[pj] - p_shift[point_indices].astype(np.int64) + \
+        c_shift[ci].astype(np.int64)
+    return ci, point_indices, images, dists
+
+
+def find_cart_points_in_spheres(all_coords, center_coords, r,
+                                numerical_tol=1e-8):
+    """
+    Finds all points that lie within a distance r of each of a set of
+    centers, without periodic boundary conditions, e.g., for molecules. The
+    same cell list as find_points_in_spheres is used, so the cost scales
+    linearly with the number of points for a fixed cutoff.
+
+    Args:
+        all_coords: Cartesian coordinates of the points (Nx3).
+        center_coords: Cartesian coordinates of the centers (Mx3).
+        r (float): Cutoff radius. Either a single value, or a sequence of
+            M values giving a separate radius for each center.
+        numerical_tol (float): Pairs separated by less than this distance
+            are discarded, e.g., to exclude a center from its own neighbor
+            list. Use None to keep them.
+
+    Returns:
+        (center_indices, point_indices, distances) as flat arrays, ordered
+        by center index and then point index.
+    """
+    all_coords = np.reshape(np.array(all_coords, dtype=np.float64), (-1, 3))
+    center_coords = np.reshape(np.array(center_coords, dtype=np.float64),
+                               (-1, 3))
+    radii = np.broadcast_to(np.array(r, dtype=np.float64),
+                            (len(center_coords),))
+    return _find_cart_points_in_spheres(all_coords, center_coords, radii,
+                                        numerical_tol)
+
+
+def _find_cart_points_in_spheres(pcart, ccart, radii, numerical_tol):
+    """
+    Cell list search for the points pcart within radii of the centers
+    ccart. See find_cart_points_in_spheres.
+    """
+    rmax = np.max(radii) if len(radii) else 0
+    if rmax <= 0 or len(pcart) == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros(0))
+
+    # Bin all points into cubes of side rmax. Indices are offset by one so
+    # that neighboring cubes of occupied cubes never wrap around in the
+    # flattened cube index.
+    origin = np.min(np.concatenate([pcart, ccart]), axis=0)
+    pcube = np.floor((pcart - origin) / rmax).astype(np.int64) + 1
+    ccube = np.floor((ccart - origin) / rmax).astype(np.int64) + 1
+    dims = np.max(np.concatenate([pcube, ccube]), axis=0) + 2
+
+    def flat(cubes):
+        return (cubes[:, 0] * dims[1] + cubes[:, 1]) * dims[2] + cubes[:, 2]
+
+    order = np.argsort(flat(pcube), kind="mergesort")
+    sorted_ids = flat(pcube)[order]
+
+    all_c, all_p, all_d = [], [], []
+    for offset in itertools.product([-1, 0, 1], repeat=3):
+        ids = flat(ccube + offset)
+        start = np.searchsorted(sorted_ids, ids, side="left")
+        counts = np.searchsorted(sorted_ids, ids, side="right") - start
+        cum = np.cumsum(counts)
+        if len(cum) == 0 or cum[-1] == 0:
+            continue
+        splits = np.searchsorted(
+            cum, np.arange(LOOP_THRESHOLD, cum[-1], LOOP_THRESHOLD))
+        for cs in np.split(np.arange(len(counts)), splits):
+            pos, ci = _ragged_arange(start[cs], counts[cs])
+            ci = cs[ci]
+            pj = order[pos]
+            d = np.sqrt(np.sum((pcart[pj] - ccart[ci]) ** 2, axis=1))
+            within = d <= radii[ci]
+            if numerical_tol is not None:
+                within &= d > numerical_tol
+            all_c.append(ci[within])
+            all_p.append(pj[within])
+            all_d.append(d[within])
+
+    if not all_c:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros(0))
+    ci = np.concatenate(all_c)
+    pj = np.concatenate(all_p)
+    dists = np.concatenate(all_d)
+    srt = np.lexsort((pj, ci))
+    return ci[srt], pj[srt], dists[srt]
+
+
 def lattice_points_in_supercell(supercell_matrix):
     """
     Returns the list of points on the original lattice contained in the
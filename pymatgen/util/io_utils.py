@@ -14,11 +14,20 @@ __email__ = "shyuep@gmail.com"
 __status__ = "Production"
 __date__ = "Sep 23, 2011"
 
+import os
 import re
+import sys
+import hashlib
+import tempfile
+import pickle
 import numpy
 import six
+from six.moves import cPickle
 from monty.io import zopen
 
+#Bump to invalidate all existing data caches when the cache layout changes.
+DATA_CACHE_VERSION = 2
+
 def clean_lines(string_list, remove_empty_lines=True):
     """
     Strips whitespace, carriage returns and empty lines from a list of strings.
@@ -89,3 +98,103 @@ def micro_pyawk(filename, search, results=None, debug=None, postdebug=None):
                         postdebug(results, match)
 
     return results
+
+
+def _data_cache_dir(fname, cache_dir):
+    if cache_dir is not None:
+        return cache_dir
+    if os.environ.get("PMG_CACHE_DIR"):
+        return os.environ["PMG_CACHE_DIR"]
+    return os.path.join(os.path.dirname(fname), "__pycache__")
+
+
+class _DataUnpickler(pickle.Unpickler):
+    """
+    Unpickler for data caches that refuses to load any global, i.e., any
+    class or function. The cached data tables consist only of builtin
+    containers and scalars, which pickle stores without globals, so a cache
+    that someone else has tampered with cannot execute code when loaded.
+    """
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(
+            "Data caches may not contain {}.{}".format(module, name))
+
+
+def _as_builtin(obj):
+    """
+    Converts parsed json/yaml data to builtin types, e.g., the str and float
+    subclasses some yaml parsers return, so that it can be cached as plain
+    data.
+    """
+    if isinstance(obj, dict):
+        return dict((_as_builtin(k), _as_builtin(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return [_as_builtin(v) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(_as_builtin(v) for v in obj)
+    for t in (bool,) + six.integer_types + (float, six.text_type,
+                                           six.binary_type):
+        if isinstance(obj, t):
+            return t(obj)
+    return obj
+
+
+def loadfn_cached(fname, cache_dir=None):
+    """
+    Loads a json/yaml data file, such as the element or symmetry data shipped
+    with pymatgen, through a binary (pickle) cache. The first load parses the
+    source file and writes the cache. Subsequent loads, including those of
+    other processes, read the cache, which is typically an order of magnitude
+    faster than parsing yaml. The cache records the size and a SHA-256 hash
+    of the contents of the source file and is ignored and rewritten whenever
+    either changes. The cache is loaded with an unpickler that only accepts
+    builtin containers and scalars, so it can never execute code.
+
+    By default, the cache is written to a __pycache__ directory next to the
+    source file. The PMG_CACHE_DIR environment variable overrides this.
+    Failure to write a cache is not an error; the data is simply parsed on
+    each load.
+
+    Args:
+        fname (str): Path to the json/yaml file.
+        cache_dir (str): Directory for the cache. Overrides the defaults.
+
+    Returns:
+        Data in the file, as returned by monty.serialization.loadfn but
+        converted to builtin types.
+    """
+    fname = os.path.abspath(fname)
+    with open(fname, "rb") as f:
+        contents = f.read()
+    key = (DATA_CACHE_VERSION, len(contents),
+           hashlib.sha256(contents).hexdigest())
+    digest = hashlib.md5(fname.encode("utf-8")).hexdigest()[:8]
+    cache_name = "{}.{}.py{}.pickle".format(os.path.basename(fname), digest,
+                                            sys.version_info[0])
+    d = _data_cache_dir(fname, cache_dir)
+    try:
+        with open(os.path.join(d, cache_name), "rb") as f:
+            if _DataUnpickler(f).load() == key:
+                return _DataUnpickler(f).load()
+    except Exception:
+        #Missing, stale, unreadable or tampered caches are simply rebuilt.
+        pass
+
+    from monty.serialization import loadfn
+    data = _as_builtin(loadfn(fname))
+    tmp = None
+    try:
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        #Write to a temporary file and rename it so that concurrent
+        #processes never see a partially written cache.
+        fd, tmp = tempfile.mkstemp(dir=d, prefix=cache_name)
+        with os.fdopen(fd, "wb") as f:
+            cPickle.dump(key, f, cPickle.HIGHEST_PROTOCOL)
+            cPickle.dump(data, f, cPickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, os.path.join(d, cache_name))
+    except (IOError, OSError):
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+    return data
@@ -21,7 +21,9 @@ from pymatgen.util.coord_utils import get_linear_interpolated_value,\
     find_in_coord_list, find_in_coord_list_pbc,\
     barycentric_coords, pbc_shortest_vectors,\
     lattice_points_in_supercell, coord_list_mapping, all_distances,\
-    is_coord_subset_pbc, coord_list_mapping_pbc
+    is_coord_subset_pbc, coord_list_mapping_pbc, find_points_in_spheres,\
+    find_cart_points_in_spheres, PBCCoordIndex, pbc_pair_shortest_vectors
+from pymatgen.util import coord_utils
 from pymatgen.util.testing import PymatgenTest
 
 
@@ -144,6 +146,90 @@ class CoordUtilsTest(PymatgenTest):
         self.assertFalse(is_coord_subset_pbc([c1, c2], [c2, c3]))
         self.assertFalse(is_coord_subset_pbc([c1, c2], [c2]))
 
+    def test_pbc_coord_index(self):
+        c1 = [0, 0, 0]
+        c2 = [0, 1.2, -1]
+        c3 = [2.3, 0, 1]
+        c4 = [1.3 - 9e-9, -1 - 9e-9, 1 - 9e-9]
+        index = PBCCoordIndex([c1, c4, c2, [0.5, 0.5, 0.5]])
+        self.assertEqual(len(index), 4)
+        self.assertArrayEqual(index.find(c3), [1])
+        self.assertArrayEqual(index.find([1, 1, -1]), [0])
+        self.assertArrayEqual(index.find([0.1, 0.1, 0.1]), [])
+        self.assertArrayEqual(index.contains([c1, c2, [0.1, 0.1, 0.1]]),
+                              [True, True, False])
+        self.assertArrayEqual(index.get_mapping([c3, c2, c1]), [1, 2, 0])
+        self.assertArrayEqual(index.find_nearest([c3, [0.1, 0.1, 0.1]]),
+                              [1, -1])
+        self.assertRaises(ValueError, index.get_mapping, [[0.1, 0.1, 0.1]])
+        self.assertRaises(ValueError, PBCCoordIndex([c1, c1]).get_mapping,
+                          [c1])
+        #zero tolerance matches nothing, as in find_in_coord_list_pbc
+        self.assertArrayEqual(PBCCoordIndex([c1, c2], atol=0).find(c1), [])
+
+        #larger tolerance, matches have to be found in neighbouring bins
+        fcoords = np.random.random((200, 3))
+        index = PBCCoordIndex(fcoords, atol=0.01)
+        query = fcoords + np.random.randint(-2, 3, (200, 3)) + \
+            np.random.uniform(-0.005, 0.005, (200, 3))
+        for q in query[:20]:
+            self.assertArrayEqual(index.find(q),
+                                  find_in_coord_list_pbc(fcoords, q, 0.01))
+        self.assertArrayEqual(index.find_nearest(query), np.arange(200))
+
+        #large lists use the index
+        prev_threshold = coord_utils.LOOP_THRESHOLD
+        coord_utils.LOOP_THRESHOLD = 0
+        inds = np.random.permutation(200)[:100]
+        self.assertArrayEqual(
+            coord_list_mapping_pbc(query[inds], fcoords, atol=0.01), inds)
+        self.assertTrue(is_coord_subset_pbc(query, fcoords, atol=0.01))
+        self.assertFalse(is_coord_subset_pbc([[0.5, 0.5, 0.5]], [c1, c2]))
+        coord_utils.LOOP_THRESHOLD = prev_threshold
+
+    def test_find_points_in_spheres(self):
+        lattice = Lattice([[5, 0, 0], [1, 6, 0], [-1, 2, 4]])
+        fcoords = [[0.1, 0.2, 0.3], [0.7, -0.4, 1.2], [0.5, 0.5, 0.5]]
+        centers, points, images, dists = find_points_in_spheres(
+            fcoords, fcoords, 6, lattice)
+        self.assertTrue(np.all(np.diff(centers) >= 0))
+        self.assertTrue(np.all((dists > 1e-8) & (dists <= 6)))
+        vectors = lattice.get_cartesian_coords(
+            np.array(fcoords)[points] + images) - \
+            lattice.get_cartesian_coords(np.array(fcoords)[centers])
+        self.assertArrayAlmostEqual(np.sum(vectors ** 2, axis=1) ** 0.5,
+                                    dists)
+        # Compare against an explicit enumeration of images.
+        count = 0
+        r = np.arange(-3, 4)
+        images = np.array(np.meshgrid(r, r, r)).reshape((3, -1)).T
+        for f1 in fcoords:
+            for f2 in fcoords:
+                d = np.sum((lattice.get_cartesian_coords(f2 + images) -
+                            lattice.get_cartesian_coords(f1)) ** 2,
+                           axis=1) ** 0.5
+                count += np.sum((d > 1e-8) & (d <= 6))
+        self.assertEqual(len(dists), count)
+
+        centers, points, images, dists = find_points_in_spheres(
+            fcoords, [[0.1, 0.2, 0.3]], 0.5, lattice, numerical_tol=None)
+        self.assertArrayEqual(points, [0])
+        self.assertArrayEqual(images, [[0, 0, 0]])
+
+    def test_find_cart_points_in_spheres(self):
+        coords = np.random.uniform(-10, 10, size=(100, 3))
+        centers, points, dists = find_cart_points_in_spheres(coords, coords,
+                                                             3)
+        self.assertTrue(np.all(np.diff(centers) >= 0))
+        d = all_distances(coords, coords)
+        self.assertEqual(len(dists), np.sum((d > 1e-8) & (d <= 3)))
+        self.assertArrayAlmostEqual(d[centers, points], dists)
+
+        centers, points, dists = find_cart_points_in_spheres(
+            coords, coords[:2], [0, 3], numerical_tol=None)
+        self.assertArrayEqual(points[centers == 0], [0])
+        self.assertEqual(np.sum(centers == 1), np.sum(d[1] <= 3))
+
     def test_lattice_points_in_supercell(self):
         supercell = np.array([[1,3,5], [-3,2,3], [-5,3,1]])
         points = lattice_points_in_supercell(supercell)
@@ -206,6 +292,24 @@ class CoordUtilsTest(PymatgenTest):
 
         coord_utils.LOOP_THRESHOLD = prev_threshold
 
+    def test_pbc_pair_shortest_vectors(self):
+        fcoords = np.random.random((10, 3)) * 4 - 2
+        lattice = Lattice.from_lengths_and_angles([8, 8, 4],
+                                                  [90, 76, 58])
+        i, j = np.triu_indices(10)
+        expected = pbc_shortest_vectors(lattice, fcoords, fcoords)[i, j]
+        vectors = pbc_pair_shortest_vectors(lattice, fcoords[i], fcoords[j])
+        self.assertArrayAlmostEqual(vectors, expected)
+        self.assertArrayAlmostEqual(
+            pbc_pair_shortest_vectors(lattice, fcoords[0], fcoords[:3]),
+            expected[:3])
+
+        prev_threshold = coord_utils.LOOP_THRESHOLD
+        coord_utils.LOOP_THRESHOLD = 100
+        vectors = pbc_pair_shortest_vectors(lattice, fcoords[i], fcoords[j])
+        self.assertArrayAlmostEqual(vectors, expected)
+        coord_utils.LOOP_THRESHOLD = prev_threshold
+
 
 if __name__ == "__main__":
     import unittest
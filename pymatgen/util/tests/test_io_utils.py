@@ -16,9 +16,13 @@ __date__ = "Nov 14, 2012"
 
 import unittest
 import os
+import shutil
+import tempfile
+import pickle
+from collections import OrderedDict
 
 from pymatgen.util.testing import PymatgenTest
-from pymatgen.util.io_utils import micro_pyawk
+from pymatgen.util.io_utils import micro_pyawk, loadfn_cached
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..",
                         'test_files')
@@ -36,5 +40,45 @@ class FuncTest(PymatgenTest):
         micro_pyawk(filename, [["POTCAR:(.*)", f2, f]])
         self.assertEqual(len(data), 6)
 
+    def test_loadfn_cached(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            fname = os.path.join(tmpdir, "data.yaml")
+            with open(fname, "w") as f:
+                f.write("a: [1, 2]\nb: x\n")
+            cache_dir = os.path.join(tmpdir, "cache")
+            self.assertEqual(loadfn_cached(fname, cache_dir=cache_dir),
+                             {"a": [1, 2], "b": "x"})
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            self.assertEqual(loadfn_cached(fname, cache_dir=cache_dir),
+                             {"a": [1, 2], "b": "x"})
+            #Changing the source invalidates the cache, even if the size and
+            #modification time stay the same.
+            stat = os.stat(fname)
+            with open(fname, "w") as f:
+                f.write("a: [1, 2]\nb: y\n")
+            os.utime(fname, (stat.st_atime, stat.st_mtime))
+            self.assertEqual(loadfn_cached(fname, cache_dir=cache_dir),
+                             {"a": [1, 2], "b": "y"})
+            with open(fname, "w") as f:
+                f.write("a: [1, 2, 3]\n")
+            self.assertEqual(loadfn_cached(fname, cache_dir=cache_dir),
+                             {"a": [1, 2, 3]})
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            #A cache that refers to any class or function is never loaded.
+            cache = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+            with open(cache, "rb") as f:
+                key = pickle.load(f)
+            with open(cache, "wb") as f:
+                pickle.dump(key, f)
+                pickle.dump(OrderedDict(a=1), f)
+            self.assertEqual(loadfn_cached(fname, cache_dir=cache_dir),
+                             {"a": [1, 2, 3]})
+            #An unusable cache directory falls back to parsing the file.
+            self.assertEqual(loadfn_cached(fname, cache_dir=fname),
+                             {"a": [1, 2, 3]})
+        finally:
+            shutil.rmtree(tmpdir)
+
 if __name__ == "__main__":
     unittest.main()